@@ -3,6 +3,7 @@ Quick sanity check script for balance pipeline.
 Validates CTS compliance and mathematical balance after CSV ingestion.
 """
 
+import argparse
 import hashlib
 import pathlib
 import sys
@@ -45,6 +46,14 @@ def calculate_simple_balance(transactions_df):
 
 def main():
     """Run quick sanity checks on the balance pipeline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--export-csv",
+        action="store_true",
+        help="Also write timestamped audit/summary CSVs to audit_reports/",
+    )
+    args = parser.parse_args()
+
     print("🔍 Balance Pipeline Quick Check")
     print("=" * 50)
 
@@ -77,7 +86,9 @@ def main():
         print("\n💰 Calculating balance...")
         if bm is not None:
             try:
-                summary_df, audit_df = bm.build_baseline(transactions)
+                summary_df, audit_df = bm.build_baseline(
+                    transactions, export_csv=args.export_csv
+                )
                 imbalance = round(summary_df["net_owed"].sum(), 2)
             except Exception as e:
                 print(f"⚠️  baseline_math failed: {e}")
@@ -8,11 +8,17 @@ Usage:
     python scripts/utilities/dispute_analyzer.py
 """
 
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
 
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.balance_pipeline.analytics import duplicate_charge_pairs  # noqa: E402
+
 
 def load_latest_data():
     """Load the most recent cleaned transaction file"""
@@ -66,38 +72,17 @@ def find_refunds_for_merchant(df, merchant_name, days_back=90):
     return results
 
 
-def find_duplicate_charges(df, days_window=3):
+def find_duplicate_charges(df, days_window=3, amount_tolerance=0.0):
     """Find potential duplicate charges within a time window"""
     print(f"\n=== Checking for Duplicate Charges (within {days_window} days) ===")
 
-    duplicates = []
-
-    # Group by merchant and amount
-    for (merchant, amount), group in df[df["amount"] < 0].groupby(
-        ["merchant_standardized", "amount_abs"]
-    ):
-        if len(group) > 1:
-            # Check if transactions are within days_window
-            group_sorted = group.sort_values("date")
-            for i in range(len(group_sorted) - 1):
-                date_diff = (
-                    group_sorted.iloc[i + 1]["date"] - group_sorted.iloc[i]["date"]
-                ).days
-                if date_diff <= days_window:
-                    duplicates.append(
-                        {
-                            "merchant": merchant,
-                            "amount": amount,
-                            "date1": group_sorted.iloc[i]["date"],
-                            "date2": group_sorted.iloc[i + 1]["date"],
-                            "days_apart": date_diff,
-                        }
-                    )
+    dup_df = duplicate_charge_pairs(df, days_window, amount_tolerance=amount_tolerance)
 
-    if duplicates:
-        dup_df = pd.DataFrame(duplicates)
-        print(dup_df.to_string())
-        print(f"\nFound {len(duplicates)} potential duplicate charges")
+    if not dup_df.empty:
+        print(
+            dup_df[["merchant", "amount", "date1", "date2", "days_apart"]].to_string()
+        )
+        print(f"\nFound {len(dup_df)} potential duplicate charges")
         return dup_df
     else:
         print("No suspicious duplicate charges found")
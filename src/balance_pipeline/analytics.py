@@ -5,7 +5,8 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
-from scipy import stats
+
+from .balances import BalanceIndex
 
 # Assuming config.py is in the same directory or accessible via PYTHONPATH
 from .config import DEFAULT_MERCHANT_CATEGORIES, AnalysisConfig, DataQualityFlag
@@ -36,6 +37,14 @@ def _categorize_merchant(
     return "Other Expenses"  # Fallback if no category matched
 
 
+def short_labels(df: pd.DataFrame, width: int) -> pd.Series:
+    """Descriptions truncated to ``width`` characters for chart annotations."""
+    if "Description" not in df.columns:
+        return pd.Series("", index=df.index)
+    text = df["Description"].fillna("").astype(str)
+    return text.where(text.str.len() <= width, text.str[:width] + "...")
+
+
 def _analyze_rent_budget_variance(
     rent_df: pd.DataFrame,
     config: AnalysisConfig,  # Added config for consistency, though not directly used in this version
@@ -108,6 +117,170 @@ def _analyze_rent_budget_variance(
     return analysis
 
 
+def liquidity_strain_points(
+    ledger: pd.DataFrame, config: AnalysisConfig
+) -> list[dict[str, Any]]:
+    """Rows whose running balance exceeds ``LIQUIDITY_STRAIN_THRESHOLD``."""
+    if not {"Date", "RunningBalance", "TransactionID"} <= set(ledger.columns):
+        return []
+    high = ledger[ledger["RunningBalance"].abs() > config.LIQUIDITY_STRAIN_THRESHOLD]
+    if high.empty:
+        return []
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(high["Date"], errors="coerce")
+            .dt.strftime("%Y-%m-%d")
+            .fillna("N/A"),
+            "running_balance": high["RunningBalance"].round(config.CURRENCY_PRECISION),
+            "transaction_id": high["TransactionID"],
+            "description": high.get("Description", "N/A"),
+        }
+    ).to_dict("records")
+
+
+def liquidity_strain_episodes(
+    ledger: pd.DataFrame, config: AnalysisConfig
+) -> list[dict[str, Any]]:
+    """Sustained periods of liquidity strain in a date-sorted ledger.
+
+    An episode is a run of consecutive rows whose running balance stays beyond
+    ``LIQUIDITY_STRAIN_THRESHOLD`` on the same side of zero. It lasts from its
+    first row until the row that brings the balance back (or the last ledger
+    date while still open) and is reported if that spans at least
+    ``LIQUIDITY_STRAIN_DAYS``. Runs are found with a single ``np.diff`` pass.
+    """
+    if ledger.empty or not {"Date", "RunningBalance"} <= set(ledger.columns):
+        return []
+    balance = ledger["RunningBalance"].to_numpy(dtype=float, na_value=0.0)
+    dates = pd.to_datetime(ledger["Date"], errors="coerce").to_numpy()
+    # +1: Ryan owes beyond threshold, -1: Jordyn owes beyond threshold, 0: normal
+    state = np.sign(balance) * (np.abs(balance) > config.LIQUIDITY_STRAIN_THRESHOLD)
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(state)) + 1, [len(state)]))
+    starts, ends = bounds[:-1], bounds[1:]
+    peaks = np.maximum.reduceat(np.abs(balance), starts)
+    strained = state[starts] != 0
+    starts, ends, peaks = starts[strained], ends[strained], peaks[strained]
+    if starts.size == 0:
+        return []
+
+    ongoing = ends == len(state)
+    end_dates = dates[np.where(ongoing, len(state) - 1, ends)]
+    start_dates = dates[starts]
+    durations = (end_dates - start_dates) / np.timedelta64(1, "D")
+    long_enough = durations >= config.LIQUIDITY_STRAIN_DAYS
+    if not long_enough.any():
+        return []
+
+    direction = np.where(state[starts] > 0, "Ryan owes Jordyn", "Jordyn owes Ryan")
+    return pd.DataFrame(
+        {
+            "start_date": pd.DatetimeIndex(start_dates).strftime("%Y-%m-%d"),
+            "end_date": pd.DatetimeIndex(end_dates).strftime("%Y-%m-%d"),
+            "duration_days": durations.astype(int),
+            "transactions": ends - starts,
+            "peak_balance": (peaks * state[starts]).round(config.CURRENCY_PRECISION),
+            "direction": direction,
+            "ongoing": ongoing,
+        }
+    )[long_enough].to_dict("records")
+
+
+DUPLICATE_PAIR_COLUMNS = [
+    "merchant",
+    "amount",
+    "amount2",
+    "date1",
+    "date2",
+    "days_apart",
+    "description1",
+    "description2",
+    "index1",
+    "index2",
+]
+
+
+def duplicate_charge_pairs(
+    df: pd.DataFrame,
+    days_window: int = 3,
+    *,
+    amount_tolerance: float = 0.0,
+    date_column: str = "date",
+    merchant_column: str = "merchant_standardized",
+    amount_column: str = "amount",
+    description_column: str = "description",
+) -> pd.DataFrame:
+    """Pairs of charges that look like duplicates, one row per pair.
+
+    Two charges (negative amounts) pair up when they share a merchant, their
+    absolute amounts differ by at most ``amount_tolerance`` and they are at
+    most ``days_window`` days apart. Every such pair is reported, not only
+    neighbours. Charges are sorted once by (merchant, amount, date) -- by
+    (merchant, date) with a tolerance -- and row ``i`` is compared with row
+    ``i + k`` for k = 1, 2, ... in whole-array steps, until no rows ``k``
+    apart share a key within the window. ``index1``/``index2`` are the
+    frame's index labels of the earlier and later charge.
+    """
+    amounts = pd.to_numeric(df[amount_column], errors="coerce").to_numpy(
+        dtype=float, na_value=np.nan
+    )
+    dates = pd.to_datetime(df[date_column], errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    stamps = dates.to_numpy(dtype="datetime64[ns]")
+    nanos = stamps.view("int64")
+    codes, merchants = pd.factorize(df[merchant_column])
+
+    rows = np.flatnonzero((amounts < 0) & ~np.isnat(stamps) & (codes >= 0))
+    exact = amount_tolerance <= 0
+    charge, when, key = -amounts[rows], nanos[rows], codes[rows]
+    order = np.lexsort((when, charge, key) if exact else (when, key))
+    charge, when, key = charge[order], when[order], key[order]
+    # Whole days apart, as Timedelta.days counts them
+    day = 86_400 * 10**9
+    limit = (days_window + 1) * day
+
+    firsts, seconds = [], []
+    for lag in range(1, len(order)):
+        same = key[lag:] == key[:-lag]
+        if exact:
+            same &= charge[lag:] == charge[:-lag]
+        near = same & (when[lag:] - when[:-lag] < limit)
+        if not near.any():
+            break
+        if not exact:
+            near &= np.abs(charge[lag:] - charge[:-lag]) <= amount_tolerance + 1e-9
+        first = np.flatnonzero(near)
+        firsts.append(first)
+        seconds.append(first + lag)
+
+    if not firsts:
+        return pd.DataFrame(columns=DUPLICATE_PAIR_COLUMNS)
+    first = rows[order[np.concatenate(firsts)]]
+    second = rows[order[np.concatenate(seconds)]]
+    descriptions = (
+        df[description_column].to_numpy()
+        if description_column in df.columns
+        else np.full(len(df), None, dtype=object)
+    )
+    pairs = pd.DataFrame(
+        {
+            "merchant": merchants.take(codes[first]),
+            "amount": amounts[first],
+            "amount2": amounts[second],
+            "date1": stamps[first],
+            "date2": stamps[second],
+            "days_apart": (nanos[second] - nanos[first]) // day,
+            "description1": descriptions[first],
+            "description2": descriptions[second],
+            "index1": df.index[first],
+            "index2": df.index[second],
+        }
+    )
+    return pairs.sort_values(
+        ["merchant", "date1", "date2"], kind="stable", ignore_index=True
+    )
+
+
 def perform_advanced_analytics(
     master_ledger: pd.DataFrame,
     processed_rent_df: pd.DataFrame,  # Pass processed_rent_df for its budget info
@@ -150,29 +323,12 @@ def perform_advanced_analytics(
     else:
         analytics["monthly_payments_by_payer_for_shared_items"] = {}
 
-    liquidity_issues = []
-    if (
-        "RunningBalance" in valid_dates_ledger.columns
-        and "TransactionID" in valid_dates_ledger.columns
-    ):
-        high_balance_transactions = valid_dates_ledger[
-            valid_dates_ledger["RunningBalance"].abs()
-            > config.LIQUIDITY_STRAIN_THRESHOLD
-        ]
-        for idx, row in high_balance_transactions.iterrows():
-            liquidity_issues.append(
-                {
-                    "date": row["Date"].strftime("%Y-%m-%d")
-                    if pd.notna(row["Date"])
-                    else "N/A",
-                    "running_balance": round(
-                        row["RunningBalance"], config.CURRENCY_PRECISION
-                    ),
-                    "transaction_id": row["TransactionID"],
-                    "description": row.get("Description", "N/A"),
-                }
-            )
-    analytics["potential_liquidity_strain_points"] = liquidity_issues
+    analytics["potential_liquidity_strain_points"] = liquidity_strain_points(
+        valid_dates_ledger, config
+    )
+    analytics["liquidity_strain_episodes"] = liquidity_strain_episodes(
+        valid_dates_ledger, config
+    )
 
     expense_only_df = valid_dates_ledger[
         (valid_dates_ledger["TransactionType"] == "EXPENSE")
@@ -226,6 +382,8 @@ def perform_advanced_analytics(
         if len(monthly_shared_spending) >= 3:
             x = np.arange(len(monthly_shared_spending))
             y = monthly_shared_spending.values
+            from scipy import stats
+
             slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
             analytics["monthly_shared_spending_trend"] = {
                 "slope_per_month": round(slope, config.CURRENCY_PRECISION),
@@ -278,10 +436,16 @@ def perform_advanced_analytics(
             "message": "No data for forecast."
         }
 
-    if "RunningBalance" in valid_dates_ledger.columns:
-        month_end_balances = valid_dates_ledger.resample("ME", on="Date")[
-            "RunningBalance"
-        ].last()
+    if {"RunningBalance", "BalanceImpact"} <= set(master_ledger.columns):
+        # Prefix sums over the whole ledger (undated rows included, as in
+        # RunningBalance), reported for the months that have transactions
+        month_end_balances = BalanceIndex.from_ledger(
+            master_ledger, precision=config.CURRENCY_PRECISION
+        ).month_end_series()
+        active_months = valid_dates_ledger["Date"].dt.to_period("M").unique()
+        month_end_balances = month_end_balances[
+            month_end_balances.index.to_period("M").isin(active_months)
+        ]
         if not month_end_balances.empty:
             analytics["month_end_running_balance_stats"] = {
                 "mean": round(month_end_balances.mean(), config.CURRENCY_PRECISION),
@@ -384,10 +548,16 @@ def comprehensive_risk_assessment(
         and analytics_results["potential_liquidity_strain_points"]
     ):
         strain_count = len(analytics_results["potential_liquidity_strain_points"])
+        episodes = analytics_results.get("liquidity_strain_episodes", [])
+        episode_note = (
+            f" {len(episodes)} sustained episode(s) of {config.LIQUIDITY_STRAIN_DAYS}+ days, longest {max(e['duration_days'] for e in episodes)} days."
+            if episodes
+            else ""
+        )
         risks["details"].append(
             {
                 "risk_type": "Liquidity Strain",
-                "assessment": f"{strain_count} instance(s) where running balance exceeded ${config.LIQUIDITY_STRAIN_THRESHOLD:,.0f}. Regular settlements advised.",
+                "assessment": f"{strain_count} instance(s) where running balance exceeded ${config.LIQUIDITY_STRAIN_THRESHOLD:,.0f}. Regular settlements advised.{episode_note}",
                 "level": "HIGH"
                 if strain_count > 3
                 else "MEDIUM"
@@ -0,0 +1,317 @@
+"""
+balances.py
+
+Running balance primitives shared by the master ledger and reconciliation.
+baseline_analyzer is a standalone package and keeps its own copy of the ones
+it uses (``baseline_analyzer.balances``).
+
+Balances are accumulated with ``np.cumsum``, which adds sequentially and so
+gives exactly the totals of a row-by-row float loop. Rounding goes through
+:func:`round_money`, whose result equals
+``Decimal(x).quantize(Decimal("0.01"), ROUND_HALF_EVEN)`` on the stored
+binary value (the builtin ``round`` semantics). ``np.round`` scales before
+rounding and can turn a value that sits just off a half cent into a tie,
+e.g. ``np.round(-0.005, 2) == -0.0`` while ``round(-0.005, 2) == -0.01``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Anything within a few ulps of a half unit after scaling may have been
+# nudged onto (or off) the tie by the scaling itself.
+_TIE_ULPS = 4
+
+
+def round_money(values: np.ndarray | pd.Series | float, ndigits: int = 2) -> np.ndarray:
+    """Element-wise builtin ``round(x, ndigits)`` for float arrays.
+
+    Values are rounded with ``np.round``; only the elements that land within
+    a few ulps of a half unit after scaling are re-rounded with the builtin.
+    """
+    values = np.asarray(values, dtype=float)
+    flat = values.reshape(-1)
+    out = np.round(flat, ndigits)
+    scaled = flat * 10.0**ndigits
+    distance = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    near_tie = distance <= np.maximum(_TIE_ULPS * np.spacing(np.abs(scaled)), 1e-9)
+    if near_tie.any():
+        out[near_tie] = [round(v, ndigits) for v in flat[near_tie].tolist()]
+    return out.reshape(values.shape)
+
+
+def running_balance(
+    amounts: pd.Series | np.ndarray,
+    *,
+    opening: float = 0.0,
+    precision: int = 2,
+) -> pd.Series:
+    """Rounded running total of ``amounts`` starting from ``opening``.
+
+    Accumulation is unrounded; only the reported balances are rounded, so
+    rounding error never compounds. NaN propagates like it does in a plain
+    float loop.
+    """
+    index = amounts.index if isinstance(amounts, pd.Series) else None
+    values = np.asarray(amounts, dtype=float)
+    totals = np.cumsum(np.concatenate(([opening], values)))[1:]
+    return pd.Series(round_money(totals, precision), index=index, dtype=float)
+
+
+def final_balance(
+    amounts: pd.Series | np.ndarray, *, opening: float = 0.0, precision: int = 2
+) -> float:
+    """Last value :func:`running_balance` would report (``opening`` if empty)."""
+    values = np.asarray(amounts, dtype=float)
+    total = float(np.cumsum(np.concatenate(([opening], values)))[-1])
+    return float(round_money(total, precision))
+
+
+def party_running_balances(
+    amounts: pd.Series | np.ndarray,
+    parties: pd.Series | Sequence[str],
+    names: Sequence[str] | None = None,
+    *,
+    precision: int = 2,
+) -> pd.DataFrame:
+    """Running balance of every party at every row, one column per party.
+
+    Row ``i`` of column ``p`` is the rounded sum of all ``amounts`` up to and
+    including row ``i`` whose party is ``p``. This is a masked cumulative sum:
+    each amount is scattered into its party's column of an ``n x parties``
+    matrix and the matrix is summed down its rows in one ``np.cumsum`` call.
+    ``names`` fixes the parties (and column order); rows for other parties
+    do not move any balance. By default every party seen is included, in
+    order of first appearance.
+    """
+    index = amounts.index if isinstance(amounts, pd.Series) else None
+    values = np.asarray(amounts, dtype=float)
+    parties = pd.Series(np.asarray(parties, dtype=object))
+    if names is None:
+        names = list(pd.unique(parties.dropna()))
+    codes = pd.Categorical(parties, categories=list(names)).codes
+    matched = np.flatnonzero(codes >= 0)
+
+    matrix = np.zeros((len(values), len(names)))
+    matrix[matched, codes[matched]] = values[matched]
+    balances = round_money(np.cumsum(matrix, axis=0), precision)
+    return pd.DataFrame(balances, index=index, columns=list(names))
+
+
+_NAT_TICK = np.iinfo("i8").min
+
+
+def _as_datetime64(values: Any) -> np.ndarray:
+    """Dates as ``datetime64[ns]`` int64 ticks; NaT sorts before every date."""
+    dates = pd.to_datetime(pd.Series(values), errors="coerce")
+    return dates.to_numpy("datetime64[ns]").view("i8")
+
+
+def _encode(values: pd.Series, labels: list[str]) -> np.ndarray:
+    """Codes of ``values`` in ``labels``, appending labels not seen before."""
+    values = values.astype(object).where(values.notna(), "")
+    labels.extend(v for v in pd.unique(values) if v not in labels)
+    return pd.Categorical(values, categories=labels).codes.astype(np.intp)
+
+
+def _reserve(buffer: np.ndarray, rows: int, width: int | None = None) -> np.ndarray:
+    """``buffer`` with room for ``rows`` rows (and ``width`` columns).
+
+    Both dimensions grow by doubling, so filling a buffer one batch at a
+    time copies each element a constant number of times on average.
+    """
+    shape = list(buffer.shape)
+    if shape[0] >= rows and (width is None or shape[1] >= width):
+        return buffer
+    if shape[0] < rows:
+        shape[0] = max(rows, 2 * shape[0])
+    if width is not None and shape[1] < width:
+        shape[1] = max(width, 2 * shape[1])
+    grown = np.zeros(shape, dtype=buffer.dtype)
+    grown[tuple(slice(0, n) for n in buffer.shape)] = buffer
+    return grown
+
+
+class BalanceIndex:
+    """Prefix sums over a master ledger for balance-as-of-date queries.
+
+    Rows are kept in date order (NaT first, like ``create_master_ledger``)
+    with the cumulative ``BalanceImpact`` and per-payer and per-category
+    cumulative matrices, each with a leading zero row. A balance on a date
+    is one ``np.searchsorted`` plus a lookup, and a range total is the
+    difference of two lookups, so repeated dashboard or dispute queries do
+    not rescan the ledger. The arrays live in capacity-doubling buffers:
+    :meth:`append` writes new rows into spare capacity and only recomputes
+    the suffix after the earliest backdated row.
+    """
+
+    _ROW_ARRAYS = ("_dates", "_amounts", "_payer_codes", "_category_codes")
+
+    def __init__(
+        self,
+        *,
+        date_col: str = "Date",
+        amount_col: str = "BalanceImpact",
+        payer_col: str = "Payer",
+        category_col: str = "TransactionType",
+        precision: int = 2,
+    ) -> None:
+        self.date_col = date_col
+        self.amount_col = amount_col
+        self.payer_col = payer_col
+        self.category_col = category_col
+        self.precision = precision
+        self.payers: list[str] = []
+        self.categories: list[str] = []
+        self._size = 0
+        # Backing buffers; the attributes of the same name are views of the
+        # filled part (see _expose)
+        self._buffers = {
+            "_dates": np.empty(0, dtype="i8"),
+            "_amounts": np.empty(0),
+            "_payer_codes": np.empty(0, dtype=np.intp),
+            "_category_codes": np.empty(0, dtype=np.intp),
+            "_cum": np.zeros(1),
+            "_cum_payer": np.zeros((1, 0)),
+            "_cum_category": np.zeros((1, 0)),
+        }
+        self._expose()
+
+    @classmethod
+    def from_ledger(cls, ledger: pd.DataFrame, **kwargs: Any) -> BalanceIndex:
+        """Build the index from a master ledger (or any frame of impacts)."""
+        index = cls(**kwargs)
+        index.append(ledger)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _expose(self) -> None:
+        n = self._size
+        for name in self._ROW_ARRAYS:
+            setattr(self, name, self._buffers[name][:n])
+        self._cum = self._buffers["_cum"][: n + 1]
+        self._cum_payer = self._buffers["_cum_payer"][: n + 1, : len(self.payers)]
+        self._cum_category = self._buffers["_cum_category"][
+            : n + 1, : len(self.categories)
+        ]
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def append(self, rows: pd.DataFrame) -> None:
+        """Add ledger rows; appending after the last date is amortized O(len(rows)).
+
+        Rows sharing a date keep their order, with new rows after existing ones.
+        A backdated row costs the rows after it, and a new payer or category
+        may widen its cumulative matrix.
+        """
+        if rows.empty:
+            return
+        blank = pd.Series("", index=rows.index)
+        new = {
+            "_dates": _as_datetime64(rows[self.date_col]),
+            "_amounts": pd.to_numeric(rows[self.amount_col], errors="coerce")
+            .fillna(0.0)
+            .to_numpy(dtype=float),
+            "_payer_codes": _encode(rows.get(self.payer_col, blank), self.payers),
+            "_category_codes": _encode(
+                rows.get(self.category_col, blank), self.categories
+            ),
+        }
+        n = self._size
+        end = n + len(rows)
+
+        # Existing rows dated after the earliest new row are re-sorted with it
+        start = int(np.searchsorted(self._dates, new["_dates"].min(), side="right"))
+        order = np.argsort(
+            np.concatenate([self._dates[start:], new["_dates"]]), kind="stable"
+        )
+        for name, values in new.items():
+            buffer = _reserve(self._buffers[name], end)
+            buffer[start:end] = np.concatenate([buffer[start:n], values])[order]
+            self._buffers[name] = buffer
+
+        cum = _reserve(self._buffers["_cum"], end + 1)
+        cum[start : end + 1] = np.cumsum(
+            np.r_[cum[start], self._buffers["_amounts"][start:end]]
+        )
+        self._buffers["_cum"] = cum
+        for name, codes, width in (
+            ("_cum_payer", "_payer_codes", len(self.payers)),
+            ("_cum_category", "_category_codes", len(self.categories)),
+        ):
+            self._buffers[name] = self._recompute(
+                _reserve(self._buffers[name], end + 1, width),
+                self._buffers[codes][start:end],
+                start,
+                width,
+            )
+        self._size = end
+        self._expose()
+
+    def _recompute(
+        self, cum: np.ndarray, codes: np.ndarray, start: int, width: int
+    ) -> np.ndarray:
+        """Recompute the rows of a cumulative matrix after ``start`` in place."""
+        end = start + len(codes)
+        matrix = np.zeros((len(codes) + 1, width))
+        matrix[0] = cum[start, :width]
+        matrix[np.arange(1, len(matrix)), codes] = self._buffers["_amounts"][start:end]
+        cum[start : end + 1, :width] = np.cumsum(matrix, axis=0)
+        return cum
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _position(self, date: Any, side: str = "right") -> int:
+        tick = _as_datetime64([date])[0]
+        return int(np.searchsorted(self._dates, tick, side=side))
+
+    def balance_at(self, date: Any) -> float:
+        """Running balance after every row dated on or before ``date``."""
+        return float(round_money(self._cum[self._position(date)], self.precision))
+
+    def range_total(
+        self, start: Any, end: Any, by: str | None = None
+    ) -> float | dict[str, float]:
+        """Sum of impacts dated ``start`` to ``end`` inclusive.
+
+        ``by="payer"`` or ``by="category"`` returns a dict of totals instead.
+        """
+        lo = self._position(start, side="left")
+        hi = max(self._position(end), lo)
+        if by is None:
+            return float(round_money(self._cum[hi] - self._cum[lo], self.precision))
+        if by == "payer":
+            cum, labels = self._cum_payer, self.payers
+        elif by == "category":
+            cum, labels = self._cum_category, self.categories
+        else:
+            raise ValueError(f"by must be None, 'payer' or 'category', not {by!r}")
+        totals = round_money(cum[hi] - cum[lo], self.precision)
+        return dict(zip(labels, totals.tolist(), strict=True))
+
+    def month_end_series(self) -> pd.Series:
+        """Balance at each month end from the first to the last dated row."""
+        dated = self._dates[self._dates != _NAT_TICK]
+        if not len(dated):
+            return pd.Series(dtype=float, name="RunningBalance")
+        month_ends = pd.date_range(
+            pd.Timestamp(dated[0]).normalize() + pd.offsets.MonthEnd(0),
+            pd.Timestamp(dated[-1]).normalize() + pd.offsets.MonthEnd(0),
+            freq="ME",
+        )
+        # Everything before the first instant of the following month
+        cutoffs = (month_ends + pd.Timedelta(days=1)).to_numpy("datetime64[ns]")
+        positions = np.searchsorted(self._dates, cutoffs.view("i8"), side="left")
+        return pd.Series(
+            round_money(self._cum[positions], self.precision),
+            index=month_ends,
+            name="RunningBalance",
+        )
@@ -15,18 +15,21 @@ if os.name == "nt":  # Windows cmd/PowerShell default is cp1252
 
 from .analytics import comprehensive_risk_assessment, perform_advanced_analytics
 from .config import AnalysisConfig, load_rules
-from .ledger import create_master_ledger
+from .debug_snapshots import DebugSnapshotWriter
+from .ledger import (
+    LedgerAggregates,
+    append_to_master_ledger,
+    create_master_ledger,
+    load_master_ledger,
+    save_master_ledger,
+)
 from .loaders import DataLoaderV23, merge_expense_and_ledger_data, merge_rent_data
 from .logging_config import configure_logging, get_logger
+from .output_profiles import DEFAULT_OUTPUTS, parse_outputs, resolve_output_plan
 from .outputs import generate_all_outputs
 from .processing import expense_pipeline, rent_pipeline
-from .recon import triple_reconciliation
-from .viz import (
-    build_design_theme,
-    build_monthly_shared_trend,
-    build_running_balance_timeline,
-    build_waterfall_category_impact,
-)
+from .recon import triple_reconciliation, triple_reconciliation_from_aggregates
+from .utils import enable_copy_on_write
 
 # Configure logging for the CLI entry point (only if not already configured)
 configure_logging(
@@ -47,6 +50,31 @@ def run_analysis_pipeline(
     """
     Orchestrates the full financial analysis pipeline.
     """
+    # P0 Blueprint: debug_mode Flag - Parquet snapshots written in the background
+    snapshots = DebugSnapshotWriter.from_config(config)
+    try:
+        _run_analysis_pipeline(
+            expense_file,
+            ledger_file,
+            rent_alloc_file,
+            rent_hist_file,
+            config,
+            snapshots,
+        )
+    finally:
+        # Queued snapshots are written and the writer thread stopped on failure too
+        if snapshots:
+            snapshots.close()
+
+
+def _run_analysis_pipeline(
+    expense_file: Path,
+    ledger_file: Path,
+    rent_alloc_file: Path,
+    rent_hist_file: Path,
+    config: AnalysisConfig,
+    snapshots: DebugSnapshotWriter | None,
+):
     logger.info("Starting analysis pipeline via CLI...")
 
     # --- 0. Initialize ---
@@ -57,10 +85,11 @@ def run_analysis_pipeline(
     # validation_summary for various checks
     validation_summary = {}
 
-    # Build design theme for visualizations
-    # This theme object can be passed to Plotly-based visualization functions.
-    # Matplotlib styling is global via plt.rcParams.
-    plotly_theme = build_design_theme(logger_instance=logger)
+    # Only the stages needed for the requested outputs are computed.
+    plan = resolve_output_plan(config.outputs)
+    logger.info(
+        f"Output plan: outputs={sorted(plan.outputs)} stages={sorted(plan.stages)}"
+    )
 
     # --- 1. Load Data ---
     logger.info("Stage 1: Loading data...")
@@ -73,25 +102,11 @@ def run_analysis_pipeline(
     data_sources_summary = loader.validate_loaded_data(
         expense_hist_raw, transaction_ledger_raw, rent_alloc_raw, rent_hist_raw
     )
-    # P0 Blueprint: debug_mode Flag - Snapshot CSVs
-    if config.debug_mode:
-        output_dir = Path("debug_output")
-        output_dir.mkdir(exist_ok=True)
-        if not expense_hist_raw.empty:
-            expense_hist_raw.to_csv(
-                output_dir / "01a_expense_history_raw.csv", index=False
-            )
-        if not transaction_ledger_raw.empty:
-            transaction_ledger_raw.to_csv(
-                output_dir / "01b_transaction_ledger_raw.csv", index=False
-            )
-        if not rent_alloc_raw.empty:
-            rent_alloc_raw.to_csv(
-                output_dir / "01c_rent_allocation_raw.csv", index=False
-            )
-        if not rent_hist_raw.empty:
-            rent_hist_raw.to_csv(output_dir / "01d_rent_history_raw.csv", index=False)
-        logger.info("Debug mode: Raw data snapshots saved to debug_output/")
+    if snapshots:
+        snapshots.snapshot("01a_expense_history_raw", expense_hist_raw)
+        snapshots.snapshot("01b_transaction_ledger_raw", transaction_ledger_raw)
+        snapshots.snapshot("01c_rent_allocation_raw", rent_alloc_raw)
+        snapshots.snapshot("01d_rent_history_raw", rent_hist_raw)
 
     if expense_hist_raw.empty and transaction_ledger_raw.empty:
         logger.error(
@@ -109,16 +124,9 @@ def run_analysis_pipeline(
         rent_alloc_raw, rent_hist_raw
     )  # Contains budget info
 
-    if config.debug_mode:
-        if not merged_expenses_ledger.empty:
-            merged_expenses_ledger.to_csv(
-                output_dir / "02a_merged_expenses_ledger.csv", index=False
-            )
-        if not merged_rent_data_full.empty:
-            merged_rent_data_full.to_csv(
-                output_dir / "02b_merged_rent_data_full.csv", index=False
-            )
-        logger.info("Debug mode: Merged data snapshots saved.")
+    if snapshots:
+        snapshots.snapshot("02a_merged_expenses_ledger", merged_expenses_ledger)
+        snapshots.snapshot("02b_merged_rent_data_full", merged_rent_data_full)
 
     # --- 3. Load Rules and Process Data ---
     logger.info("Stage 3: Loading rules and processing data...")
@@ -157,6 +165,7 @@ def run_analysis_pipeline(
         rules,
         data_quality_issues_list,
         logger_instance=logger,
+        snapshots=snapshots,
     )
     processed_rent = rent_pipeline(
         merged_rent_data_full,
@@ -164,33 +173,59 @@ def run_analysis_pipeline(
         rules,
         data_quality_issues_list,
         logger_instance=logger,
+        snapshots=snapshots,
     )
 
     # Final expense processing snapshot
-    if config.debug_mode:
-        if not processed_expenses.empty:
-            processed_expenses.to_csv(
-                output_dir / "03a_processed_expenses.csv", index=False
-            )
-        if not processed_rent.empty:
-            processed_rent.to_csv(output_dir / "03b_processed_rent.csv", index=False)
-        logger.info("Debug mode: Final processed data snapshots saved.")
+    if snapshots:
+        snapshots.snapshot("03a_processed_expenses", processed_expenses)
+        snapshots.snapshot("03b_processed_rent", processed_rent)
 
     # --- 4. Build Master Ledger ---
     logger.info("Stage 4: Building master ledger...")
-    master_ledger_df = create_master_ledger(
-        processed_rent, processed_expenses, config, logger_instance=logger
+    ledger_aggregates = None
+    stored = (
+        load_master_ledger(config.master_ledger_store, logger_instance=logger)
+        if config.master_ledger_store
+        else None
     )
+    if stored is not None:
+        # Only rows not yet in the stored ledger are sequenced and summed.
+        master_ledger_df, ledger_aggregates = append_to_master_ledger(
+            stored[0],
+            processed_rent,
+            processed_expenses,
+            config,
+            aggregates=stored[1],
+            logger_instance=logger,
+        )
+    else:
+        master_ledger_df = create_master_ledger(
+            processed_rent, processed_expenses, config, logger_instance=logger
+        )
+    if config.master_ledger_store and not master_ledger_df.empty:
+        if ledger_aggregates is None:
+            ledger_aggregates = LedgerAggregates.from_ledger(master_ledger_df)
+        save_master_ledger(
+            master_ledger_df, config.master_ledger_store, ledger_aggregates
+        )
 
-    if config.debug_mode and not master_ledger_df.empty:
-        master_ledger_df.to_csv(output_dir / "04_master_ledger.csv", index=False)
-        logger.info("Debug mode: Master ledger snapshot saved.")
+    if snapshots:
+        # The remaining writes overlap reconciliation and output generation
+        snapshots.snapshot("04_master_ledger", master_ledger_df)
 
     # --- 5. Reconciliation & Analytics ---
     logger.info("Stage 5: Performing reconciliation and analytics...")
-    reconciliation_results = triple_reconciliation(
-        master_ledger_df, config, logger_instance=logger
-    )
+    reconciliation_results = {}
+    if plan.needs("reconciliation"):
+        if ledger_aggregates is not None:
+            reconciliation_results = triple_reconciliation_from_aggregates(
+                ledger_aggregates, config, logger_instance=logger
+            )
+        else:
+            reconciliation_results = triple_reconciliation(
+                master_ledger_df, config, logger_instance=logger
+            )
 
     # Perform validation against ledger if data available
     if (
@@ -218,9 +253,11 @@ def run_analysis_pipeline(
     )
 
     # Pass processed_rent_df to analytics for rent budget analysis
-    analytics_results = perform_advanced_analytics(
-        master_ledger_df, processed_rent, config, logger_instance=logger
-    )
+    analytics_results = {}
+    if plan.needs("analytics"):
+        analytics_results = perform_advanced_analytics(
+            master_ledger_df, processed_rent, config, logger_instance=logger
+        )
     analytics_results["data_sources_summary"] = (
         data_sources_summary  # Add this for reporting
     )
@@ -228,13 +265,15 @@ def run_analysis_pipeline(
         validation_summary  # Add validation summary for reporting
     )
 
-    risk_assessment_results = comprehensive_risk_assessment(
-        master_ledger_df,
-        analytics_results,
-        validation_summary,
-        config,
-        logger_instance=logger,
-    )
+    risk_assessment_results = {}
+    if plan.needs("risk"):
+        risk_assessment_results = comprehensive_risk_assessment(
+            master_ledger_df,
+            analytics_results,
+            validation_summary,
+            config,
+            logger_instance=logger,
+        )
 
     # --- 6. Generate Visualizations ---
     logger.info("Stage 6: Generating visualizations...")
@@ -246,7 +285,22 @@ def run_analysis_pipeline(
 
     # Example calls (these will need the data and config they depend on)
     # Some visualizations might depend on analytics_results too.
-    if not master_ledger_df.empty:
+    if not plan.needs("visualizations"):
+        logger.info("No visual outputs requested, skipping visualization generation.")
+    elif not master_ledger_df.empty:
+        # matplotlib/plotly are only imported when charts are actually needed.
+        from .viz import (
+            build_design_theme,
+            build_monthly_shared_trend,
+            build_running_balance_timeline,
+            build_waterfall_category_impact,
+        )
+
+        # Build design theme for visualizations
+        # This theme object can be passed to Plotly-based visualization functions.
+        # Matplotlib styling is global via plt.rcParams.
+        plotly_theme = build_design_theme(logger_instance=logger)
+
         try:
             path, alt = build_running_balance_timeline(
                 master_ledger_df.copy(), config, Path("analysis_output"), logger
@@ -377,11 +431,23 @@ def main_cli():
         "--rent_baseline", type=float, help="Baseline monthly rent amount"
     )
     parser.add_argument(
-        "--debug_mode", action="store_true", help="Enable debug mode for snapshot CSVs."
+        "--debug_mode", action="store_true", help="Enable debug mode for Parquet stage snapshots."
+    )
+    parser.add_argument(
+        "--outputs",
+        default=",".join(DEFAULT_OUTPUTS),
+        help="Comma separated outputs or profiles to generate "
+        "(e.g. 'recon,ledger-csv', 'nightly', 'all').",
+    )
+    parser.add_argument(
+        "--ledger-store",
+        help="Parquet file holding the master ledger between runs; new "
+        "transactions are appended instead of rebuilding the ledger.",
     )
     # Add other config params as needed
 
     args = parser.parse_args()
+    enable_copy_on_write()
 
     config = AnalysisConfig()
     if args.ryan_pct is not None:
@@ -392,6 +458,13 @@ def main_cli():
         config.RENT_BASELINE = args.rent_baseline
     if args.debug_mode:
         config.debug_mode = True
+    if args.ledger_store:
+        config.master_ledger_store = args.ledger_store
+    try:
+        config.outputs = parse_outputs(args.outputs)
+    except ValueError as e:
+        logger.critical(f"Configuration Error: {e}")
+        sys.exit(1)
 
     if not np.isclose(config.RYAN_PCT + config.JORDYN_PCT, 1.0):
         logger.critical(
@@ -7,6 +7,8 @@ import re
 
 import pandas as pd
 
+from .utils import copy_on_write
+
 # Canonical Transaction Schema - all loaders must return this exact schema
 CTS = [
     "date",
@@ -69,6 +71,7 @@ def parse_money(value) -> float:
         return 0.0
 
 
+@copy_on_write
 def normalize_cols(df: pd.DataFrame, source_file: str) -> pd.DataFrame:
     """
     Normalize any DataFrame to conform to Canonical Transaction Schema (CTS).
@@ -87,8 +90,8 @@ def normalize_cols(df: pd.DataFrame, source_file: str) -> pd.DataFrame:
             empty_df[col] = empty_df[col].astype("float64")
         return empty_df
 
-    # Make a copy to avoid modifying original
-    result = df.copy()
+    # Lazy copy (copy-on-write): the original is never modified
+    result = df.copy(deep=False)
 
     # Step 1: Normalize column names (lowercase, strip whitespace)
     result.columns = [str(c).strip().lower() for c in result.columns]
@@ -123,7 +126,7 @@ def normalize_cols(df: pd.DataFrame, source_file: str) -> pd.DataFrame:
     result = result.loc[:, ~result.columns.duplicated()]
 
     # Step 8: Return only CTS columns in correct order
-    return result[CTS].copy()
+    return result[CTS]
 
 
 def validate_cts_compliance(df: pd.DataFrame) -> bool:
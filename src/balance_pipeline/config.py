@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import sys
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
 from typing import Any
@@ -11,6 +11,8 @@ from typing import Any
 import yaml
 from dotenv import load_dotenv
 
+from .output_profiles import DEFAULT_OUTPUTS
+
 # Load environment variables
 load_dotenv()
 
@@ -123,7 +125,15 @@ class AnalysisConfig:
 
     # P0: Observability Enhancement from Blueprint
     debug_mode: bool = False
+    # Debug snapshots: rows kept per stage (None keeps all) and, per stage
+    # name, the columns to keep
+    debug_sample_rows: int | None = None
+    debug_snapshot_columns: dict[str, list[str]] = field(default_factory=dict)
     external_business_rules_yaml_path: str = "config/business_rules.yml"
+    # Output names or profiles to produce, see output_profiles.OUTPUT_PROFILES
+    outputs: tuple[str, ...] = DEFAULT_OUTPUTS
+    # Persisted master ledger (Parquet) to append to instead of rebuilding
+    master_ledger_store: str | None = None
 
 
 class DataQualityFlag(Enum):
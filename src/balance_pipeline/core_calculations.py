@@ -19,6 +19,12 @@ from typing import TYPE_CHECKING, Any
 
 import pandas as pd
 
+from balance_pipeline.recon import (
+    calc_m2_fair_share,
+    calc_m3_category_sum,
+    shared_totals,
+)
+
 if TYPE_CHECKING:  # pragma: no cover - used only for typing
     AnalysisConfig = Any
 else:  # pragma: no cover - runtime import
@@ -63,8 +69,8 @@ class CoreCalculator:
             master_ledger["RunningBalance"].iloc[-1] if not master_ledger.empty else 0.0
         )
 
-        shared_only = master_ledger[master_ledger["IsShared"]].copy()
-        if shared_only.empty:
+        shared_totals_table = shared_totals(master_ledger)
+        if shared_totals_table.empty:
             method2_balance = 0.0
             method3_balance = 0.0
             total_shared_amount = 0.0
@@ -74,50 +80,26 @@ class CoreCalculator:
             jordyn_actually_paid_for_shared = 0.0
             category_balances_info: list[dict[str, Any]] = []
         else:
-            total_shared_amount = shared_only["AllowedAmount"].sum()
-            ryan_total_fair_share = total_shared_amount * self.config.RYAN_PCT
+            m2_result = calc_m2_fair_share(
+                master_ledger, self.config, shared_totals_table
+            )
+            total_shared_amount = m2_result["total_shared"]
+            ryan_total_fair_share = m2_result["ryan_fair_share"]
             jordyn_total_fair_share = total_shared_amount * self.config.JORDYN_PCT
+            ryan_actually_paid_for_shared = m2_result["ryan_actually_paid"]
+            jordyn_actually_paid_for_shared = float(
+                shared_totals_table.get("jordyn", pd.Series(dtype=float)).sum()
+            )
+            method2_balance = m2_result["variance"]
 
-            ryan_actually_paid_for_shared = shared_only[
-                shared_only["Payer"].str.lower() == "ryan"
-            ]["AllowedAmount"].sum()
-            jordyn_actually_paid_for_shared = shared_only[
-                shared_only["Payer"].str.lower() == "jordyn"
-            ]["AllowedAmount"].sum()
-
-            method2_balance = ryan_actually_paid_for_shared - ryan_total_fair_share
-
-            category_balances_info = []
-            method3_balance_accumulator = 0.0
-            for trans_type in ["RENT", "EXPENSE"]:
-                type_data = shared_only[shared_only["TransactionType"] == trans_type]
-                if not type_data.empty:
-                    type_total_shared = type_data["AllowedAmount"].sum()
-                    type_ryan_fair_share_cat = type_total_shared * self.config.RYAN_PCT
-
-                    type_ryan_paid_cat = type_data[
-                        type_data["Payer"].str.lower() == "ryan"
-                    ]["AllowedAmount"].sum()
-                    type_jordyn_paid_cat = type_data[
-                        type_data["Payer"].str.lower() == "jordyn"
-                    ]["AllowedAmount"].sum()
-
-                    type_ryan_variance_cat = (
-                        type_ryan_paid_cat - type_ryan_fair_share_cat
-                    )
-                    method3_balance_accumulator += type_ryan_variance_cat
-
-                    category_balances_info.append(
-                        {
-                            "Category": trans_type,
-                            "TotalShared": round(type_total_shared, 2),
-                            "RyanPaidShared": round(type_ryan_paid_cat, 2),
-                            "JordynPaidShared": round(type_jordyn_paid_cat, 2),
-                            "RyanFairShare": round(type_ryan_fair_share_cat, 2),
-                            "RyanVarianceForCategory": round(type_ryan_variance_cat, 2),
-                        }
-                    )
-            method3_balance = method3_balance_accumulator
+            m3_result = calc_m3_category_sum(
+                master_ledger,
+                self.config,
+                shared_totals_table,
+                categories=["RENT", "EXPENSE"],
+            )
+            category_balances_info = m3_result["category_details"]
+            method3_balance = m3_result["variance"]
 
         tolerance = 0.015
         reconciled_1_2 = abs(method1_balance + method2_balance) <= tolerance
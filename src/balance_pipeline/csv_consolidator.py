@@ -60,6 +60,7 @@ from . import config  # Changed to import config module
 from .config import MERCHANT_LOOKUP_PATH, SCHEMA_REGISTRY_PATH  # Default paths
 from .constants import MASTER_SCHEMA_COLUMNS  # Added import
 from .errors import RecoverableFileError
+from .utils import copy_on_write
 
 
 # Verify consistency between foundation and config for core columns
@@ -500,6 +501,7 @@ def _generate_txn_id(row: pd.Series[Any]) -> str:  # Updated type hint
     return hashlib.sha256(hash_input.encode("utf-8")).hexdigest()[:32]
 
 
+@copy_on_write
 def apply_schema_transformations(
     df: pd.DataFrame,
     schema_rules: dict[str, Any],
@@ -541,7 +543,7 @@ def apply_schema_transformations(
             ],
         )  # Added more potential raw cols
 
-    transformed_df = df.copy()
+    transformed_df = df.copy(deep=False)  # Lazy under copy-on-write
 
     # 1. Header Normalization (of DataFrame columns for mapping)
     # The schema's column_map keys are expected to be raw headers from the source CSV.
@@ -0,0 +1,181 @@
+"""
+Asynchronous debug snapshots.
+
+With ``debug_mode`` on, the pipelines hand every intermediate frame to a
+:class:`DebugSnapshotWriter`. The frame is reduced to the rows and columns
+configured for its stage and written as compressed Parquet on a background
+thread, so a debug run mostly waits on its own work rather than on the disk::
+
+    debug_output/03a_settlements_tagged.parquet
+    debug_output/04_master_ledger.parquet
+
+The handed-over frame is snapshotted at call time: the kept rows are copied
+before queueing. A lazy copy-on-write copy is not enough, since the caller
+may edit the frame in place once its stage has returned.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .config import AnalysisConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = "debug_output"
+
+
+@dataclass(frozen=True)
+class SnapshotSpec:
+    """Rows and columns kept for one stage; ``None`` keeps everything."""
+
+    columns: tuple[str, ...] | None = None
+    sample_rows: int | None = None
+
+
+class DebugSnapshotWriter:
+    """Write stage snapshots as Parquet files on a background thread.
+
+    ``specs`` maps a stage name to its :class:`SnapshotSpec`; stages without
+    an entry use ``default``. Sampled rows are a seeded random subset kept in
+    their original order. At most ``max_pending`` snapshots wait in memory;
+    further calls block until one has been written.
+    """
+
+    def __init__(
+        self,
+        output_dir: str | Path = DEFAULT_SNAPSHOT_DIR,
+        *,
+        specs: Mapping[str, SnapshotSpec] | None = None,
+        default: SnapshotSpec | None = None,
+        compression: str = "zstd",
+        max_pending: int = 4,
+        seed: int = 0,
+    ) -> None:
+        self.output_dir = Path(output_dir)
+        self.specs = dict(specs or {})
+        self.default = default if default is not None else SnapshotSpec()
+        self.compression = compression
+        self.seed = seed
+        self.written: list[Path] = []
+        self._pending: list[Future[Path | None]] = []
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="debug-snapshots"
+        )
+
+    @classmethod
+    def from_config(
+        cls, config: AnalysisConfig, output_dir: str | Path = DEFAULT_SNAPSHOT_DIR
+    ) -> DebugSnapshotWriter | None:
+        """Writer for ``config``'s snapshot settings, or ``None`` unless debugging."""
+        if not config.debug_mode:
+            return None
+        specs = {
+            stage: SnapshotSpec(columns=tuple(columns))
+            for stage, columns in config.debug_snapshot_columns.items()
+        }
+        return cls(
+            output_dir,
+            specs=specs,
+            default=SnapshotSpec(sample_rows=config.debug_sample_rows),
+        )
+
+    def __enter__(self) -> DebugSnapshotWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def spec_for(self, stage: str) -> SnapshotSpec:
+        spec = self.specs.get(stage, self.default)
+        if spec.sample_rows is None and spec is not self.default:
+            # Stage specs inherit the default sampling
+            spec = SnapshotSpec(spec.columns, self.default.sample_rows)
+        return spec
+
+    def snapshot(self, stage: str, df: pd.DataFrame) -> Future[Path | None] | None:
+        """Queue ``df`` for ``<output_dir>/<stage>.parquet``; empty frames are skipped."""
+        if df.empty:
+            logger.debug(f"Debug snapshot '{stage}' skipped: empty frame")
+            return None
+        frame = self._select(df, self.spec_for(stage))
+        self._slots.acquire()
+        future = self._executor.submit(self._write, stage, frame)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append(future)
+        return future
+
+    def flush(self) -> list[Path]:
+        """Wait for every queued snapshot; return the paths written so far."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+        return list(self.written)
+
+    def close(self) -> list[Path]:
+        """Flush and stop the background thread."""
+        written = self.flush()
+        self._executor.shutdown(wait=True)
+        if written:
+            logger.info(
+                f"Debug mode: {len(written)} snapshots saved to {self.output_dir}/"
+            )
+        return written
+
+    def _select(self, df: pd.DataFrame, spec: SnapshotSpec) -> pd.DataFrame:
+        frame = df
+        if spec.columns is not None:
+            frame = frame[[c for c in spec.columns if c in frame.columns]]
+        if spec.sample_rows is not None and len(frame) > spec.sample_rows:
+            rng = np.random.default_rng(self.seed)
+            rows = np.sort(rng.choice(len(frame), spec.sample_rows, replace=False))
+            frame = frame.iloc[rows]
+        # Decouple from the caller's frame before another thread reads it.
+        # Without copy-on-write the selections above are already copies.
+        if frame is df or pd.options.mode.copy_on_write is True:
+            frame = frame.copy(deep=True)
+        return frame
+
+    def _write(self, stage: str, frame: pd.DataFrame) -> Path | None:
+        path = self.output_dir / f"{stage}.parquet"
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".parquet.tmp")
+            try:
+                frame.to_parquet(tmp, index=False, compression=self.compression)
+            except (TypeError, ValueError, ImportError, ArithmeticError) as e:
+                # Mixed-type object columns cannot be stored as one Arrow type
+                logger.debug(f"Debug snapshot '{stage}' stored as text: {e}")
+                text = frame.astype(
+                    dict.fromkeys(frame.select_dtypes("object").columns, "string")
+                )
+                text.to_parquet(tmp, index=False, compression=self.compression)
+            tmp.replace(path)
+        except Exception as e:
+            logger.warning(f"Debug snapshot '{stage}' could not be written: {e}")
+            return None
+        self.written.append(path)
+        return path
+
+
+def snapshot_writer(
+    config: AnalysisConfig, snapshots: DebugSnapshotWriter | None = None
+) -> tuple[DebugSnapshotWriter | None, bool]:
+    """``snapshots`` if given, else a new writer for ``config``.
+
+    The flag tells whether the caller created the writer and must close it.
+    """
+    if snapshots is not None:
+        return snapshots, False
+    snapshots = DebugSnapshotWriter.from_config(config)
+    return snapshots, snapshots is not None
@@ -0,0 +1,199 @@
+"""
+Streaming Excel export for large frames.
+
+``pd.ExcelWriter(engine="openpyxl")`` keeps every cell of the workbook in
+memory until it is saved. :class:`StreamingExcelWriter` uses XlsxWriter's
+``constant_memory`` mode instead: each row is flushed to disk as soon as it
+is written, so memory stays flat however long the ledger grows. Column
+number formats and widths are worked out once per frame from its dtypes and
+a sample of values, and rows are written in chunks. Frames longer than
+Excel's row limit continue on numbered overflow sheets::
+
+    Ledger Highlights, Ledger Highlights (2), ...
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import xlsxwriter
+
+logger = logging.getLogger(__name__)
+
+EXCEL_MAX_ROWS = 1_048_576  # Including the header row
+EXCEL_MAX_SHEET_NAME = 31
+DEFAULT_CHUNK_ROWS = 50_000
+
+MONEY_FORMAT = "#,##0.00"
+INTEGER_FORMAT = "0"
+DATE_FORMAT = "yyyy-mm-dd"
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 60
+
+CELL_TYPES = (str, bool, int, float, dt.date, dt.time, dt.timedelta)
+
+
+@dataclass(frozen=True)
+class ColumnFormat:
+    """Excel number format and width for one column."""
+
+    num_format: str | None
+    width: float
+
+
+def column_formats(df: pd.DataFrame, sample_rows: int = 1000) -> list[ColumnFormat]:
+    """Number format and width for each column of ``df``.
+
+    Widths fit the header and the longest value among the first
+    ``sample_rows`` rows, within ``MIN_COLUMN_WIDTH``..``MAX_COLUMN_WIDTH``.
+    """
+    sample = df.head(sample_rows)
+    formats = []
+    for position, name in enumerate(df.columns):
+        dtype = df.dtypes.iloc[position]
+        values = sample.iloc[:, position]
+        if pd.api.types.is_bool_dtype(dtype):
+            num_format = None
+        elif pd.api.types.is_integer_dtype(dtype):
+            num_format = INTEGER_FORMAT
+        elif pd.api.types.is_float_dtype(dtype):
+            num_format = MONEY_FORMAT
+            values = values.map(lambda v: f"{v:,.2f}", na_action="ignore")
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            has_time = (values.dropna() != values.dropna().dt.normalize()).any()
+            num_format = DATETIME_FORMAT if has_time else DATE_FORMAT
+            values = pd.Series([num_format])
+        else:
+            num_format = None
+        longest = values.dropna().astype(str).str.len().max()
+        longest = 0 if pd.isna(longest) else int(longest)
+        width = max(len(str(name)), longest) + 2
+        formats.append(
+            ColumnFormat(
+                num_format, min(max(width, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+            )
+        )
+    return formats
+
+
+def _sheet_names(name: str, parts: int) -> list[str]:
+    """``name`` followed by numbered overflow names, within Excel's 31 chars."""
+    names = [name[:EXCEL_MAX_SHEET_NAME]]
+    for part in range(2, parts + 1):
+        suffix = f" ({part})"
+        names.append(name[: EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix)
+    return names
+
+
+def _cell_value(value: Any) -> Any:
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if value is None or isinstance(value, CELL_TYPES):
+        return value
+    return str(value)
+
+
+class StreamingExcelWriter:
+    """Write DataFrames to an .xlsx workbook one row at a time.
+
+    Sheets must be written completely, one after another; rows cannot be
+    revisited once flushed. Use as a context manager or call :meth:`close`
+    to finish the file.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        max_rows: int = EXCEL_MAX_ROWS,
+    ) -> None:
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self._workbook = xlsxwriter.Workbook(
+            str(self.path),
+            {
+                "constant_memory": True,
+                # Cell text is data, never formulas or links
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+                "remove_timezone": True,
+            },
+        )
+        self._header = self._workbook.add_format({"bold": True})
+        self._formats: dict[str, Any] = {}
+
+    def __enter__(self) -> StreamingExcelWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._workbook.close()
+
+    def write_frame(self, sheet_name: str, df: pd.DataFrame) -> list[str]:
+        """Write ``df`` with a header row; return the sheet names used.
+
+        Rows past ``max_rows - 1`` continue on overflow sheets, each with
+        its own header.
+        """
+        formats = column_formats(df)
+        rows_per_sheet = self.max_rows - 1
+        parts = max(1, -(-len(df) // rows_per_sheet))
+        names = _sheet_names(sheet_name, parts)
+        if parts > 1:
+            logger.info(
+                f"'{sheet_name}' has {len(df):,} rows; split across {parts} sheets"
+            )
+        for part, name in enumerate(names):
+            start = part * rows_per_sheet
+            self._write_sheet(name, df.iloc[start : start + rows_per_sheet], formats)
+        return names
+
+    def _write_sheet(
+        self, name: str, df: pd.DataFrame, formats: list[ColumnFormat]
+    ) -> None:
+        sheet = self._workbook.add_worksheet(name)
+        for col, fmt in enumerate(formats):
+            sheet.set_column(col, col, fmt.width, self._num_format(fmt.num_format))
+        sheet.freeze_panes(1, 0)
+        sheet.write_row(0, 0, [str(c) for c in df.columns], self._header)
+
+        row = 1
+        for start in range(0, len(df), self.chunk_rows):
+            chunk = df.iloc[start : start + self.chunk_rows]
+            # Missing values become blank cells
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for values in chunk.itertuples(index=False, name=None):
+                try:
+                    sheet.write_row(row, 0, values)
+                except TypeError:
+                    # Objects Excel has no cell type for are written as text
+                    sheet.write_row(row, 0, [_cell_value(v) for v in values])
+                row += 1
+
+    def _num_format(self, num_format: str | None) -> Any:
+        if num_format is None:
+            return None
+        if num_format not in self._formats:
+            self._formats[num_format] = self._workbook.add_format(
+                {"num_format": num_format}
+            )
+        return self._formats[num_format]
+
+
+def write_excel_streaming(
+    df: pd.DataFrame, path: str | Path, sheet_name: str = "Sheet1"
+) -> list[str]:
+    """Write ``df`` to a new workbook at ``path``; return the sheet names used."""
+    with StreamingExcelWriter(path) as writer:
+        return writer.write_frame(sheet_name, df)
@@ -1,29 +1,237 @@
 """
 Thin wrappers for exporting pipeline outputs.
-Currently: Parquet via DuckDB (works on Py 3.13 without PyArrow wheels).
+
+Parquet files are written sorted by ``Date`` then ``Owner`` in bounded row
+groups, so each group's min/max statistics cover a narrow date range and
+:func:`read_parquet_range` can skip groups outside the requested window.
+Key-value metadata records the export schema version and a fingerprint of
+the TxnIDs. PyArrow is used when available, DuckDB otherwise (works on Py
+3.13 without PyArrow wheels).
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import pathlib
+from dataclasses import dataclass
+from typing import Any
 
 import duckdb
 import pandas as pd
 
 log = logging.getLogger(__name__)
 
+# Bump when the exported columns or their meaning change
+PARQUET_SCHEMA_VERSION = "1"
+METADATA_PREFIX = "balance."
+
+
+@dataclass(frozen=True)
+class ParquetOptions:
+    """How :func:`write_parquet` lays out a file."""
+
+    compression: str = "zstd"
+    compression_level: int | None = None
+    row_group_size: int = 65_536
+    # Columns missing from the frame are ignored
+    sort_keys: tuple[str, ...] = ("Date", "Owner")
+
+
+DEFAULT_PARQUET_OPTIONS = ParquetOptions()
+
+
+def txnid_fingerprint(df: pd.DataFrame) -> str | None:
+    """SHA-256 of the sorted TxnIDs, independent of row order."""
+    if "TxnID" not in df.columns:
+        return None
+    ids = df["TxnID"].dropna().astype(str).sort_values(kind="stable")
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+
+
+def _export_metadata(df: pd.DataFrame, options: ParquetOptions) -> dict[str, str]:
+    metadata = {
+        "schema_version": PARQUET_SCHEMA_VERSION,
+        "sort_keys": ",".join(k for k in options.sort_keys if k in df.columns),
+        "row_count": str(len(df)),
+    }
+    fingerprint = txnid_fingerprint(df)
+    if fingerprint is not None:
+        metadata["txnid_fingerprint"] = fingerprint
+    return {METADATA_PREFIX + k: v for k, v in metadata.items()}
+
 
-def write_parquet_duckdb(df: pd.DataFrame, out_path: pathlib.Path) -> None:
+def _sorted(df: pd.DataFrame, options: ParquetOptions) -> pd.DataFrame:
+    keys = [k for k in options.sort_keys if k in df.columns]
+    if not keys:
+        return df
+    return df.sort_values(keys, kind="stable", na_position="last", ignore_index=True)
+
+
+def write_parquet(
+    df: pd.DataFrame,
+    out_path: str | pathlib.Path,
+    options: ParquetOptions | None = None,
+) -> pathlib.Path:
+    """
+    Write *df* to *out_path* sorted, in row groups, with export metadata.
+    Falls back to DuckDB when PyArrow is not installed; either way a failed
+    write raises instead of returning a path that was never written.
+    """
+    out_path = pathlib.Path(out_path)
+    if options is None:
+        options = DEFAULT_PARQUET_OPTIONS
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        log.info("PyArrow unavailable; writing Parquet via DuckDB")
+        _copy_parquet_duckdb(df, out_path, options)
+        return out_path
+
+    table = pa.Table.from_pandas(_sorted(df, options), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update(
+        {k.encode(): v.encode() for k, v in _export_metadata(df, options).items()}
+    )
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    pq.write_table(
+        table.replace_schema_metadata(metadata),
+        tmp,
+        compression=options.compression,
+        compression_level=options.compression_level,
+        row_group_size=options.row_group_size,
+        use_dictionary=True,
+        write_statistics=True,
+    )
+    tmp.replace(out_path)
+    return out_path
+
+
+def write_parquet_duckdb(
+    df: pd.DataFrame,
+    out_path: pathlib.Path,
+    options: ParquetOptions | None = None,
+) -> None:
     """
     Write *df* to *out_path* in Parquet format using DuckDB’s COPY.
     Safe on Py 3.13 because duckdb wheels include Arrow libraries.
+    Best effort: a failure is logged and skipped.
     """
     try:
-        con = duckdb.connect()
-        con.register("txns", df)
-        con.execute(f"COPY txns TO '{out_path}' (FORMAT parquet);")
-        con.close()
+        _copy_parquet_duckdb(df, out_path, options or DEFAULT_PARQUET_OPTIONS)
         log.info("✅ Parquet written via DuckDB → %s", out_path.name)
     except Exception as exc:
         log.warning("⚠️  DuckDB Parquet export skipped (%s)", exc)
+
+
+def _copy_parquet_duckdb(
+    df: pd.DataFrame, out_path: pathlib.Path, options: ParquetOptions
+) -> None:
+    """DuckDB ``COPY`` of *df* to *out_path*; errors propagate."""
+    keys = [k for k in options.sort_keys if k in df.columns]
+    order = f" ORDER BY {', '.join(_quote(k) for k in keys)}" if keys else ""
+    metadata = ", ".join(
+        f"{_literal(k)}: {_literal(v)}"
+        for k, v in _export_metadata(df, options).items()
+    )
+    settings = [
+        "FORMAT parquet",
+        f"COMPRESSION {options.compression}",
+        f"ROW_GROUP_SIZE {options.row_group_size}",
+        f"KV_METADATA {{{metadata}}}",
+    ]
+    if options.compression_level is not None:
+        settings.append(f"COMPRESSION_LEVEL {options.compression_level}")
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    con = duckdb.connect()
+    try:
+        con.register("txns", df)
+        # Sort keys go through _quote and the path and metadata through _literal
+        con.execute(
+            f"COPY (SELECT * FROM txns{order}) TO {_literal(str(tmp))} "  # noqa: S608
+            f"({', '.join(settings)});"
+        )
+    finally:
+        con.close()
+    tmp.replace(out_path)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def read_export_metadata(path: str | pathlib.Path) -> dict[str, str]:
+    """The ``balance.*`` key-value metadata of a Parquet file, unprefixed."""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_metadata(path).metadata or {}
+    return {
+        k.decode()[len(METADATA_PREFIX) :]: v.decode()
+        for k, v in metadata.items()
+        if k.decode().startswith(METADATA_PREFIX)
+    }
+
+
+def _as_timestamp(value: Any) -> pd.Timestamp | None:
+    """Naive timestamp for a bound or a date statistic (str, date or datetime)."""
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize(None) if timestamp.tzinfo else timestamp
+
+
+def read_parquet_range(
+    path: str | pathlib.Path,
+    start: Any = None,
+    end: Any = None,
+    *,
+    date_column: str = "Date",
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Rows of *path* with ``start <= date_column <= end`` (either bound optional).
+
+    Row groups whose min/max statistics fall outside the range are never
+    read, so on a file written by :func:`write_parquet` a narrow window
+    loads only the groups that overlap it.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    start, end = _as_timestamp(start), _as_timestamp(end)
+    if date_column not in parquet_file.schema_arrow.names:
+        raise ValueError(f"{path} has no '{date_column}' column to filter on")
+    position = parquet_file.schema_arrow.get_field_index(date_column)
+
+    groups = []
+    for index in range(parquet_file.metadata.num_row_groups):
+        stats = parquet_file.metadata.row_group(index).column(position).statistics
+        if stats is not None and stats.has_min_max:
+            low, high = _as_timestamp(stats.min), _as_timestamp(stats.max)
+            if (start is not None and high < start) or (end is not None and low > end):
+                continue
+        groups.append(index)
+    log.debug(
+        f"{path}: reading {len(groups)} of "
+        f"{parquet_file.metadata.num_row_groups} row groups"
+    )
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys([*columns, date_column]))
+    df = parquet_file.read_row_groups(groups, columns=read_columns).to_pandas()
+    dates = pd.to_datetime(df[date_column])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= dates >= start
+    if end is not None:
+        mask &= dates <= end
+    df = df[mask].reset_index(drop=True)
+    return df if columns is None else df[columns]
@@ -8,6 +8,7 @@ from typing import Any
 
 import customtkinter as ctk
 import pandas as pd
+from balance_pipeline.excel_streaming import write_excel_streaming
 from balance_pipeline.gui.analysis import AnalysisController
 from balance_pipeline.gui.theme import Theme
 
@@ -57,7 +58,7 @@ class ExportView(ctk.CTkFrame):  # type: ignore[misc]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = Path("output") / f"{prefix}_{timestamp}.xlsx"
         try:
-            data.to_excel(filename, index=False, engine="openpyxl")
+            write_excel_streaming(data, filename)
             messagebox.showinfo(
                 "Export Successful", f"Exported {len(data)} records to:\n{filename}"
             )
@@ -6,14 +6,28 @@ from typing import Any
 import customtkinter as ctk
 import pandas as pd
 from balance_pipeline.gui.theme import Theme
+from balance_pipeline.gui.widgets.table_model import COLUMNS, TableModel
+
+ROW_HEIGHT = 26
 
 
 class DataTable(ctk.CTkFrame):  # type: ignore[misc]
-    """A reusable data table widget using ttk.Treeview."""
+    """
+    A reusable data table widget using ttk.Treeview.
+
+    The table is virtualized: the Treeview only ever holds the rows that fit
+    on screen, and scrolling rewrites their values from the preformatted
+    columns of a :class:`TableModel`. Large frames cost no more Tk memory
+    than small ones. Click a heading to sort by it, again to reverse.
+    """
 
     def __init__(self, master: Any, dataframe: pd.DataFrame, **kwargs: Any) -> None:
         super().__init__(master, **kwargs)
         self.dataframe = dataframe
+        self.model = TableModel(dataframe)
+        self._offset = 0  # Displayed row shown in the first pool item
+        self._selected: int | None = None  # Selected displayed row
+        self._pool: list[str] = []
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -35,7 +49,7 @@ class DataTable(ctk.CTkFrame):  # type: ignore[misc]
             foreground=Theme.text,
             fieldbackground=Theme.dark,
             borderwidth=0,
-            rowheight=26,
+            rowheight=ROW_HEIGHT,
         )
         style.configure(
             "Treeview.Heading",
@@ -51,59 +65,147 @@ class DataTable(ctk.CTkFrame):  # type: ignore[misc]
             foreground=[("selected", Theme.text)],
         )
 
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
+        # The vertical scrollbar moves through the model, not the Treeview
+        self.vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self._yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
 
-        cols = ["Date", "Merchant", "Amount", "Status", "Description"]
-        tree = ttk.Treeview(
+        self.tree = tree = ttk.Treeview(
             tree_frame,
-            columns=cols,
+            columns=[spec.name for spec in COLUMNS],
             show="headings",
-            yscrollcommand=vsb.set,
             xscrollcommand=hsb.set,
             height=12,
             selectmode="browse",
         )
-        vsb.config(command=tree.yview)
         hsb.config(command=tree.xview)
 
-        col_configs: dict[str, dict[str, Any]] = {
-            "Date": {"width": 110, "anchor": "center"},
-            "Merchant": {"width": 220, "anchor": "w"},
-            "Amount": {"width": 110, "anchor": "e"},
-            "Status": {"width": 120, "anchor": "center"},
-            "Description": {"width": 400, "anchor": "w"},
-        }
-        for c in cols:
-            tree.heading(c, text=c)
-            anchor_val = col_configs[c].get("anchor", "w")
-            tree.column(
-                c,
-                width=col_configs[c].get("width", 100),
-                anchor=anchor_val,
-            )
-
-        # Data insertion
-        for i, (_, row) in enumerate(self.dataframe.reset_index(drop=True).iterrows()):
-            status = (
-                "⚠️ Dispute"
-                if row.get("potential_refund")
-                else ("✅ Refund" if row.get("amount", 0) > 0 else "📝 Charge")
+        for spec in COLUMNS:
+            tree.heading(
+                spec.name,
+                text=spec.name,
+                command=lambda name=spec.name: self.sort_by(name),
             )
-            # Ensure values are of a consistent type before formatting
-            date_val = row.get("date")
-            date_str = date_val.strftime("%m/%d/%Y") if pd.notna(date_val) else ""
-            merchant_str = str(row.get("merchant_standardized", ""))[:30]
-            amount_val = row.get("amount", 0.0)
-            amount_str = f"${abs(amount_val):,.2f}"
-            desc_str = str(row.get("description", ""))[:60]
-
-            values = [date_str, merchant_str, amount_str, status, desc_str]
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            tree.insert("", "end", values=values, tags=(tag,))
+            tree.column(spec.name, width=spec.width, anchor=spec.anchor)
 
         tree.tag_configure("evenrow", background=Theme.dark)
         tree.tag_configure("oddrow", background=Theme.card)
         tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
+
+        tree.bind("<Configure>", self._on_resize)
+        tree.bind("<<TreeviewSelect>>", self._on_select)
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda _: self._scroll_rows(-3))
+        tree.bind("<Button-5>", lambda _: self._scroll_rows(3))
+        tree.bind("<Up>", lambda _: self._move_selection(-1))
+        tree.bind("<Down>", lambda _: self._move_selection(1))
+        tree.bind("<Prior>", lambda _: self._move_selection(-len(self._pool)))
+        tree.bind("<Next>", lambda _: self._move_selection(len(self._pool)))
+        tree.bind("<Home>", lambda _: self._move_selection(-self.model.size))
+        tree.bind("<End>", lambda _: self._move_selection(self.model.size))
+
+        self._resize_pool(12)
+
+    # -- public API ------------------------------------------------------------
+
+    def sort_by(self, column: str, descending: bool | None = None) -> None:
+        """Sort the table by ``column``; repeating a column reverses the order."""
+        self.model.sort(column, descending)
+        arrow = " ▼" if self.model.descending else " ▲"
+        for spec in COLUMNS:
+            suffix = arrow if spec.name == column else ""
+            self.tree.heading(spec.name, text=spec.name + suffix)
+        self._selected = None
+        self._offset = 0
+        self._render()
+
+    def selected_row(self) -> pd.Series | None:
+        """The DataFrame row currently selected, if any."""
+        if self._selected is None:
+            return None
+        position = self.model.positions(self._selected, 1)
+        return self.dataframe.iloc[int(position[0])] if len(position) else None
+
+    # -- virtualization --------------------------------------------------------
+
+    def _resize_pool(self, visible_rows: int) -> None:
+        """Grow or shrink the pool of Treeview items to ``visible_rows``."""
+        wanted = min(max(visible_rows, 1), self.model.size)
+        while len(self._pool) < wanted:
+            self._pool.append(self.tree.insert("", "end"))
+        if len(self._pool) > wanted:
+            self.tree.delete(*self._pool[wanted:])
+            del self._pool[wanted:]
+        self._scroll_to(self._offset, force=True)
+
+    def _on_resize(self, event: Any) -> None:
+        # One row's worth of height goes to the headings
+        rows = event.height // ROW_HEIGHT - 1
+        if min(max(rows, 1), self.model.size) != len(self._pool):
+            self._resize_pool(rows)
+
+    def _scroll_to(self, offset: int, *, force: bool = False) -> None:
+        offset = max(0, min(offset, self.model.size - len(self._pool)))
+        if offset != self._offset or force:
+            self._offset = offset
+            self._render()
+
+    def _scroll_rows(self, rows: int) -> str:
+        self._scroll_to(self._offset + rows)
+        return "break"
+
+    def _render(self) -> None:
+        """Write the current window of the model into the item pool."""
+        rows = self.model.window(self._offset, len(self._pool))
+        for i, (iid, values) in enumerate(zip(self._pool, rows, strict=False)):
+            tag = "evenrow" if (self._offset + i) % 2 == 0 else "oddrow"
+            self.tree.item(iid, values=values, tags=(tag,))
+
+        selected = None
+        if self._selected is not None:
+            slot = self._selected - self._offset
+            if 0 <= slot < len(self._pool):
+                selected = self._pool[slot]
+        if selected is None:
+            self.tree.selection_remove(*self.tree.selection())
+        elif self.tree.selection() != (selected,):
+            self.tree.selection_set(selected)
+            self.tree.focus(selected)
+
+        if self.model.size:
+            first = self._offset / self.model.size
+            self.vsb.set(first, first + len(self._pool) / self.model.size)
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def _yview(self, action: str, amount: str, unit: str | None = None) -> None:
+        """Scrollbar command: ``moveto FRACTION`` or ``scroll N units|pages``."""
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * self.model.size))
+        elif action == "scroll":
+            step = len(self._pool) if unit == "pages" else 1
+            self._scroll_to(self._offset + int(amount) * step)
+
+    def _on_mousewheel(self, event: Any) -> str:
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_rows(-3 * notches)
+
+    def _on_select(self, _: Any) -> None:
+        selection = self.tree.selection()
+        if selection and selection[0] in self._pool:
+            self._selected = self._offset + self._pool.index(selection[0])
+
+    def _move_selection(self, rows: int) -> str:
+        if not self.model.size:
+            return "break"
+        current = self._offset if self._selected is None else self._selected
+        self._selected = max(0, min(current + rows, self.model.size - 1))
+        if self._selected < self._offset:
+            self._scroll_to(self._selected, force=True)
+        elif self._selected >= self._offset + len(self._pool):
+            self._scroll_to(self._selected - len(self._pool) + 1, force=True)
+        else:
+            self._render()
+        return "break"
@@ -0,0 +1,133 @@
+"""
+Display model behind :class:`~balance_pipeline.gui.widgets.data_table.DataTable`.
+
+Kept free of Tk so the formatting, windowing and sorting can be used (and
+tested) without a display.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """A displayed table column."""
+
+    name: str
+    width: int
+    anchor: str
+
+
+COLUMNS = (
+    ColumnSpec("Date", 110, "center"),
+    ColumnSpec("Merchant", 220, "w"),
+    ColumnSpec("Amount", 110, "e"),
+    ColumnSpec("Status", 120, "center"),
+    ColumnSpec("Description", 400, "w"),
+)
+
+
+def _distinct(
+    values: pd.Series,
+    format_values: Callable[[pd.Index], pd.Index],
+    sort_key: Callable[[pd.Index], pd.Index] = lambda u: u,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Format each distinct value of ``values`` once and spread the result over
+    the rows; transaction columns repeat heavily. Returns the display strings
+    (blank for missing values) and integer sort keys (missing values last).
+    """
+    codes, uniques = pd.factorize(values)
+    text = np.append(np.asarray(format_values(uniques), dtype=object), "")
+    rank = np.empty(len(uniques) + 1, dtype=np.intp)
+    order = np.argsort(np.asarray(sort_key(uniques)), kind="stable")
+    rank[order] = np.arange(len(uniques))
+    rank[-1] = len(uniques)
+    return text[codes], rank[codes]
+
+
+def _text(df: pd.DataFrame, column: str, width: int) -> tuple[np.ndarray, np.ndarray]:
+    if column not in df.columns:
+        return np.full(len(df), "", dtype=object), np.zeros(len(df), dtype=np.intp)
+    values = df[column].astype("string").str.slice(0, width)
+    return _distinct(values, lambda u: u, lambda u: u.str.lower())
+
+
+class TableModel:
+    """
+    Display strings and sort orders for a transactions DataFrame.
+
+    Every column is formatted once up front, so showing rows is only array
+    indexing. Sorting by a column computes its argsort permutation on the
+    first request and reuses it afterwards (reversed for descending).
+    """
+
+    def __init__(self, dataframe: pd.DataFrame) -> None:
+        self.dataframe = dataframe
+        self.size = len(dataframe)
+
+        if "date" in dataframe.columns:
+            dates = pd.to_datetime(dataframe["date"], errors="coerce")
+            if dates.dt.tz is not None:
+                dates = dates.dt.tz_localize(None)
+        else:
+            dates = pd.Series(pd.NaT, index=dataframe.index, dtype="datetime64[ns]")
+        if "amount" in dataframe.columns:
+            amounts = pd.to_numeric(dataframe["amount"], errors="coerce").fillna(0.0)
+        else:
+            amounts = pd.Series(0.0, index=dataframe.index)
+        if "potential_refund" in dataframe.columns:
+            disputes = dataframe["potential_refund"].eq(True).to_numpy()
+        else:
+            disputes = np.zeros(self.size, dtype=bool)
+        status = np.select(
+            [disputes, amounts.to_numpy() > 0],
+            ["⚠️ Dispute", "✅ Refund"],
+            "📝 Charge",
+        )
+
+        columns = {
+            "Date": _distinct(dates, lambda u: u.strftime("%m/%d/%Y")),
+            "Merchant": _text(dataframe, "merchant_standardized", 30),
+            "Amount": _distinct(amounts.abs(), lambda u: u.map("${:,.2f}".format)),
+            "Status": _distinct(pd.Series(status), lambda u: u),
+            "Description": _text(dataframe, "description", 60),
+        }
+        self.columns = {name: text for name, (text, _) in columns.items()}
+        self._sort_keys = {name: key for name, (_, key) in columns.items()}
+        self._orders: dict[str, np.ndarray] = {}
+        self.order: np.ndarray | None = None  # None: frame order
+        self.sort_column: str | None = None
+        self.descending = False
+
+    def sort(self, column: str, descending: bool | None = None) -> None:
+        """
+        Order rows by ``column``. Without ``descending``, sorting the same
+        column again flips the direction.
+        """
+        if descending is None:
+            descending = column == self.sort_column and not self.descending
+        if column not in self._orders:
+            self._orders[column] = np.argsort(self._sort_keys[column], kind="stable")
+        ascending = self._orders[column]
+        self.order = ascending[::-1] if descending else ascending
+        self.sort_column, self.descending = column, descending
+
+    def positions(self, start: int, count: int) -> np.ndarray:
+        """Frame positions of ``count`` displayed rows from row ``start``."""
+        start = max(start, 0)
+        stop = min(start + max(count, 0), self.size)
+        if self.order is None:
+            return np.arange(start, max(start, stop))
+        return self.order[start:stop]
+
+    def window(self, start: int, count: int) -> list[tuple[str, ...]]:
+        """Display values of ``count`` rows from row ``start`` of the current order."""
+        positions = self.positions(start, count)
+        arrays = [self.columns[spec.name][positions] for spec in COLUMNS]
+        return list(zip(*arrays, strict=True))
@@ -5,8 +5,13 @@ import logging
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from .analytics import duplicate_charge_pairs
+from .export import read_parquet_range
+from .transaction_index import TransactionIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,13 +25,18 @@ class AnalysisController:
     def __init__(self, output_dir: str | Path = "output") -> None:
         self.output_dir = Path(output_dir)
         self.df: pd.DataFrame | None = None
+        self.index: TransactionIndex | None = None
+        self._indexed_df: pd.DataFrame | None = None
 
-    def load_data(self) -> None:
+    def load_data(self, start: Any = None, end: Any = None) -> None:
         """
         Load the latest cleaned transactions dataset from the output directory.
 
         Looks for Parquet first, then CSV. Coerces date dtype, ensures
         required columns exist, and derives 'amount_abs' for convenience.
+        With ``start``/``end``, only transactions dated within the range are
+        kept; for Parquet, row groups outside it are skipped unread. The
+        query index used by the search methods is built here, once.
 
         Raises:
             FileNotFoundError: If no data files are found in the output directory.
@@ -46,17 +56,31 @@ class AnalysisController:
             if parquet_files:
                 latest_file = parquet_files[0]
                 logger.info(f"Loading latest Parquet file: {latest_file.name}")
-                self.df = pd.read_parquet(latest_file)
+                if start is None and end is None:
+                    self.df = pd.read_parquet(latest_file)
+                else:
+                    self.df = read_parquet_range(
+                        latest_file, start, end, date_column="date"
+                    )
             elif csv_files:
                 latest_file = csv_files[0]
                 logger.info(f"Loading latest CSV file: {latest_file.name}")
                 self.df = pd.read_csv(latest_file)
+                if start is not None or end is not None:
+                    dates = pd.to_datetime(self.df["date"], errors="coerce")
+                    self.df = self.df[
+                        dates.between(
+                            pd.Timestamp(start or dates.min()),
+                            pd.Timestamp(end or dates.max()),
+                        )
+                    ].reset_index(drop=True)
             else:
                 raise FileNotFoundError(
                     f"No cleaned data files (.parquet or .csv) found in '{self.output_dir}'."
                 )
 
             self._validate_and_prepare_dataframe()
+            self._index()
             logger.info(f"Successfully loaded and prepared {len(self.df)} transactions.")
 
         except (FileNotFoundError, ValueError) as e:
@@ -110,15 +134,13 @@ class AnalysisController:
         if self.df is None:
             return {}
 
-        total_disputes = int(self.df["potential_refund"].sum())
-        dispute_amount = float(self.df[self.df["potential_refund"]]["amount"].sum())
-        recent_disputes = int(
-            self.df[
-                (self.df["potential_refund"])
-                & (self.df["date"] >= pd.Timestamp.now() - pd.Timedelta(days=30))
-            ].shape[0]
+        index = self._index()
+        total_disputes = len(index.flagged)
+        dispute_amount = float(np.nansum(index.amounts[index.flagged]))
+        recent_disputes = len(
+            index.search(start=pd.Timestamp.now() - pd.Timedelta(days=30), flagged=True)
         )
-        total_refunds = int(self.df[self.df["amount"] > 0].shape[0])
+        total_refunds = len(index.credits())
 
         return {
             "total_disputes": total_disputes,
@@ -131,54 +153,47 @@ class AnalysisController:
         """Returns the most recent potential disputes."""
         if self.df is None:
             return pd.DataFrame()
-        return self.df[self.df["potential_refund"]].tail(count)
+        flagged = self._index().flagged
+        return self.df.iloc[flagged[max(len(flagged) - count, 0) :]]
 
     def find_refunds_by_merchant(self, merchant: str, days: int) -> pd.DataFrame:
         """Finds potential refunds or credits for a given merchant within a time window."""
         if self.df is None or not merchant:
             return pd.DataFrame()
 
-        pat = merchant.strip()
-        m = self.df["merchant_standardized"].str.contains(pat, case=False, na=False)
-        refund_mask = self.df["potential_refund"]
-        date_mask = self.df["date"] >= (pd.Timestamp.now() - pd.Timedelta(days=days))
-
         # A transaction is a potential refund if it's flagged OR it's a credit
-        return self.df[m & (refund_mask | (self.df["amount"] > 0)) & date_mask]
+        rows = self._index().search(
+            merchant=merchant,
+            start=pd.Timestamp.now() - pd.Timedelta(days=days),
+            flagged_or_credit=True,
+        )
+        return self.df.iloc[rows]
 
-    def find_duplicate_charges(self, days_window: int) -> list[dict[str, Any]]:
+    def find_duplicate_charges(
+        self, days_window: int, amount_tolerance: float = 0.0
+    ) -> list[dict[str, Any]]:
         """
-        Detects likely duplicate charges by merchant and absolute amount
-        within a specified day window.
+        Detects likely duplicate charges: same merchant, absolute amounts
+        within ``amount_tolerance``, at most ``days_window`` days apart.
+        Every such pair is reported, ordered by merchant, then date.
         """
         if self.df is None:
             return []
 
-        dups = []
-        charges = self.df[self.df["amount"] < 0].copy()
-
-        # Group by merchant and absolute amount for efficiency
-        for (merchant, amount_abs), group in charges.groupby(["merchant_standardized", "amount_abs"]):
-            if len(group) > 1:
-                sorted_group = group.sort_values("date")
-                # Compare adjacent transactions in the sorted group
-                for i in range(len(sorted_group) - 1):
-                    t1 = sorted_group.iloc[i]
-                    t2 = sorted_group.iloc[i + 1]
-                    delta_days = (t2["date"] - t1["date"]).days
-                    if 0 <= delta_days <= days_window:
-                        dups.append(
-                            {
-                                "date1": t1["date"],
-                                "date2": t2["date"],
-                                "merchant": merchant,
-                                "amount": -float(amount_abs),
-                                "days_apart": delta_days,
-                                "description1": t1["description"],
-                                "description2": t2["description"],
-                            }
-                        )
-        return dups
+        pairs = duplicate_charge_pairs(
+            self.df, days_window, amount_tolerance=amount_tolerance
+        )
+        return pairs[
+            [
+                "date1",
+                "date2",
+                "merchant",
+                "amount",
+                "days_apart",
+                "description1",
+                "description2",
+            ]
+        ].to_dict("records")
 
     def check_refund_status(self, merchant: str, amount: float, charge_date: pd.Timestamp) -> pd.DataFrame:
         """
@@ -187,16 +202,19 @@ class AnalysisController:
         if self.df is None:
             return pd.DataFrame()
 
-        start_date = charge_date
-        end_date = charge_date + pd.Timedelta(days=60)
-
-        merchant_mask = self.df["merchant_standardized"].str.contains(merchant, case=False, na=False)
-        date_mask = (self.df["date"] >= start_date) & (self.df["date"] <= end_date)
+        rows = self._index().search(
+            merchant=merchant,
+            start=charge_date,
+            end=charge_date + pd.Timedelta(days=60),
+            min_abs=abs(amount) - 0.01,
+            max_abs=abs(amount) + 0.01,
+        )
+        candidates = self.df.iloc[rows]
         # Check for amounts that are very close to the charge amount
-        amount_mask = (self.df["amount"].abs() - abs(amount)).abs() < 0.01
-        refund_mask = self.df["amount"] > 0
+        amount_mask = (candidates["amount"].abs() - abs(amount)).abs() < 0.01
+        refund_mask = candidates["amount"] > 0
 
-        return self.df[merchant_mask & date_mask & amount_mask & refund_mask]
+        return candidates[amount_mask & refund_mask]
 
     def get_dispute_analysis(self) -> dict[str, Any]:
         """Calculates and returns data for the dispute analysis view."""
@@ -232,29 +250,35 @@ class AnalysisController:
         if self.df is None:
             return pd.DataFrame()
 
-        results = self.df.copy()
-
+        filters: dict[str, Any] = {}
         if start_date_str := params.get("start_date"):
             with contextlib.suppress(Exception):
-                results = results[results["date"] >= pd.to_datetime(start_date_str)]
+                filters["start"] = pd.to_datetime(start_date_str)
 
         if end_date_str := params.get("end_date"):
             with contextlib.suppress(Exception):
-                results = results[results["date"] <= pd.to_datetime(end_date_str)]
+                filters["end"] = pd.to_datetime(end_date_str)
 
         if min_amount_str := params.get("min_amount"):
             with contextlib.suppress(Exception):
-                results = results[results["amount_abs"] >= float(min_amount_str)]
+                filters["min_abs"] = float(min_amount_str)
 
         if max_amount_str := params.get("max_amount"):
             with contextlib.suppress(Exception):
-                results = results[results["amount_abs"] <= float(max_amount_str)]
+                filters["max_abs"] = float(max_amount_str)
 
         if merchant_str := params.get("merchant"):
-            pat = merchant_str.strip()
-            results = results[results["merchant_standardized"].str.contains(pat, case=False, na=False)]
+            filters["merchant"] = merchant_str.strip()
 
         if params.get("only_disputes"):
-            results = results[results["potential_refund"]]
+            filters["flagged"] = True
+
+        # Only the rows shown are copied out of the frame
+        return self.df.iloc[self._index().search(**filters)[:100]]
 
-        return results.head(100)
+    def _index(self) -> TransactionIndex:
+        """The query index over ``self.df``, rebuilt only when the frame changes."""
+        if self.index is None or self._indexed_df is not self.df:
+            self.index = TransactionIndex(self.df)
+            self._indexed_df = self.df
+        return self.index
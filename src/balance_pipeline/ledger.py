@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import hashlib
+import json
 import logging
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
+from pathlib import Path
+from typing import Any
 
 import pandas as pd
 
+from .balances import running_balance
+
 # Assuming config.py is in the same directory or accessible via PYTHONPATH
 from .config import AnalysisConfig, DataQualityFlag
+from .processing import AUDIT_PART_COLUMNS, format_values
 
 logger = logging.getLogger(__name__)
 
@@ -65,31 +72,177 @@ def _generate_transaction_id(row: pd.Series, date_col: str = "Date") -> str:
     return hashlib.sha256(key_data.encode()).hexdigest()[:32]
 
 
-def create_master_ledger(
+def _date_key(value: Any) -> str:
+    if isinstance(value, (datetime, pd.Timestamp)) and pd.notna(value):
+        return value.isoformat()
+    return str(value if pd.notna(value) else "NoDate")
+
+
+def _transaction_ids(rows: pd.DataFrame, date_col: str = "Date") -> pd.Series:
+    """:func:`_generate_transaction_id` for every row, built column-wise.
+
+    Each key column is rendered once per distinct value and the keys are
+    joined as whole columns, so only the hash itself runs per row.
+    """
+
+    def column(name: str, default: Any) -> pd.Series:
+        if name in rows.columns:
+            return rows[name]
+        return pd.Series(default, index=rows.index, dtype=object)
+
+    keys = format_values(column(date_col, None), _date_key)
+    for name, default, fmt in (
+        ("Payer", "NA", ""),
+        ("Merchant", "NA", ""),
+        ("Description", "NoDesc", lambda v: str(v)[:20]),
+        ("ActualAmount", 0.0, ".2f"),
+        ("AllowedAmount", 0.0, ".2f"),
+        ("BalanceImpact", 0.0, ".2f"),
+    ):
+        keys = keys + "_" + format_values(column(name, default), fmt)
+    hashes = [hashlib.sha256(k.encode()).hexdigest()[:32] for k in keys.tolist()]
+    return pd.Series(hashes, index=rows.index, dtype=object)
+
+
+COMMON_LEDGER_COLUMNS = [
+    "Date",
+    "TransactionType",
+    "Payer",
+    "Description",
+    "ActualAmount",
+    "AllowedAmount",
+    "IsShared",
+    "RyanOwes",
+    "JordynOwes",
+    "BalanceImpact",
+    "AuditNote",
+    "DataQualityFlag",
+    "Merchant",
+]
+
+MASTER_LEDGER_COLUMNS = COMMON_LEDGER_COLUMNS + [
+    "RunningBalance",
+    "TransactionID",
+    "DataLineage",
+    "Who_Paid_Text",
+    "Share_Type",
+    "Shared_Reason",
+    "DataQuality_Audit",
+]
+
+_NUMERIC_LEDGER_COLUMNS = [
+    "ActualAmount",
+    "AllowedAmount",
+    "RyanOwes",
+    "JordynOwes",
+    "BalanceImpact",
+]
+
+# Columns outside the TransactionID hash, which can change on an existing row
+_MUTABLE_LEDGER_COLUMNS = [
+    "TransactionType",
+    "Description",
+    "IsShared",
+    "RyanOwes",
+    "JordynOwes",
+    "AuditNote",
+    "DataQualityFlag",
+    *AUDIT_PART_COLUMNS,
+]
+
+
+@dataclass
+class LedgerAggregates:
+    """Running totals maintained alongside a persisted master ledger.
+
+    They carry everything ``recon.triple_reconciliation_from_aggregates``
+    needs, so appending a week of transactions does not require a rescan of
+    the full ledger to re-derive the reconciliation numbers.
+    """
+
+    row_count: int = 0
+    balance_total: float = 0.0  # Unrounded sum of BalanceImpact
+    last_date: str | None = None  # ISO date of the latest committed row
+    shared_total: float = 0.0
+    shared_by_payer: dict[str, float] = field(default_factory=dict)
+    shared_by_type: dict[str, dict[str, float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_ledger(cls, master: pd.DataFrame) -> LedgerAggregates:
+        aggregates = cls()
+        aggregates.update(master)
+        return aggregates
+
+    def update(self, rows: pd.DataFrame) -> None:
+        """Fold ``rows`` (new master ledger rows) into the totals."""
+        if rows.empty:
+            return
+        self.row_count += len(rows)
+        max_date = pd.to_datetime(rows["Date"], errors="coerce").max()
+        if pd.notna(max_date) and (
+            self.last_date is None or max_date > pd.Timestamp(self.last_date)
+        ):
+            self.last_date = max_date.isoformat()
+        self._fold(rows, 1.0)
+
+    def remove(self, rows: pd.DataFrame) -> None:
+        """Take the contribution of ``rows`` (stored ledger rows) back out.
+
+        ``last_date`` is left as is; the caller knows the remaining ledger.
+        """
+        if rows.empty:
+            return
+        self.row_count -= len(rows)
+        self._fold(rows, -1.0)
+
+    def _fold(self, rows: pd.DataFrame, sign: float) -> None:
+        self.balance_total += sign * float(rows["BalanceImpact"].sum())
+        shared = rows[rows["IsShared"].eq(True)]
+        if shared.empty:
+            return
+        amounts = pd.to_numeric(shared["AllowedAmount"], errors="coerce").fillna(0)
+        amounts *= sign
+        payers = shared["Payer"].astype("string").str.lower()
+        self.shared_total += float(amounts.sum())
+        for payer, amount in amounts.groupby(payers).sum().items():
+            self.shared_by_payer[payer] = self.shared_by_payer.get(payer, 0.0) + float(
+                amount
+            )
+        by_type = amounts.groupby([shared["TransactionType"], payers]).sum()
+        type_totals = amounts.groupby(shared["TransactionType"]).sum()
+        for trans_type, amount in type_totals.items():
+            bucket = self.shared_by_type.setdefault(str(trans_type), {"total": 0.0})
+            bucket["total"] += float(amount)
+        for (trans_type, payer), amount in by_type.items():
+            bucket = self.shared_by_type[str(trans_type)]
+            bucket[payer] = bucket.get(payer, 0.0) + float(amount)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "balance_total": self.balance_total,
+            "last_date": self.last_date,
+            "shared_total": self.shared_total,
+            "shared_by_payer": self.shared_by_payer,
+            "shared_by_type": self.shared_by_type,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> LedgerAggregates:
+        return cls(**data)
+
+
+def _prepare_ledger_rows(
     processed_rent_df: pd.DataFrame,
     processed_expense_df: pd.DataFrame,
-    config: AnalysisConfig,
     logger_instance: logging.Logger = logger,
 ) -> pd.DataFrame:
-    logger_instance.info(
-        "Creating master ledger from processed rent and expense data..."
-    )
+    """Concatenate processed rent/expense rows into unsorted ledger rows.
 
-    common_cols = [
-        "Date",
-        "TransactionType",
-        "Payer",
-        "Description",
-        "ActualAmount",
-        "AllowedAmount",
-        "IsShared",
-        "RyanOwes",
-        "JordynOwes",
-        "BalanceImpact",
-        "AuditNote",
-        "DataQualityFlag",
-        "Merchant",
-    ]
+    Returns an empty frame with ``COMMON_LEDGER_COLUMNS`` if both inputs are
+    empty. Dates and amounts are coerced; nothing order dependent is computed.
+    """
+    common_cols = COMMON_LEDGER_COLUMNS
 
     # Prepare rent_df
     rent_df_c = processed_rent_df.copy()
@@ -121,13 +274,7 @@ def create_master_ledger(
                 logger_instance.warning(
                     f"Column '{col}' missing in {name}. Adding as default."
                 )
-                if col in [
-                    "ActualAmount",
-                    "AllowedAmount",
-                    "RyanOwes",
-                    "JordynOwes",
-                    "BalanceImpact",
-                ]:
+                if col in _NUMERIC_LEDGER_COLUMNS:
                     df_iter[col] = 0.0
                 elif col == "IsShared":
                     df_iter[col] = False
@@ -137,26 +284,14 @@ def create_master_ledger(
                     df_iter[col] = pd.NA
 
     dfs_to_concat = []
-    if not rent_df_c.empty:
-        dfs_to_concat.append(rent_df_c[common_cols])  # Select only common_cols
-    if not expense_df_c.empty:
-        dfs_to_concat.append(expense_df_c[common_cols])  # Select only common_cols
+    for df_iter in (rent_df_c, expense_df_c):
+        if not df_iter.empty:
+            # Common columns plus the audit parts stored by the processing step
+            parts = [c for c in AUDIT_PART_COLUMNS if c in df_iter.columns]
+            dfs_to_concat.append(df_iter[common_cols + parts])
 
     if not dfs_to_concat:
-        logger_instance.error(
-            "Both processed rent and expense DataFrames are effectively empty. Master ledger cannot be created."
-        )
-        # Define all expected columns for an empty master ledger
-        all_master_ledger_cols = common_cols + [
-            "RunningBalance",
-            "TransactionID",
-            "DataLineage",
-            "Who_Paid_Text",
-            "Share_Type",
-            "Shared_Reason",
-            "DataQuality_Audit",
-        ]
-        return pd.DataFrame(columns=all_master_ledger_cols)
+        return pd.DataFrame(columns=common_cols)
 
     master = pd.concat(dfs_to_concat, ignore_index=True, sort=False)
 
@@ -174,18 +309,7 @@ def create_master_ledger(
             "They will be sorted to the beginning or end depending on na_position."
         )
 
-    master = master.sort_values(
-        by="Date", ascending=True, na_position="first"
-    ).reset_index(drop=True)
-
-    numeric_cols = [
-        "ActualAmount",
-        "AllowedAmount",
-        "RyanOwes",
-        "JordynOwes",
-        "BalanceImpact",
-    ]
-    for col in numeric_cols:
+    for col in _NUMERIC_LEDGER_COLUMNS:
         if col in master.columns:
             master[col] = pd.to_numeric(master[col], errors="coerce").fillna(0)
         else:  # Should not happen
@@ -193,41 +317,90 @@ def create_master_ledger(
             logger_instance.error(
                 f"Numeric column '{col}' unexpectedly missing in master ledger. Defaulting to 0."
             )
+    return master
 
-    master["RunningBalance"] = (
-        master["BalanceImpact"].cumsum().round(config.CURRENCY_PRECISION)
-    )
-    master["TransactionID"] = master.apply(
-        lambda row: _generate_transaction_id(row, date_col="Date"), axis=1
+
+def _add_row_identity(rows: pd.DataFrame) -> pd.DataFrame:
+    """Add the position independent columns: TransactionID and audit parts."""
+    rows["TransactionID"] = _transaction_ids(rows, date_col="Date")
+
+    # Audit split columns
+    # Ensure 'AuditNote' exists and is string type before applying _explode_audit
+    if "AuditNote" not in rows.columns:
+        rows["AuditNote"] = ""  # Initialize if missing
+    rows["AuditNote"] = rows["AuditNote"].astype(str).fillna("")
+
+    # The processing builders store the parts next to the note; only rows
+    # from other sources still need their note parsed.
+    # Object dtype, so parsed text can go into columns that were all missing
+    parts = rows.reindex(columns=AUDIT_PART_COLUMNS).astype(object)
+    unparsed = parts.isna().any(axis=1)
+    if unparsed.any():
+        audit_components = rows.loc[unparsed, "AuditNote"].apply(_explode_audit)
+        parts.loc[unparsed] = pd.DataFrame(
+            audit_components.tolist(),
+            index=audit_components.index,
+            columns=AUDIT_PART_COLUMNS,
+        )
+    rows[AUDIT_PART_COLUMNS] = parts
+
+    if "DataQualityFlag" not in rows.columns:  # Should be present from processing step
+        rows["DataQualityFlag"] = DataQualityFlag.CLEAN.value
+    rows["DataQualityFlag"] = rows["DataQualityFlag"].fillna(
+        DataQualityFlag.CLEAN.value
     )
+    return rows
 
+
+def _add_lineage(rows: pd.DataFrame, config: AnalysisConfig) -> pd.DataFrame:
     # P0 Blueprint: Data-lineage Column
     # Add LineageStep column that appends mini‑codes (L1, P2, S3) every time a row changes;
     # For now, this is a placeholder. True lineage tracking would involve more complex state management
     # or passing lineage info from previous steps.
-    master["DataLineage"] = master.apply(
-        lambda row: f"SourceType: {row.get('TransactionType','NA')} | LedgerGenIndex: {row.name} | Stage: MasterLedgerBuild_v{config.RYAN_PCT}_{config.JORDYN_PCT}",  # Example
-        axis=1,
+    source = (
+        format_values(rows["TransactionType"])
+        if "TransactionType" in rows.columns
+        else "NA"
+    )
+    rows["DataLineage"] = (
+        "SourceType: "
+        + source
+        + " | LedgerGenIndex: "
+        + rows.index.astype(str)
+        + f" | Stage: MasterLedgerBuild_v{config.RYAN_PCT}_{config.JORDYN_PCT}"
     )
+    return rows
 
-    # Audit split columns
-    # Ensure 'AuditNote' exists and is string type before applying _explode_audit
-    if "AuditNote" not in master.columns:
-        master["AuditNote"] = ""  # Initialize if missing
-    master["AuditNote"] = master["AuditNote"].astype(str).fillna("")
 
-    audit_components = master["AuditNote"].apply(_explode_audit)
-    master[["Who_Paid_Text", "Share_Type", "Shared_Reason", "DataQuality_Audit"]] = (
-        pd.DataFrame(audit_components.tolist(), index=master.index)
+def create_master_ledger(
+    processed_rent_df: pd.DataFrame,
+    processed_expense_df: pd.DataFrame,
+    config: AnalysisConfig,
+    logger_instance: logging.Logger = logger,
+) -> pd.DataFrame:
+    logger_instance.info(
+        "Creating master ledger from processed rent and expense data..."
     )
 
-    if (
-        "DataQualityFlag" not in master.columns
-    ):  # Should be present from processing step
-        master["DataQualityFlag"] = DataQualityFlag.CLEAN.value
-    master["DataQualityFlag"] = master["DataQualityFlag"].fillna(
-        DataQualityFlag.CLEAN.value
+    master = _prepare_ledger_rows(
+        processed_rent_df, processed_expense_df, logger_instance
+    )
+    if master.empty:
+        logger_instance.error(
+            "Both processed rent and expense DataFrames are effectively empty. Master ledger cannot be created."
+        )
+        return pd.DataFrame(columns=MASTER_LEDGER_COLUMNS)
+
+    master = master.sort_values(
+        by="Date", ascending=True, na_position="first"
+    ).reset_index(drop=True)
+
+    master["RunningBalance"] = running_balance(
+        master["BalanceImpact"], precision=config.CURRENCY_PRECISION
     )
+    master = _add_row_identity(master)
+    master = _add_lineage(master, config)
+    master = master[MASTER_LEDGER_COLUMNS]
 
     logger_instance.info(f"Created master ledger with {len(master)} transactions.")
     if not master.empty and master["Date"].notna().any():
@@ -240,3 +413,207 @@ def create_master_ledger(
         logger_instance.warning("Master ledger is empty after processing.")
 
     return master
+
+
+def _occurrence_keys(master: pd.DataFrame) -> pd.Series:
+    """TransactionID plus occurrence number, so identical rows stay distinct."""
+    occurrence = master.groupby("TransactionID").cumcount().astype(str)
+    return master["TransactionID"].astype(str) + "#" + occurrence
+
+
+def _covered_by(existing: pd.DataFrame, candidates: pd.DataFrame) -> pd.Series:
+    """Existing rows in the span the candidate rows of their type cover.
+
+    Each ``TransactionType`` covers only its own dates, so a rent input for
+    the whole year does not make a partial expense input authoritative for
+    expenses outside the expense dates.
+    """
+    existing_dates = pd.to_datetime(existing["Date"], errors="coerce")
+    candidate_dates = pd.to_datetime(candidates["Date"], errors="coerce")
+    existing_types = format_values(existing["TransactionType"])
+    candidate_types = format_values(candidates["TransactionType"])
+    covered = pd.Series(False, index=existing.index)
+    for trans_type, dates in candidate_dates.groupby(candidate_types, sort=False):
+        same_type = existing_types.eq(trans_type)
+        valid = dates.dropna()
+        if not valid.empty:
+            covered |= same_type & existing_dates.between(valid.min(), valid.max())
+        if dates.isna().any():
+            covered |= same_type & existing_dates.isna()
+    return covered
+
+
+def _as_text(frame: pd.DataFrame) -> pd.DataFrame:
+    # Parquet round trips change dtypes, not the rendered values
+    return frame.astype("string").fillna("\0")
+
+
+def append_to_master_ledger(
+    existing_master: pd.DataFrame,
+    processed_rent_df: pd.DataFrame,
+    processed_expense_df: pd.DataFrame,
+    config: AnalysisConfig,
+    aggregates: LedgerAggregates | None = None,
+    logger_instance: logging.Logger = logger,
+) -> tuple[pd.DataFrame, LedgerAggregates]:
+    """Merge newly processed rows into a previously built master ledger.
+
+    Rows already present in ``existing_master`` (matched on TransactionID and
+    occurrence count) are not added again, so the full processed inputs can
+    be passed in every run. New rows are placed after the existing rows on
+    the same date and ``RunningBalance`` is continued from the stored prefix:
+    only the suffix starting at the earliest new row is recomputed.
+
+    The processed rows of each TransactionType are authoritative for the
+    dates they span. A stored row of that type in that span which the inputs
+    no longer carry was deleted or edited upstream (TransactionID hashes the
+    amounts, so a corrected amount arrives as a new row) and is dropped. A
+    stored row whose other columns changed, such as its IsShared decision, is
+    updated in place. ``aggregates`` takes out the old contribution of
+    dropped and edited rows, adds the new one, and is returned alongside the
+    merged ledger.
+    """
+    if aggregates is None:
+        aggregates = LedgerAggregates.from_ledger(existing_master)
+    if existing_master.empty:
+        master = create_master_ledger(
+            processed_rent_df, processed_expense_df, config, logger_instance
+        )
+        return master, LedgerAggregates.from_ledger(master)
+
+    candidates = _prepare_ledger_rows(
+        processed_rent_df, processed_expense_df, logger_instance
+    )
+    if candidates.empty:
+        logger_instance.info("No processed rows supplied; master ledger unchanged.")
+        return existing_master, aggregates
+
+    candidates = candidates.sort_values(
+        by="Date", ascending=True, na_position="first", kind="stable"
+    ).reset_index(drop=True)
+    candidates = _add_row_identity(candidates)
+    candidate_keys = _occurrence_keys(candidates)
+    existing_keys = _occurrence_keys(existing_master)
+    is_new = ~candidate_keys.isin(existing_keys)
+    new_rows = candidates[is_new]
+
+    existing_dates = pd.to_datetime(existing_master["Date"], errors="coerce")
+    kept = existing_keys.isin(candidate_keys)
+    removed = _covered_by(existing_master, candidates) & ~kept
+
+    columns = [c for c in _MUTABLE_LEDGER_COLUMNS if c in existing_master.columns]
+    incoming = (
+        candidates.loc[~is_new, columns]
+        .set_index(candidate_keys[~is_new])
+        .reindex(existing_keys[kept])
+    )
+    changed = (
+        _as_text(incoming).to_numpy()
+        != _as_text(existing_master.loc[kept, columns]).to_numpy()
+    ).any(axis=1)
+    edited = pd.Series(False, index=existing_master.index)
+    edited[kept] = changed
+
+    if new_rows.empty and not removed.any() and not edited.any():
+        logger_instance.info("No new transactions; master ledger unchanged.")
+        return existing_master, aggregates
+
+    master = existing_master
+    if edited.any():
+        logger_instance.info(f"Updating {int(edited.sum())} edited ledger rows.")
+        master = existing_master.copy()
+        aggregates.remove(master[edited])
+        for column in columns:
+            master.loc[edited, column] = incoming.loc[changed, column].to_numpy()
+        aggregates.update(master[edited])
+    if new_rows.empty and not removed.any():
+        return master, aggregates
+
+    # Position of the first existing row that has to move or go.
+    leading_nat = int(existing_dates.isna().sum())
+    split_at = len(master)
+    if not new_rows.empty:
+        first_new_date = new_rows["Date"].iloc[0]
+        split_at = leading_nat
+        if pd.notna(first_new_date):
+            split_at += int(
+                existing_dates.iloc[leading_nat:].searchsorted(
+                    first_new_date, side="right"
+                )
+            )
+    if removed.any():
+        split_at = min(split_at, int(removed.to_numpy().argmax()))
+    logger_instance.info(
+        f"Appending {len(new_rows)} new transactions to master ledger and "
+        f"dropping {int(removed.sum())} superseded rows "
+        f"({len(master) - split_at} existing rows re-sequenced)."
+    )
+
+    prefix = master.iloc[:split_at]
+    suffix = pd.concat(
+        [
+            master.iloc[split_at:][~removed.iloc[split_at:]],
+            new_rows[master.columns.drop(["RunningBalance", "DataLineage"])],
+        ],
+        ignore_index=True,
+        sort=False,
+    )
+    suffix = suffix.sort_values(
+        by="Date", ascending=True, na_position="first", kind="stable"
+    ).reset_index(drop=True)
+
+    # Continue from the unrounded running total of the untouched prefix.
+    opening = aggregates.balance_total - float(
+        master["BalanceImpact"].iloc[split_at:].sum()
+    )
+    suffix["RunningBalance"] = running_balance(
+        suffix["BalanceImpact"], opening=opening, precision=config.CURRENCY_PRECISION
+    )
+    suffix.index = pd.RangeIndex(split_at, split_at + len(suffix))
+    suffix = _add_lineage(suffix, config)
+
+    aggregates.remove(master[removed])
+    aggregates.update(new_rows)
+    master = pd.concat([prefix, suffix[master.columns]], sort=False)
+    master = master.reset_index(drop=True)
+    last_date = pd.to_datetime(master["Date"], errors="coerce").max()
+    aggregates.last_date = None if pd.isna(last_date) else last_date.isoformat()
+    return master, aggregates
+
+
+def _aggregates_path(path: Path) -> Path:
+    return path.with_name(path.name + ".aggregates.json")
+
+
+def save_master_ledger(
+    master: pd.DataFrame, path: Path | str, aggregates: LedgerAggregates
+) -> Path:
+    """Persist the master ledger (Parquet) and its aggregates sidecar."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    master.to_parquet(path, index=False)
+    _aggregates_path(path).write_text(
+        json.dumps(aggregates.to_dict(), indent=2), encoding="utf-8"
+    )
+    return path
+
+
+def load_master_ledger(
+    path: Path | str, logger_instance: logging.Logger = logger
+) -> tuple[pd.DataFrame, LedgerAggregates] | None:
+    """Load a persisted master ledger, or ``None`` if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    master = pd.read_parquet(path)
+    sidecar = _aggregates_path(path)
+    if sidecar.exists():
+        aggregates = LedgerAggregates.from_dict(
+            json.loads(sidecar.read_text(encoding="utf-8"))
+        )
+        if aggregates.row_count == len(master):
+            return master, aggregates
+        logger_instance.warning(
+            f"Aggregates in {sidecar} do not match ledger row count; rebuilding."
+        )
+    return master, LedgerAggregates.from_ledger(master)
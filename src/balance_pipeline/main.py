@@ -15,12 +15,21 @@ orchestrates the data processing workflow.
 from __future__ import annotations
 
 import argparse
+import contextlib
 import logging
 import sys
 from pathlib import Path
+from typing import Any
 
+import duckdb
 import pandas as pd
 from balance_pipeline.config import DEFAULT_OUTPUT_FORMAT, SUPPORTED_OUTPUT_FORMATS
+from balance_pipeline.excel_streaming import write_excel_streaming
+from balance_pipeline.export import write_parquet
+from balance_pipeline.powerbi import write_powerbi_dataset
+from balance_pipeline.query import TransactionQuery
+from balance_pipeline.store import DEFAULT_STORE_PATH, TransactionStore
+from balance_pipeline.utils import enable_copy_on_write
 
 # Import the unified pipeline - adjust import based on your project structure
 from balance_pipeline.pipeline_v2 import UnifiedPipeline
@@ -116,6 +125,7 @@ def process_files_command(
     output_path: str | None = None,
     output_format: str = DEFAULT_OUTPUT_FORMAT,
     debug: bool = False,
+    store_path: str | None = None,
 ) -> None:
     """
     Process CSV files using the unified pipeline.
@@ -129,8 +139,9 @@ def process_files_command(
         schema_path: Optional custom schema registry YAML path
         merchant_path: Optional custom merchant lookup CSV path
         output_path: Optional output file path (defaults to stdout)
-        output_format: Output format (csv, parquet, excel)
+        output_format: Output format (csv, parquet, excel, powerbi)
         debug: Enable debug mode for detailed logging
+        store_path: Optional DuckDB transaction store to upsert the results into
     """
     logger = logging.getLogger(__name__)
 
@@ -178,8 +189,14 @@ def process_files_command(
 
         logger.info(f"Processed {len(processed_df)} total transactions")
 
-        # Step 6: Save or display the output
-        save_output(processed_df, output_path, output_format)
+        # Step 6: Upsert into the transaction store, if one is given
+        if store_path is not None:
+            with TransactionStore(store_path) as store:
+                store.upsert_transactions(processed_df)
+
+        # Step 7: Save or display the output
+        if output_path is not None or store_path is None:
+            save_output(processed_df, output_path, output_format)
 
     except FileNotFoundError as e:
         logger.error(f"File error: {e}")
@@ -202,7 +219,7 @@ def save_output(df: pd.DataFrame, output_path: str | None, output_format: str) -
     Args:
         df: Processed DataFrame to save
         output_path: Output file path (None for stdout)
-        output_format: Format to save in (csv, parquet, excel)
+        output_format: Format to save in (csv, parquet, excel, powerbi)
     """
     logger = logging.getLogger(__name__)
 
@@ -225,13 +242,110 @@ def save_output(df: pd.DataFrame, output_path: str | None, output_format: str) -
         if output_format == "csv":
             df.to_csv(output_file, index=False)
         elif output_format == "parquet":
-            df.to_parquet(output_file, index=False)
+            write_parquet(df, output_file)
         elif output_format == "excel":
-            df.to_excel(output_file, index=False)
+            write_excel_streaming(df, output_file)
+        elif output_format == "powerbi":
+            # A directory holding the fact partitions and dimension tables
+            write_powerbi_dataset(df, output_file)
 
         logger.info(f"Output saved to: {output_file}")
 
 
+def export_store_command(
+    store_path: str,
+    output_path: str | None = None,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    start: str | None = None,
+    end: str | None = None,
+) -> None:
+    """
+    Export the reviewed transactions held in a transaction store.
+
+    Args:
+        store_path: DuckDB transaction store to read
+        output_path: Output file path (None for stdout)
+        output_format: Format to save in (csv, parquet, excel, powerbi)
+        start: Optional first date to export (inclusive)
+        end: Optional last date to export (inclusive)
+    """
+    logger = logging.getLogger(__name__)
+
+    if not Path(store_path).exists():
+        logger.error(f"File error: Transaction store not found: {store_path}")
+        sys.exit(1)
+    with TransactionStore(store_path, read_only=True) as store:
+        df = store.read(start, end)
+    logger.info(f"Exporting {len(df)} transactions from {store_path}")
+    save_output(df, output_path, output_format)
+
+
+def query_command(
+    source: str,
+    sql: str | None = None,
+    output_path: str | None = None,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    chunk_rows: int = 65_536,
+    **filters: Any,
+) -> None:
+    """
+    Run SQL (or the standard search filters) against processed transactions.
+
+    Results are streamed in chunks to stdout or a CSV file, or copied to
+    Parquet by DuckDB; other formats collect the result first.
+
+    Args:
+        source: Parquet file, glob, directory or transaction store to query
+        sql: Query against the ``transactions`` view (None to search by filters)
+        output_path: Output file path (None for stdout)
+        output_format: Format to save in (csv, parquet, excel, powerbi)
+        chunk_rows: Rows per streamed chunk
+        **filters: Keyword filters for TransactionQuery.search_sql; they
+            cannot be combined with ``sql``
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        given = [name for name, value in filters.items() if value not in (None, False)]
+        if sql is not None and given:
+            options = ", ".join("--" + name.replace("_", "-") for name in given)
+            raise ValueError(
+                f"{options} cannot be combined with SQL; "
+                "put the conditions in the query instead"
+            )
+        with TransactionQuery(source) as query:
+            params: list[Any] = []
+            if sql is None:
+                sql, params = query.search_sql(**filters)
+            logger.debug(f"Query: {sql} {params}")
+
+            if output_format == "parquet" and output_path is not None:
+                query.copy_to(sql, output_path, params)
+                logger.info(f"Output saved to: {output_path}")
+            elif output_format == "csv":
+                with contextlib.ExitStack() as stack:
+                    target = sys.stdout
+                    if output_path is not None:
+                        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                        target = stack.enter_context(
+                            open(output_path, "w", newline="", encoding="utf-8")
+                        )
+                    rows = 0
+                    for chunk in query.stream(sql, params, chunk_rows=chunk_rows):
+                        chunk.to_csv(target, index=False, header=rows == 0)
+                        rows += len(chunk)
+                logger.info(f"Query returned {rows} rows")
+            else:
+                save_output(query.execute(sql, params), output_path, output_format)
+
+    except FileNotFoundError as e:
+        logger.error(f"File error: {e}")
+        sys.exit(1)
+    except (ValueError, duckdb.Error) as e:
+        logger.error(f"Query error: {e}")
+        sys.exit(1)
+
+
 def create_argument_parser() -> argparse.ArgumentParser:
     """
     Create and configure the command-line argument parser.
@@ -258,6 +372,17 @@ Examples:
   
   # Save to parquet format
   python -m balance_pipeline.main process *.csv --output processed.parquet --format parquet
+
+  # Refresh a Power BI star-schema dataset (only changed months are rewritten)
+  python -m balance_pipeline.main process *.csv --output powerbi_data --format powerbi
+
+  # Upsert new statements into the transaction store, then export from it
+  python -m balance_pipeline.main process new_month/*.csv --store workbook/balance.duckdb
+  python -m balance_pipeline.main export --store workbook/balance.duckdb -o all.parquet -f parquet
+
+  # Ask ad-hoc questions in SQL; only the needed columns and row groups are read
+  python -m balance_pipeline.main query output/ "SELECT Merchant, sum(Amount) FROM transactions GROUP BY 1"
+  python -m balance_pipeline.main query output/ --merchant amazon --start 2024-01-01 --min-amount 100
         """,
     )
 
@@ -311,6 +436,87 @@ Examples:
         help="Enable debug mode for detailed processing information",
     )
 
+    process_parser.add_argument(
+        "--store",
+        type=str,
+        help="DuckDB transaction store to upsert results into (by TxnID)",
+    )
+
+    # Export command
+    export_parser = subparsers.add_parser(
+        "export", help="Export reviewed transactions from a transaction store"
+    )
+
+    export_parser.add_argument(
+        "--store",
+        type=str,
+        default=str(DEFAULT_STORE_PATH),
+        help=f"DuckDB transaction store (default: {DEFAULT_STORE_PATH})",
+    )
+
+    export_parser.add_argument(
+        "-o", "--output", type=str, help="Output file path (default: stdout)"
+    )
+
+    export_parser.add_argument(
+        "-f",
+        "--format",
+        type=str,
+        choices=SUPPORTED_OUTPUT_FORMATS,
+        default=DEFAULT_OUTPUT_FORMAT,
+        help=f"Output format (default: {DEFAULT_OUTPUT_FORMAT})",
+    )
+
+    export_parser.add_argument("--start", type=str, help="First date (YYYY-MM-DD)")
+    export_parser.add_argument("--end", type=str, help="Last date (YYYY-MM-DD)")
+
+    # Query command
+    query_parser = subparsers.add_parser(
+        "query", help="Run SQL against processed Parquet files or a store"
+    )
+
+    query_parser.add_argument(
+        "source",
+        help="Parquet file, glob, directory of Parquet files, or .duckdb store",
+    )
+
+    query_parser.add_argument(
+        "sql",
+        nargs="?",
+        help="SQL over the 'transactions' view (default: search with the filters)",
+    )
+
+    query_parser.add_argument(
+        "-o", "--output", type=str, help="Output file path (default: stdout)"
+    )
+
+    query_parser.add_argument(
+        "-f",
+        "--format",
+        type=str,
+        choices=SUPPORTED_OUTPUT_FORMATS,
+        default=DEFAULT_OUTPUT_FORMAT,
+        help=f"Output format (default: {DEFAULT_OUTPUT_FORMAT})",
+    )
+
+    query_parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=65_536,
+        help="Rows per streamed chunk (default: 65536)",
+    )
+
+    filters = query_parser.add_argument_group("filters (without SQL)")
+    filters.add_argument("--start", type=str, help="First date (YYYY-MM-DD)")
+    filters.add_argument("--end", type=str, help="Last date (YYYY-MM-DD)")
+    filters.add_argument("--merchant", type=str, help="Merchant substring")
+    filters.add_argument("--min-amount", type=float, help="Minimum absolute amount")
+    filters.add_argument("--max-amount", type=float, help="Maximum absolute amount")
+    filters.add_argument(
+        "--only-disputes", action="store_true", help="Only potential refunds"
+    )
+    filters.add_argument("--limit", type=int, help="Maximum number of rows")
+
     return parser
 
 
@@ -327,6 +533,7 @@ def main() -> None:
 
     # Setup logging based on verbosity
     setup_logging(args.verbose)
+    enable_copy_on_write()
 
     # Dispatch to appropriate command
     if args.command == "process":
@@ -337,6 +544,30 @@ def main() -> None:
             output_path=args.output,
             output_format=args.format,
             debug=args.debug,
+            store_path=args.store,
+        )
+    elif args.command == "export":
+        export_store_command(
+            store_path=args.store,
+            output_path=args.output,
+            output_format=args.format,
+            start=args.start,
+            end=args.end,
+        )
+    elif args.command == "query":
+        query_command(
+            source=args.source,
+            sql=args.sql,
+            output_path=args.output,
+            output_format=args.format,
+            chunk_rows=args.chunk_rows,
+            start=args.start,
+            end=args.end,
+            merchant=args.merchant,
+            min_amount=args.min_amount,
+            max_amount=args.max_amount,
+            only_disputes=args.only_disputes,
+            limit=args.limit,
         )
     else:
         parser.print_help()
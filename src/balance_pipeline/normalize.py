@@ -35,7 +35,11 @@ from balance_pipeline.errors import (
 from . import config  # Import config module
 
 # Local application imports
-from .utils import _clean_desc_single, clean_desc_vectorized  # Updated import
+from .utils import (  # Updated import
+    _clean_desc_single,
+    clean_desc_vectorized,
+    copy_on_write,
+)
 
 # ==============================================================================
 # 1. MODULE LEVEL SETUP & CONSTANTS
@@ -274,6 +278,7 @@ def _txn_id(row: dict[str, Any]) -> str:  # Changed input type to dict for apply
 # ------------------------------------------------------------------------------
 # Function: normalize_df
 # ------------------------------------------------------------------------------
+@copy_on_write
 def normalize_df(df: pd.DataFrame, prefer_source: str = "Rocket") -> pd.DataFrame:
     """
     Normalizes the ingested DataFrame after initial processing by ingest.py.
@@ -304,8 +309,8 @@ def normalize_df(df: pd.DataFrame, prefer_source: str = "Rocket") -> pd.DataFram
         return pd.DataFrame(columns=FINAL_COLS)
 
     log.info(f"Normalizing {len(df)} rows (Phase 2 - TxnID, Cleaning, Final Cols)...")
-    # Work on a copy to avoid modifying the original DataFrame passed in.
-    out = df.copy()
+    # Lazy copy (copy-on-write) so the DataFrame passed in is never modified.
+    out = df.copy(deep=False)
 
     # --- Clean Description (Vectorized) ---
     if "Description" in out.columns:
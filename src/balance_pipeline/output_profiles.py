@@ -0,0 +1,122 @@
+"""
+output_profiles.py
+
+Selective output generation for the shared expense analyzer.
+
+Each artifact the analyzer can emit (reconciliation numbers, ledger CSV,
+Excel workbook, charts, dashboard, PDF, ...) declares the pipeline stages it
+needs. Resolving a request such as ``"recon,ledger-csv"`` walks that
+dependency graph and yields an :class:`OutputPlan` that tells the analyzer
+which stages to compute and which files to write. Stages that nothing asks
+for are skipped entirely, which also means the heavy plotting/PDF libraries
+are never imported on reconciliation-only runs.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+# Pipeline stages and the stages they depend on.
+STAGE_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "master_ledger": (),
+    "reconciliation": ("master_ledger",),
+    "analytics": ("master_ledger",),
+    "risk": ("analytics",),
+    "recommendations": ("reconciliation", "analytics", "risk"),
+    "visualizations": ("reconciliation", "analytics"),
+}
+
+# Output artifacts and the stages required to build them.
+OUTPUT_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "recon": ("reconciliation",),
+    "ledger-csv": ("master_ledger",),
+    "recon-csv": ("master_ledger",),
+    "summary-csv": ("reconciliation", "risk"),
+    "dq-log": ("master_ledger",),
+    "alt-texts": ("visualizations",),
+    "charts": ("visualizations",),
+    "excel": ("reconciliation", "analytics", "risk", "recommendations"),
+    "dashboard": ("visualizations",),
+    "pdf": ("reconciliation", "risk", "recommendations", "visualizations"),
+}
+
+ALL_OUTPUTS: tuple[str, ...] = tuple(OUTPUT_DEPENDENCIES)
+
+# Named shortcuts accepted wherever an output name is.
+OUTPUT_PROFILES: dict[str, tuple[str, ...]] = {
+    "all": ALL_OUTPUTS,
+    "nightly": ("recon", "ledger-csv"),
+    "reports": ("summary-csv", "excel", "pdf"),
+}
+
+DEFAULT_OUTPUTS: tuple[str, ...] = ("all",)
+
+
+@dataclass(frozen=True)
+class OutputPlan:
+    """Resolved set of artifacts to write and stages to compute."""
+
+    outputs: frozenset[str]
+    stages: frozenset[str]
+
+    def wants(self, output: str) -> bool:
+        """Return True if ``output`` was requested."""
+        return output in self.outputs
+
+    def needs(self, stage: str) -> bool:
+        """Return True if ``stage`` must be computed for this plan."""
+        return stage in self.stages
+
+    @property
+    def is_full(self) -> bool:
+        return self.outputs == frozenset(ALL_OUTPUTS)
+
+
+def parse_outputs(value: str | Iterable[str] | None) -> tuple[str, ...]:
+    """Normalise a comma separated string or iterable of output names.
+
+    Profile names are expanded and unknown names raise ``ValueError`` so a
+    typo on the command line fails fast instead of silently producing nothing.
+    """
+    if value is None:
+        value = DEFAULT_OUTPUTS
+    if isinstance(value, str):
+        value = value.split(",")
+
+    names: list[str] = []
+    for raw in value:
+        name = raw.strip().lower().replace("_", "-")
+        if not name:
+            continue
+        if name in OUTPUT_PROFILES:
+            expanded = OUTPUT_PROFILES[name]
+        elif name in OUTPUT_DEPENDENCIES:
+            expanded = (name,)
+        else:
+            valid = sorted(set(OUTPUT_DEPENDENCIES) | set(OUTPUT_PROFILES))
+            raise ValueError(
+                f"Unknown output '{raw.strip()}'. Valid outputs: {', '.join(valid)}"
+            )
+        for item in expanded:
+            if item not in names:
+                names.append(item)
+    return tuple(names)
+
+
+def _collect_stages(stage: str, seen: set[str]) -> None:
+    if stage in seen:
+        return
+    seen.add(stage)
+    for dep in STAGE_DEPENDENCIES[stage]:
+        _collect_stages(dep, seen)
+
+
+def resolve_output_plan(value: str | Iterable[str] | None = None) -> OutputPlan:
+    """Build the :class:`OutputPlan` for the requested outputs."""
+    outputs = parse_outputs(value)
+    stages: set[str] = set()
+    for output in outputs:
+        for stage in OUTPUT_DEPENDENCIES[output]:
+            _collect_stages(stage, stages)
+    return OutputPlan(outputs=frozenset(outputs), stages=frozenset(stages))
@@ -2,31 +2,29 @@ from __future__ import annotations
 
 import json
 import logging
+import pickle
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
 import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import (
-    Image,
-    PageBreak,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
 
 # Assuming config.py is accessible
 from .config import AnalysisConfig
+from .excel_streaming import StreamingExcelWriter
+from .output_profiles import resolve_output_plan
 
 logger = logging.getLogger(__name__)
 
+# Ledgers at least this long write the Excel report and PDF in worker
+# processes; below it, starting them costs more than it saves
+OUTPUT_PROCESS_MIN_ROWS = 50_000
+
 
 def _generate_dashboard_html(
     visualizations: dict[str, str],
@@ -100,6 +98,22 @@ def _generate_executive_summary_pdf(
     output_dir: Path,
     logger_instance: logging.Logger = logger,
 ) -> Path:
+    # reportlab is only imported when a PDF is actually requested.
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (
+        Image,
+        PageBreak,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
+
     logger_instance.info(f"Generating Executive Summary PDF in {output_dir}...")
     pdf_path = output_dir / "executive_report_v2.3.pdf"
     doc = SimpleDocTemplate(
@@ -259,6 +273,115 @@ def _generate_executive_summary_pdf(
     return pdf_path
 
 
+@dataclass
+class OutputJob:
+    """One output file: ``write(*args)`` creates it and returns its path."""
+
+    key: str
+    write: Callable[..., Path]
+    args: tuple[Any, ...]
+    wanted: bool = True
+    # CPU-bound writers may run in a worker process instead of a thread
+    cpu_bound: bool = False
+
+
+def _timed_call(
+    write: Callable[..., Path], args: tuple[Any, ...]
+) -> tuple[Path, float]:
+    start = time.perf_counter()
+    path = write(*args)
+    return path, time.perf_counter() - start
+
+
+def run_output_jobs(
+    jobs: list[OutputJob],
+    *,
+    use_processes: bool = False,
+    max_threads: int = 4,
+    logger_instance: logging.Logger = logger,
+) -> tuple[dict[str, str], dict[str, float]]:
+    """Run ``jobs`` concurrently; return their paths and seconds, by key.
+
+    Jobs run on a thread pool, except CPU-bound ones when ``use_processes``
+    is set, which get a process each. A failing job is logged and left out
+    of the results; the others still complete.
+    """
+    paths: dict[str, str] = {}
+    timings: dict[str, float] = {}
+    if not jobs:
+        return paths, timings
+
+    process_jobs = [job for job in jobs if use_processes and job.cpu_bound]
+    process_pool = None
+    if process_jobs:
+        try:
+            process_pool = ProcessPoolExecutor(max_workers=len(process_jobs))
+        except (OSError, NotImplementedError) as e:
+            logger_instance.warning(f"Output processes unavailable, using threads: {e}")
+            process_jobs = []
+
+    futures: dict[str, Future[tuple[Path, float]]] = {}
+    try:
+        # Workers are started before any writer thread exists
+        for job in process_jobs:
+            futures[job.key] = process_pool.submit(_timed_call, job.write, job.args)
+        with ThreadPoolExecutor(
+            max_workers=min(max_threads, len(jobs)), thread_name_prefix="outputs"
+        ) as threads:
+            for job in jobs:
+                if job.key not in futures:
+                    futures[job.key] = threads.submit(_timed_call, job.write, job.args)
+            for job in jobs:
+                try:
+                    try:
+                        path, seconds = futures[job.key].result()
+                    except (BrokenProcessPool, pickle.PicklingError) as e:
+                        logger_instance.warning(
+                            f"Output process failed for {job.key}, retrying here: {e}"
+                        )
+                        path, seconds = _timed_call(job.write, job.args)
+                except Exception as e:
+                    logger_instance.error(
+                        f"Failed to generate {job.key}: {e}", exc_info=True
+                    )
+                    continue
+                paths[job.key] = str(path)
+                timings[job.key] = seconds
+                logger_instance.info(f"Saved: {path} ({seconds:.2f}s)")
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    return paths, timings
+
+
+def _write_csv(df: pd.DataFrame, path: Path, columns: list[str] | None = None) -> Path:
+    (df if columns is None else df[columns]).to_csv(path, index=False)
+    return path
+
+
+def _write_json(data: Any, path: Path) -> Path:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def _write_data_quality_log(issues: list[dict[str, Any]], path: Path) -> Path:
+    error_df = pd.DataFrame(issues)
+    if "row_data_sample" in error_df.columns:
+        error_df["row_data_sample"] = error_df["row_data_sample"].astype(str)
+    error_df.to_csv(path, index=False)
+    return path
+
+
+def _write_excel_report(sheets: list[tuple[str, pd.DataFrame]], path: Path) -> Path:
+    # Rows stream straight to disk, so the ledger sheet's size does not
+    # drive memory use
+    with StreamingExcelWriter(path) as writer:
+        for sheet_name, df in sheets:
+            writer.write_frame(sheet_name, df)
+    return path
+
+
 def generate_all_outputs(
     master_ledger: pd.DataFrame,
     reconciliation_results: dict[str, Any],
@@ -271,11 +394,16 @@ def generate_all_outputs(
     config: AnalysisConfig,  # Pass full config
     output_dir_path_str: str = "analysis_output",  # Allow overriding output dir
     logger_instance: logging.Logger = logger,
+    output_timings: dict[str, float] | None = None,  # Filled with seconds per output
 ) -> dict[str, str]:
     logger_instance.info(f"Generating all output files in '{output_dir_path_str}'...")
     output_dir = Path(output_dir_path_str)
     output_dir.mkdir(exist_ok=True)
     output_paths: dict[str, str] = {}
+    plan = resolve_output_plan(config.outputs)
+    if not (plan.outputs - {"recon"}):
+        logger_instance.info("No file outputs requested; skipping output generation.")
+        return output_paths
 
     master_ledger_export = master_ledger.copy()
     if "Date" in master_ledger_export.columns:
@@ -297,49 +425,29 @@ def generate_all_outputs(
         "RunningBalance", pd.NA
     )
 
-    # 1. Master Ledger CSV
-    if not master_ledger_export.empty:
-        ledger_path = output_dir / "master_ledger_v2.3.csv"
-        try:
-            master_ledger_export.to_csv(ledger_path, index=False)
-            output_paths["master_ledger_csv"] = str(ledger_path)
-            logger_instance.info(f"Saved: {ledger_path}")
-        except Exception as e:
-            logger_instance.error(f"Failed to save master_ledger_v2.3.csv: {e}")
-
-        # 2. Line-by-line reconciliation CSV
-        recon_csv_path = output_dir / "line_by_line_reconciliation_v2.3.csv"
-        recon_cols = [
-            "Date",
-            "Category_Display",
-            "Payer",
-            "Description",
-            "Amount_Charged_Display",
-            "Shared_Amount_Display",
-            "RyanOwes",
-            "JordynOwes",
-            "BalanceImpact",
-            "Cumulative_Balance_Display",
-            "Who_Paid_Text",
-            "Share_Type",
-            "Shared_Reason",
-            "DataQuality_Audit",
-            "DataQualityFlag",
-            "TransactionID",
-        ]
-        final_recon_cols = [
-            col for col in recon_cols if col in master_ledger_export.columns
-        ]
-        try:
-            master_ledger_export[final_recon_cols].to_csv(recon_csv_path, index=False)
-            output_paths["reconciliation_detail_csv"] = str(recon_csv_path)
-            logger_instance.info(f"Saved: {recon_csv_path}")
-        except Exception as e:
-            logger_instance.error(
-                f"Failed to save line_by_line_reconciliation_v2.3.csv: {e}"
-            )
+    recon_cols = [
+        "Date",
+        "Category_Display",
+        "Payer",
+        "Description",
+        "Amount_Charged_Display",
+        "Shared_Amount_Display",
+        "RyanOwes",
+        "JordynOwes",
+        "BalanceImpact",
+        "Cumulative_Balance_Display",
+        "Who_Paid_Text",
+        "Share_Type",
+        "Shared_Reason",
+        "DataQuality_Audit",
+        "DataQualityFlag",
+        "TransactionID",
+    ]
+    final_recon_cols = [
+        col for col in recon_cols if col in master_ledger_export.columns
+    ]
 
-    # 3. Executive Summary CSV
+    # Executive summary, shared by the summary CSV, Excel report and PDF
     # Calculate data quality score here if not passed in analytics_results
     # For now, assuming it's part of analytics_results or calculated separately by orchestrator
     dq_score = analytics_results.get(
@@ -351,18 +459,18 @@ def generate_all_outputs(
         "Total Shared Processed": f"${reconciliation_results.get('total_shared_amount', 0):,.2f}",
         "Data Quality Score": f"{dq_score:.1f}%",
         "Overall Risk Level": risk_assessment.get("overall_risk_level", "N/A"),
-        "Triple Reconciliation Matched": "YES"
-        if reconciliation_results.get("reconciled", False)
-        else "NO",
+        "Triple Reconciliation Matched": (
+            "YES" if reconciliation_results.get("reconciled", False) else "NO"
+        ),
         "Ledger Balance Matched": str(
             analytics_results.get("validation_summary", {}).get(
                 "ledger_balance_match", "N/A"
             )
         ),  # Assuming validation summary is in analytics
         "Processing Time (s)": f"{analytics_results.get('performance_metrics',{}).get('processing_time_seconds',0):.1f}",
-        "Total Transactions Analyzed": len(master_ledger)
-        if not master_ledger.empty
-        else 0,
+        "Total Transactions Analyzed": (
+            len(master_ledger) if not master_ledger.empty else 0
+        ),
     }
     # Add source data summary if available in analytics_results
     src_summary = analytics_results.get("data_sources_summary", {})
@@ -370,131 +478,140 @@ def generate_all_outputs(
         summary_data[f"Source - {src_name} rows"] = details.get("rows", 0)
 
     summary_df = pd.DataFrame(list(summary_data.items()), columns=["Metric", "Value"])
-    exec_path = output_dir / "executive_summary_v2.3.csv"
-    try:
-        summary_df.to_csv(exec_path, index=False)
-        output_paths["executive_summary_csv"] = str(exec_path)
-        logger_instance.info(f"Saved: {exec_path}")
-    except Exception as e:
-        logger_instance.error(f"Failed to save executive_summary_v2.3.csv: {e}")
-
-    # 4. Alt-texts JSON
-    alt_text_path = output_dir / "alt_texts_v2.3.json"
-    try:
-        with open(alt_text_path, "w", encoding="utf-8") as f:
-            json.dump(alt_texts, f, indent=2)
-        output_paths["alt_texts_json"] = str(alt_text_path)
-        logger_instance.info(f"Saved: {alt_text_path} with {len(alt_texts)} entries")
-    except Exception as e:
-        logger_instance.error(f"Failed to save alt_texts_v2.3.json: {e}")
-
-    # 5. Data Quality Issues Log CSV
-    if data_quality_issues:
-        error_df = pd.DataFrame(data_quality_issues)
-        if "row_data_sample" in error_df.columns:
-            error_df["row_data_sample"] = error_df["row_data_sample"].astype(str)
-        error_path = output_dir / "data_quality_issues_log_v2.3.csv"
-        try:
-            error_df.to_csv(error_path, index=False)
-            output_paths["data_quality_log_csv"] = str(error_path)
-            logger_instance.info(f"Saved: {error_path}")
-        except Exception as e:
-            logger_instance.error(
-                f"Failed to save data_quality_issues_log_v2.3.csv: {e}"
-            )
-    else:
-        logger_instance.info("No data quality issues to log to CSV.")
-
-    # 6. Excel Report
-    excel_path = output_dir / "financial_analysis_report_v2.3.xlsx"
-    try:
-        with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-            summary_df.to_excel(writer, sheet_name="Executive Summary", index=False)
-            if not master_ledger_export.empty:
-                excel_ledger_cols = [
-                    col
-                    for col in final_recon_cols
-                    if col in master_ledger_export.columns
-                ]
-                master_ledger_export[excel_ledger_cols].to_excel(
-                    writer, sheet_name="Ledger Highlights", index=False
-                )
-
-            pd.DataFrame(
-                list(reconciliation_results.items()), columns=["Metric", "Value"]
-            ).to_excel(writer, sheet_name="Reconciliation Details", index=False)
-            if (
-                "category_details" in reconciliation_results
-                and reconciliation_results["category_details"]
-            ):
-                pd.DataFrame(reconciliation_results["category_details"]).to_excel(
-                    writer, sheet_name="Recon Category Breakdown", index=False
-                )
 
-            if "expense_category_analysis" in analytics_results and isinstance(
-                analytics_results["expense_category_analysis"].get("summary_table"),
-                list,
-            ):
+    # Excel report sheets, in workbook order
+    excel_sheets: list[tuple[str, pd.DataFrame]] = []
+    if plan.wants("excel"):
+        excel_sheets.append(("Executive Summary", summary_df))
+        if not master_ledger_export.empty:
+            excel_sheets.append(
+                ("Ledger Highlights", master_ledger_export[final_recon_cols])
+            )
+        excel_sheets.append(
+            (
+                "Reconciliation Details",
                 pd.DataFrame(
-                    analytics_results["expense_category_analysis"]["summary_table"]
-                ).to_excel(writer, sheet_name="Expense Category Stats", index=False)
-
-            if "details" in risk_assessment and risk_assessment["details"]:
-                pd.DataFrame(risk_assessment["details"]).to_excel(
-                    writer, sheet_name="Risk Assessment Details", index=False
+                    list(reconciliation_results.items()), columns=["Metric", "Value"]
+                ),
+            )
+        )
+        if (
+            "category_details" in reconciliation_results
+            and reconciliation_results["category_details"]
+        ):
+            excel_sheets.append(
+                (
+                    "Recon Category Breakdown",
+                    pd.DataFrame(reconciliation_results["category_details"]),
                 )
-
-            pd.DataFrame(recommendations, columns=["Recommendations"]).to_excel(
-                writer, sheet_name="Recommendations", index=False
             )
-
-            visual_index_data = [
-                {
-                    "Visualization": k,
-                    "Filename": Path(v).name,
-                    "Alt Text": alt_texts.get(k, "N/A"),
-                }
-                for k, v in visualizations.items()
-            ]
-            pd.DataFrame(visual_index_data).to_excel(
-                writer, sheet_name="Visual Index", index=False
+        if "expense_category_analysis" in analytics_results and isinstance(
+            analytics_results["expense_category_analysis"].get("summary_table"),
+            list,
+        ):
+            excel_sheets.append(
+                (
+                    "Expense Category Stats",
+                    pd.DataFrame(
+                        analytics_results["expense_category_analysis"]["summary_table"]
+                    ),
+                )
+            )
+        if "details" in risk_assessment and risk_assessment["details"]:
+            excel_sheets.append(
+                ("Risk Assessment Details", pd.DataFrame(risk_assessment["details"]))
+            )
+        excel_sheets.append(
+            (
+                "Recommendations",
+                pd.DataFrame(recommendations, columns=["Recommendations"]),
             )
-
-        output_paths["excel_report"] = str(excel_path)
-        logger_instance.info(f"Saved: {excel_path}")
-    except Exception as e_excel:
-        logger_instance.error(
-            f"Failed to generate Excel report {excel_path}: {e_excel}", exc_info=True
         )
+        visual_index_data = [
+            {
+                "Visualization": k,
+                "Filename": Path(v).name,
+                "Alt Text": alt_texts.get(k, "N/A"),
+            }
+            for k, v in visualizations.items()
+        ]
+        excel_sheets.append(("Visual Index", pd.DataFrame(visual_index_data)))
 
-    # 7. Dashboard HTML
-    try:
-        dashboard_path = _generate_dashboard_html(
-            visualizations, alt_texts, output_dir, logger_instance
-        )
-        output_paths["dashboard_html"] = str(dashboard_path)
-        # logger_instance.info(f"Saved: {dashboard_path}") # Already logged in helper
-    except Exception as e_dash:
-        logger_instance.error(
-            f"Failed to generate dashboard HTML: {e_dash}", exc_info=True
-        )
+    if not data_quality_issues:
+        logger_instance.info("No data quality issues to log to CSV.")
 
-    # 8. Executive PDF
-    try:
-        pdf_path = _generate_executive_summary_pdf(
-            summary_data,
-            visualizations,
-            alt_texts,
-            recommendations,
-            output_dir,
-            logger_instance,
-        )
-        output_paths["executive_pdf"] = str(pdf_path)
-        # logger_instance.info(f"Saved: {pdf_path}") # Already logged in helper
-    except Exception as e_pdf:
-        logger_instance.error(
-            f"Failed to generate executive PDF: {e_pdf}", exc_info=True
-        )
+    # The artifacts only read the prepared frames, so they are written
+    # concurrently; one failing does not stop the others.
+    candidates = [
+        OutputJob(
+            "master_ledger_csv",
+            _write_csv,
+            (master_ledger_export, output_dir / "master_ledger_v2.3.csv"),
+            wanted=not master_ledger_export.empty and plan.wants("ledger-csv"),
+        ),
+        OutputJob(
+            "reconciliation_detail_csv",
+            _write_csv,
+            (
+                master_ledger_export,
+                output_dir / "line_by_line_reconciliation_v2.3.csv",
+                final_recon_cols,
+            ),
+            wanted=not master_ledger_export.empty and plan.wants("recon-csv"),
+        ),
+        OutputJob(
+            "executive_summary_csv",
+            _write_csv,
+            (summary_df, output_dir / "executive_summary_v2.3.csv"),
+            wanted=plan.wants("summary-csv"),
+        ),
+        OutputJob(
+            "alt_texts_json",
+            _write_json,
+            (alt_texts, output_dir / "alt_texts_v2.3.json"),
+            wanted=plan.wants("alt-texts"),
+        ),
+        OutputJob(
+            "data_quality_log_csv",
+            _write_data_quality_log,
+            (data_quality_issues, output_dir / "data_quality_issues_log_v2.3.csv"),
+            wanted=bool(data_quality_issues) and plan.wants("dq-log"),
+        ),
+        OutputJob(
+            "excel_report",
+            _write_excel_report,
+            (excel_sheets, output_dir / "financial_analysis_report_v2.3.xlsx"),
+            wanted=plan.wants("excel"),
+            cpu_bound=True,
+        ),
+        OutputJob(
+            "dashboard_html",
+            _generate_dashboard_html,
+            (visualizations, alt_texts, output_dir, logger_instance),
+            wanted=plan.wants("dashboard"),
+        ),
+        OutputJob(
+            "executive_pdf",
+            _generate_executive_summary_pdf,
+            (
+                summary_data,
+                visualizations,
+                alt_texts,
+                recommendations,
+                output_dir,
+                logger_instance,
+            ),
+            wanted=plan.wants("pdf"),
+            cpu_bound=True,
+        ),
+    ]
+    jobs = [job for job in candidates if job.wanted]
+    use_processes = len(master_ledger_export) >= OUTPUT_PROCESS_MIN_ROWS
+    output_paths, timings = run_output_jobs(
+        jobs, use_processes=use_processes, logger_instance=logger_instance
+    )
+    if output_timings is not None:
+        output_timings.update(timings)
 
     logger_instance.info(
         f"Generated {len(output_paths)} output files in {output_dir.resolve()}"
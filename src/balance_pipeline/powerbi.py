@@ -0,0 +1,225 @@
+"""
+Power BI star-schema export.
+
+``--format powerbi`` writes the processed transactions as a star schema
+that a Power BI folder source can refresh incrementally::
+
+    <output_dir>/fact_transactions/year=2024/month=05/part-0.parquet
+    <output_dir>/dim_merchant.parquet
+    <output_dir>/dim_account.parquet
+    <output_dir>/dim_owner.parquet
+    <output_dir>/dim_category.parquet
+    <output_dir>/manifest.json
+
+Dimension members get integer surrogate keys that stay stable between
+exports: members already in a dimension keep their key and new ones are
+appended. Key 0 is the "(Unknown)" member for missing values. The fact
+table carries the keys in place of the text columns. A fact partition
+whose contents match the digest recorded in the manifest is not
+rewritten, so a refresh only reloads the months that changed.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLE = "fact_transactions"
+MANIFEST_NAME = "manifest.json"
+DATE_COLUMN = "Date"
+# Dimension name -> source column in the processed transactions
+DIMENSIONS = {
+    "merchant": "Merchant",
+    "account": "Account",
+    "owner": "Owner",
+    "category": "Category",
+}
+UNKNOWN_KEY = 0
+UNKNOWN_MEMBER = "(Unknown)"
+# pyarrow's name for the partition of rows without a date
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+@dataclass
+class PowerBIExport:
+    """What one export wrote; paths are relative to ``output_dir``."""
+
+    output_dir: Path
+    written: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    dimensions: dict[str, int] = field(default_factory=dict)
+
+
+def _digest(df: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    header = [(str(c), str(t)) for c, t in df.dtypes.items()]
+    digest.update(json.dumps(header).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    return digest.hexdigest()
+
+
+def _stable_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Give object columns one Arrow type, whatever rows a partition holds."""
+    converted = {}
+    for name, dtype in df.dtypes.items():
+        if not pd.api.types.is_object_dtype(dtype):
+            continue
+        kind = pd.api.types.infer_dtype(df[name], skipna=True)
+        converted[name] = "boolean" if kind == "boolean" else "string"
+    return df.astype(converted) if converted else df
+
+
+class PowerBIDataset:
+    """A star-schema Parquet dataset under ``output_dir``."""
+
+    def __init__(self, output_dir: str | Path, *, compression: str = "zstd") -> None:
+        self.output_dir = Path(output_dir)
+        self.compression = compression
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_dir / MANIFEST_NAME
+
+    def manifest(self) -> dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"partitions": {}}
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {"partitions": {}}
+
+    def write(self, df: pd.DataFrame) -> PowerBIExport:
+        """Export ``df``, rewriting only dimensions and partitions that changed."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        export = PowerBIExport(self.output_dir)
+        previous = self.manifest().get("partitions", {})
+
+        fact = df.copy(deep=False)
+        key_columns = []
+        for name, column in DIMENSIONS.items():
+            if column not in fact.columns:
+                continue
+            keys, members = self._dimension_keys(name, column, fact[column])
+            fact[f"{name}_key"] = keys
+            key_columns.append(f"{name}_key")
+            export.dimensions[name] = members
+        fact = fact.drop(columns=[DIMENSIONS[name] for name in export.dimensions])
+        fact = fact[key_columns + [c for c in fact.columns if c not in key_columns]]
+        fact = _stable_dtypes(fact)
+
+        partitions = {}
+        for relative, part in self._partitions(fact):
+            digest = _digest(part)
+            partitions[relative] = digest
+            path = self.output_dir / relative
+            if previous.get(relative) == digest and path.exists():
+                export.unchanged.append(relative)
+                continue
+            self._write_parquet(part, path)
+            export.written.append(relative)
+
+        for relative in sorted(set(previous) - set(partitions)):
+            path = self.output_dir / relative
+            path.unlink(missing_ok=True)
+            for parent in (path.parent, path.parent.parent):
+                if parent.is_dir() and not any(parent.iterdir()):
+                    parent.rmdir()
+            export.removed.append(relative)
+
+        self._write_manifest(
+            {
+                "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "rows": len(fact),
+                "dimensions": export.dimensions,
+                "partitions": partitions,
+            }
+        )
+        logger.info(
+            f"Power BI dataset {self.output_dir}: {len(export.written)} partitions "
+            f"written, {len(export.unchanged)} unchanged, "
+            f"{len(export.removed)} removed"
+        )
+        return export
+
+    def _dimension_keys(
+        self, name: str, column: str, values: pd.Series
+    ) -> tuple[np.ndarray, int]:
+        """Surrogate keys for ``values``; returns them and the member count."""
+        path = self.output_dir / f"dim_{name}.parquet"
+        key_column = f"{name}_key"
+        if path.exists():
+            dim = pd.read_parquet(path)
+            members = dict(zip(dim[column], dim[key_column].tolist(), strict=True))
+        else:
+            members = {UNKNOWN_MEMBER: UNKNOWN_KEY}
+
+        codes, uniques = pd.factorize(values)
+        labels = uniques.astype(str)
+        new = sorted(set(labels) - set(members))
+        if new or not path.exists():
+            start = max(members.values()) + 1
+            members.update(zip(new, range(start, start + len(new)), strict=True))
+            dim = pd.DataFrame(
+                {
+                    key_column: np.fromiter(members.values(), dtype="int32"),
+                    column: pd.array(list(members), dtype="string"),
+                }
+            )
+            self._write_parquet(dim, path)
+
+        unique_keys = np.array([members[label] for label in labels], dtype="int32")
+        # Missing values (code -1) map to the unknown member
+        keys = np.append(unique_keys, np.int32(UNKNOWN_KEY))[codes]
+        return keys, len(members)
+
+    def _partitions(self, fact: pd.DataFrame) -> Iterator[tuple[str, pd.DataFrame]]:
+        """Yield ``(relative path, rows)`` per year/month of ``DATE_COLUMN``."""
+        if DATE_COLUMN in fact.columns:
+            dates = pd.to_datetime(fact[DATE_COLUMN], errors="coerce")
+        else:
+            dates = pd.Series(pd.NaT, index=fact.index)
+        order = np.argsort(dates.to_numpy(), kind="stable")
+        fact, dates = fact.iloc[order], dates.iloc[order]
+        period = dates.dt.year.fillna(-1) * 100 + dates.dt.month.fillna(0)
+        for value, part in fact.groupby(period.to_numpy(), sort=True):
+            if value < 0:
+                year = month = NULL_PARTITION
+            else:
+                year, month = f"{int(value) // 100:04d}", f"{int(value) % 100:02d}"
+            yield (
+                f"{FACT_TABLE}/year={year}/month={month}/part-0.parquet",
+                part.reset_index(drop=True),
+            )
+
+    def _write_parquet(self, df: pd.DataFrame, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        df.to_parquet(
+            tmp, index=False, compression=self.compression, use_dictionary=True
+        )
+        tmp.replace(path)
+
+    def _write_manifest(self, manifest: dict[str, Any]) -> None:
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+
+
+def write_powerbi_dataset(
+    df: pd.DataFrame, output_dir: str | Path, *, compression: str = "zstd"
+) -> PowerBIExport:
+    """Export ``df`` as a star-schema Parquet dataset under ``output_dir``."""
+    return PowerBIDataset(output_dir, compression=compression).write(df)
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
 from datetime import UTC, datetime
-from pathlib import Path
 from typing import Any
 
 import numpy as np
@@ -10,6 +10,8 @@ import pandas as pd
 
 # Assuming config.py and loaders.py are in the same directory or accessible via PYTHONPATH
 from .config import AnalysisConfig, DataQualityFlag
+from .debug_snapshots import DebugSnapshotWriter, snapshot_writer
+from .utils import copy_on_write
 
 # from .loaders import merge_expense_and_ledger_data, merge_rent_data # Not needed directly here if passed as DFs
 
@@ -152,6 +154,158 @@ def _impute_missing_date_processing(
     return now.replace(day=1) + pd.offsets.MonthEnd(0)
 
 
+DUPLICATE_KEY_COLUMNS = ["Date", "Payer", "ActualAmount", "Merchant"]
+ISSUE_SAMPLE_COLUMNS = ["Date", "Payer", "ActualAmount", "AllowedAmount", "Description"]
+
+
+def _sanitize_issue_value(value: Any) -> Any:
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (list, dict, pd.Series)):
+        return str(value)
+    if pd.isna(value):
+        return "NaN"
+    return value
+
+
+def log_data_quality_issues(
+    data_quality_issues_list: list[dict[str, Any]],
+    source: str,
+    rows: pd.DataFrame,
+    flags: list[DataQualityFlag | str],
+    logger_instance: logging.Logger = logger,
+) -> None:
+    """Batch form of ``_log_data_quality_issue_processing`` for ``rows``.
+
+    Appends one issue per row with the same fields, but the samples are
+    sanitized per distinct value and a single warning covers the batch.
+    The per-row lines are still logged, at DEBUG.
+    """
+    if rows.empty:
+        return
+    flag_values = [getattr(f, "value", f) for f in flags]
+    columns = [c for c in ISSUE_SAMPLE_COLUMNS if c in rows.columns]
+    samples = pd.DataFrame(index=rows.index)
+    for col in columns:
+        try:
+            samples[col] = format_values(rows[col], _sanitize_issue_value)
+        except TypeError:  # Unhashable cells cannot be factorized
+            samples[col] = rows[col].map(_sanitize_issue_value)
+    timestamp = datetime.now(UTC).isoformat()
+    data_quality_issues_list.extend(
+        {
+            "source": source,
+            "row_index_in_source_df": row_idx,
+            "flags": list(flag_values),
+            "timestamp": timestamp,
+            "row_data_sample": sample,
+        }
+        for row_idx, sample in zip(
+            rows.index.astype(str), samples.to_dict("records"), strict=True
+        )
+    )
+    if logger_instance.isEnabledFor(logging.DEBUG):
+        for issue in data_quality_issues_list[-len(rows) :]:
+            logger_instance.debug(
+                f"Data quality issue in {source} "
+                f"(index: {issue['row_index_in_source_df']}): {flag_values}. "
+                f"Sample: {issue['row_data_sample']}"
+            )
+    shown = ", ".join(rows.index[:10].astype(str))
+    logger_instance.warning(
+        f"Data quality issue in {source} for {len(rows)} rows: {flag_values}. "
+        f"Indices: {shown}{', ...' if len(rows) > 10 else ''}"
+    )
+
+
+def _merge_quality_flags(existing: Any, new_flag_values: list[str]) -> Any:
+    """Flag string after ``_update_row_data_quality_flags_processing``."""
+    current_flags_list = []
+    if pd.notna(existing) and existing != DataQualityFlag.CLEAN.value:
+        current_flags_list = existing.split(",")
+    added = [f for f in new_flag_values if f not in current_flags_list]
+    if added:
+        current_flags_list.extend(dict.fromkeys(added))
+        if (
+            DataQualityFlag.CLEAN.value in current_flags_list
+            and len(current_flags_list) > 1
+        ):
+            current_flags_list.remove(DataQualityFlag.CLEAN.value)
+        return ",".join(sorted(set(current_flags_list)))
+    if pd.isna(existing):
+        return DataQualityFlag.CLEAN.value
+    return existing
+
+
+def with_quality_flags(
+    df: pd.DataFrame, mask: pd.Series, new_flags_enums: list[DataQualityFlag]
+) -> pd.Series:
+    """``DataQualityFlag`` column with ``new_flags_enums`` added where ``mask``.
+
+    Equivalent to calling ``_update_row_data_quality_flags_processing`` for
+    every masked row; the merge runs once per distinct existing flag string.
+    """
+    flags = _column(df, "DataQualityFlag", DataQualityFlag.CLEAN.value)
+    if not new_flags_enums or not mask.any():
+        return flags
+    new_flag_values = [flag.value for flag in new_flags_enums]
+    selected = mask.to_numpy(dtype=bool)
+    merged = format_values(
+        flags[selected],
+        lambda existing: _merge_quality_flags(existing, new_flag_values),
+    )
+    values = flags.to_numpy(dtype=object, copy=True)
+    values[selected] = merged.to_numpy()
+    return pd.Series(values, index=df.index, name="DataQualityFlag")
+
+
+def _duplicate_mask(df: pd.DataFrame) -> pd.Series | None:
+    """Rows repeating the (day, Payer, ActualAmount, Merchant) of an earlier row.
+
+    Returns ``None`` when fewer than three of the key columns are present.
+    """
+    available_dup_cols = [col for col in DUPLICATE_KEY_COLUMNS if col in df.columns]
+    if len(available_dup_cols) < 3:
+        return None
+    keys = df[available_dup_cols]
+    if "Date" in keys.columns and pd.api.types.is_datetime64_any_dtype(keys["Date"]):
+        keys = keys.assign(Date=keys["Date"].dt.normalize())
+    return keys.duplicated(keep="first")
+
+
+def apply_calculation_notes(
+    df: pd.DataFrame, trigger: str
+) -> tuple[pd.DataFrame, pd.Series]:
+    """Set ``AllowedAmount = 2 * ActualAmount`` where the description has ``trigger``."""
+    two_x_mask = df["Description"].str.contains(trigger, case=False, na=False)
+    if not two_x_mask.any():
+        return df, two_x_mask
+    df = df.copy(deep=False)  # Whole columns are replaced, never written into
+    df["AllowedAmount"] = df["AllowedAmount"].mask(two_x_mask, df["ActualAmount"] * 2)
+    df["DataQualityFlag"] = with_quality_flags(
+        df, two_x_mask, [DataQualityFlag.MANUAL_CALCULATION_NOTE]
+    )
+    return df, two_x_mask
+
+
+def flag_duplicates(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series | None]:
+    """Add ``DUPLICATE_SUSPECTED`` to rows repeating an earlier row's key.
+
+    Returns the frame and the duplicate mask (``None`` if it cannot be built).
+    """
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df = df.copy(deep=False)
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    duplicates_mask = _duplicate_mask(df)
+    if duplicates_mask is None or not duplicates_mask.any():
+        return df, duplicates_mask
+    df = df.copy(deep=False)
+    df["DataQualityFlag"] = with_quality_flags(
+        df, duplicates_mask, [DataQualityFlag.DUPLICATE_SUSPECTED]
+    )
+    return df, duplicates_mask
+
+
 def _handle_calculation_notes_in_processed_data(
     df: pd.DataFrame,
     config: AnalysisConfig,
@@ -167,47 +321,20 @@ def _handle_calculation_notes_in_processed_data(
         )
         return df
 
-    # Using DEFAULT_CALCULATION_NOTE_TRIGGER from config module (or AnalysisConfig if moved there)
-    # For now, assuming it's accessible via config object or directly imported if it remains a global in config.py
-    # Let's assume config.DEFAULT_CALCULATION_NOTE_TRIGGER for this example
-    # This needs to be resolved based on where DEFAULT_CALCULATION_NOTE_TRIGGER is defined.
-    # If it's a global in config.py, it would be: from .config import DEFAULT_CALCULATION_NOTE_TRIGGER
     # For now, let's hardcode it here and note it for refactoring with config loading.
     calculation_note_trigger = "2x to calculate"  # Placeholder, should come from config
 
-    two_x_mask = df["Description"].str.contains(
-        calculation_note_trigger, case=False, na=False
-    )
-    modified_indices = []
-
-    for idx in df[two_x_mask].index:
-        actual_amount_for_row = df.loc[idx, "ActualAmount"]
-        new_allowed_amount = actual_amount_for_row * 2
-        original_allowed = df.loc[idx, "AllowedAmount"]
-
-        log_msg = (
-            f"Row {idx}: '{calculation_note_trigger}' found. "
-            f"Setting AllowedAmount from (ActualAmount * 2): ({actual_amount_for_row} * 2 = {new_allowed_amount}). "
-            f"Original AllowedAmount was: {original_allowed}."
-        )
-        df.loc[idx, "AllowedAmount"] = new_allowed_amount
-        modified_indices.append(idx)
-        logger_instance.info(log_msg)
-        _update_row_data_quality_flags_processing(
-            df, idx, [DataQualityFlag.MANUAL_CALCULATION_NOTE]
-        )
-        _log_data_quality_issue_processing(
+    df, two_x_mask = apply_calculation_notes(df, calculation_note_trigger)
+    if two_x_mask.any():
+        log_data_quality_issues(
             data_quality_issues_list,
             "expense_2x_note_check",
-            idx,
-            df.loc[idx].to_dict(),
+            df[two_x_mask],
             [DataQualityFlag.MANUAL_CALCULATION_NOTE],
             logger_instance,
         )
-
-    if modified_indices:
         logger_instance.info(
-            f"Applied '{calculation_note_trigger}' calculation to 'AllowedAmount' for {len(modified_indices)} rows based on description note."
+            f"Applied '{calculation_note_trigger}' calculation to 'AllowedAmount' for {two_x_mask.sum()} rows based on description note."
         )
     return df
 
@@ -223,56 +350,38 @@ def _detect_duplicates_in_processed_data(
     if df.empty:
         return df
 
-    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-    dup_cols = ["Date", "Payer", "ActualAmount", "Merchant"]
-    available_dup_cols = [col for col in dup_cols if col in df.columns]
-
-    if len(available_dup_cols) < 3:
+    df, duplicates_mask = flag_duplicates(df)
+    if duplicates_mask is None:
         logger_instance.warning(
-            f"Skipping duplicate detection: Not enough key columns available (need at least 3 from {dup_cols})."
+            f"Skipping duplicate detection: Not enough key columns available (need at least 3 from {DUPLICATE_KEY_COLUMNS})."
         )
         return df
 
-    temp_df_for_dup_check = df[available_dup_cols].copy()
-    if pd.api.types.is_datetime64_any_dtype(temp_df_for_dup_check["Date"]):
-        temp_df_for_dup_check["DateForDup"] = temp_df_for_dup_check["Date"].dt.date
-        check_cols_for_dup = ["DateForDup"] + [
-            col for col in available_dup_cols if col != "Date"
-        ]
-    else:
-        check_cols_for_dup = available_dup_cols
-
-    duplicates_mask = temp_df_for_dup_check.duplicated(
-        subset=check_cols_for_dup, keep="first"
-    )
     num_duplicates = duplicates_mask.sum()
-
     if num_duplicates > 0:
         logger_instance.warning(
             f"Detected {num_duplicates} potential duplicate transactions in merged data."
         )
-        for idx in df[duplicates_mask].index:
-            _update_row_data_quality_flags_processing(
-                df, idx, [DataQualityFlag.DUPLICATE_SUSPECTED]
-            )
-            _log_data_quality_issue_processing(
-                data_quality_issues_list,
-                "merged_dup_check",
-                idx,
-                df.loc[idx].to_dict(),
-                [DataQualityFlag.DUPLICATE_SUSPECTED],
-                logger_instance,
-            )
+        log_data_quality_issues(
+            data_quality_issues_list,
+            "merged_dup_check",
+            df[duplicates_mask],
+            [DataQualityFlag.DUPLICATE_SUSPECTED],
+            logger_instance,
+        )
     return df
 
 
+# Indexed by an is-settlement flag; rows share these two string objects
+_TRANSACTION_TYPES = np.array(["EXPENSE", "SETTLEMENT"], dtype=object)
+
+
+@copy_on_write
 def tag_settlements(df: pd.DataFrame, rules: dict[str, Any]) -> pd.DataFrame:
     """
     Tag settlement transactions based on rules.
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # Get settlement keywords from rules
     settlement_keywords = rules.get(
@@ -287,11 +396,12 @@ def tag_settlements(df: pd.DataFrame, rules: dict[str, Any]) -> pd.DataFrame:
         r"payment\s+(to|from)\s+(ryan|jordyn)", case=False, regex=True, na=False
     )
     is_settlement = is_settlement_merchant | is_settlement_description
-    df["TransactionType"] = np.where(is_settlement, "SETTLEMENT", "EXPENSE")
+    df["TransactionType"] = _TRANSACTION_TYPES[is_settlement.to_numpy(dtype=int)]
 
     return df
 
 
+@copy_on_write
 def apply_two_x_rule(
     df: pd.DataFrame,
     config: AnalysisConfig,
@@ -300,39 +410,25 @@ def apply_two_x_rule(
 ) -> pd.DataFrame:
     """
     Apply 2x calculation rule for transactions with special notes.
-    """
-    df = df.copy()
-    calculation_note_trigger = "2x to calculate"
-
-    two_x_mask = df["Description"].str.contains(
-        calculation_note_trigger, case=False, na=False
-    )
-    modified_indices = []
-
-    for idx in df[two_x_mask].index:
-        actual_amount_for_row = df.loc[idx, "ActualAmount"]
-        new_allowed_amount = actual_amount_for_row * 2
-        df.loc[idx, "AllowedAmount"] = new_allowed_amount
-        modified_indices.append(idx)
 
-        _update_row_data_quality_flags_processing(
-            df, idx, [DataQualityFlag.MANUAL_CALCULATION_NOTE]
-        )
-        _log_data_quality_issue_processing(
+    The input frame is not modified; changed columns are replaced in a
+    shallow copy.
+    """
+    df, two_x_mask = apply_calculation_notes(df, "2x to calculate")
+    if two_x_mask.any():
+        log_data_quality_issues(
             data_quality_issues_list,
             "expense_2x_note_check",
-            idx,
-            df.loc[idx].to_dict(),
+            df[two_x_mask],
             [DataQualityFlag.MANUAL_CALCULATION_NOTE],
             logger_instance,
         )
-
-    if modified_indices:
-        logger_instance.info(f"Applied 2x calculation to {len(modified_indices)} rows")
+        logger_instance.info(f"Applied 2x calculation to {two_x_mask.sum()} rows")
 
     return df
 
 
+@copy_on_write
 def detect_duplicates(
     df: pd.DataFrame,
     data_quality_issues_list: list[dict[str, Any]],
@@ -340,43 +436,22 @@ def detect_duplicates(
 ) -> pd.DataFrame:
     """
     Detect and flag potential duplicate transactions.
-    """
-    df = df.copy()
 
+    Like :func:`apply_two_x_rule`, the input frame is left untouched.
+    """
     if df.empty:
         return df
 
-    # Ensure Date column is datetime
-    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-    dup_cols = ["Date", "Payer", "ActualAmount", "Merchant"]
-    available_dup_cols = [col for col in dup_cols if col in df.columns]
-
-    if len(available_dup_cols) < 3:
+    df, duplicates_mask = flag_duplicates(df)
+    if duplicates_mask is None:
         logger_instance.warning("Skipping duplicate detection: insufficient columns")
         return df
 
-    temp_df = df[available_dup_cols].copy()
-    if pd.api.types.is_datetime64_any_dtype(temp_df["Date"]):
-        temp_df["DateForDup"] = temp_df["Date"].dt.date
-        check_cols = ["DateForDup"] + [
-            col for col in available_dup_cols if col != "Date"
-        ]
-    else:
-        check_cols = available_dup_cols
-
-    duplicates_mask = temp_df.duplicated(subset=check_cols, keep="first")
-
-    for idx in df[duplicates_mask].index:
-        _update_row_data_quality_flags_processing(
-            df, idx, [DataQualityFlag.DUPLICATE_SUSPECTED]
-        )
-        _log_data_quality_issue_processing(
+    if duplicates_mask.any():
+        log_data_quality_issues(
             data_quality_issues_list,
             "duplicate_check",
-            idx,
-            df.loc[idx].to_dict(),
+            df[duplicates_mask],
             [DataQualityFlag.DUPLICATE_SUSPECTED],
             logger_instance,
         )
@@ -384,6 +459,7 @@ def detect_duplicates(
     return df
 
 
+@copy_on_write
 def flag_row_quality(
     df: pd.DataFrame,
     config: AnalysisConfig,
@@ -392,39 +468,69 @@ def flag_row_quality(
 ) -> pd.DataFrame:
     """
     Flag data quality issues for individual rows.
-    """
-    df = df.copy()
-
-    for idx, row in df.iterrows():
-        quality_flags = []
-
-        # Check for missing date
-        if pd.isna(row["Date"]):
-            quality_flags.append(DataQualityFlag.MISSING_DATE)
-            df.loc[idx, "Date"] = _impute_missing_date_processing(
-                df, idx, "Date", logger_instance
-            )
-
-        # Check for outlier amounts
-        if row["ActualAmount"] > config.OUTLIER_THRESHOLD:
-            quality_flags.append(DataQualityFlag.OUTLIER_AMOUNT)
 
-        # Check for negative amounts
-        if row["ActualAmount"] < 0:
-            quality_flags.append(DataQualityFlag.NEGATIVE_AMOUNT)
-        if row["AllowedAmount"] < 0:
-            quality_flags.append(DataQualityFlag.NEGATIVE_AMOUNT)
-            logger_instance.warning(f"Row {idx}: Negative AllowedAmount clamped to 0")
-            df.loc[idx, "AllowedAmount"] = 0
+    Issues are recorded with the row values as they were before missing
+    dates were imputed and negative allowed amounts clamped.
+    """
+    original = df
+    df = df.copy(deep=False)
+
+    missing_date = df["Date"].isna()
+    outlier = df["ActualAmount"] > config.OUTLIER_THRESHOLD
+    negative_actual = df["ActualAmount"] < 0
+    negative_allowed = df["AllowedAmount"] < 0
+
+    # Imputation looks at neighbouring dates, including ones imputed before
+    for idx in df.index[missing_date.to_numpy()]:
+        df.loc[idx, "Date"] = _impute_missing_date_processing(
+            df, idx, "Date", logger_instance
+        )
+    if negative_allowed.any():
+        logger_instance.warning(
+            f"{negative_allowed.sum()} rows: Negative AllowedAmount clamped to 0"
+        )
+        df["AllowedAmount"] = df["AllowedAmount"].mask(negative_allowed, 0)
 
-        if quality_flags:
-            _update_row_data_quality_flags_processing(df, idx, quality_flags)
-            _log_data_quality_issue_processing(
+    checks = [
+        (missing_date, DataQualityFlag.MISSING_DATE),
+        (outlier, DataQualityFlag.OUTLIER_AMOUNT),
+        (negative_actual | negative_allowed, DataQualityFlag.NEGATIVE_AMOUNT),
+    ]
+    for mask, flag in checks:
+        if mask.any():
+            df["DataQualityFlag"] = with_quality_flags(df, mask, [flag])
+
+    # One batch of issues per combination of flags, as the row loop listed them
+    flagged = missing_date | outlier | negative_actual | negative_allowed
+    if flagged.any():
+        combos = pd.DataFrame(
+            {
+                "missing": missing_date.to_numpy(),
+                "outlier": outlier.to_numpy(),
+                "actual": negative_actual.to_numpy(),
+                "allowed": negative_allowed.to_numpy(),
+            }
+        )[flagged.to_numpy()]
+        for key, rows in combos.groupby(list(combos.columns), sort=False):
+            flags = [
+                flag
+                for present, flag in zip(
+                    key,
+                    [
+                        DataQualityFlag.MISSING_DATE,
+                        DataQualityFlag.OUTLIER_AMOUNT,
+                        DataQualityFlag.NEGATIVE_AMOUNT,
+                        DataQualityFlag.NEGATIVE_AMOUNT,
+                    ],
+                    strict=True,
+                )
+                if present
+            ]
+            log_data_quality_issues(
                 data_quality_issues_list,
                 "row_quality_check",
-                idx,
-                row.to_dict(),
-                quality_flags,
+                original.iloc[rows.index],
+                flags,
                 logger_instance,
             )
 
@@ -472,6 +578,191 @@ def _create_expense_audit_note(row: pd.Series, config: AnalysisConfig) -> str:
         return f"Error in audit note. Quality: {row.get('DataQualityFlag', DataQualityFlag.CLEAN.value)}"
 
 
+# Structured audit columns, filled when the notes are built so the master
+# ledger does not have to parse them back out of ``AuditNote``.
+AUDIT_PART_COLUMNS = [
+    "Who_Paid_Text",
+    "Share_Type",
+    "Shared_Reason",
+    "DataQuality_Audit",
+]
+
+
+def format_values(values: Any, fmt: str | Callable[[Any], str] = "") -> pd.Series:
+    """``format(value, fmt)`` per element, evaluated once per distinct value.
+
+    ``fmt`` may also be a callable returning the text for a value.
+    """
+    values = pd.Series(values)
+    render = fmt if callable(fmt) else (lambda v: format(v, fmt))
+    codes, uniques = pd.factorize(values)
+    # The extra slot at the end is what the null code (-1) picks up
+    rendered = np.empty(len(uniques) + 1, dtype=object)
+    rendered[:-1] = [render(v) for v in uniques]
+    formatted = rendered[codes]
+    nulls = np.flatnonzero(codes < 0)
+    if len(nulls):
+        # None, NaN and NaT render differently, so nulls are formatted as-is
+        formatted[nulls] = [render(v) for v in values.iloc[nulls]]
+    return pd.Series(formatted, index=values.index, dtype=object)
+
+
+def _month_label(value: Any) -> str:
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%b %Y")
+    return f"{value}"
+
+
+def _column(df: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
+def _amounts(df: pd.DataFrame, name: str) -> pd.Series:
+    return pd.to_numeric(_column(df, name, 0.0), errors="coerce").fillna(0.0)
+
+
+_EXPENSE_NOTE_KINDS = np.array(
+    ["SETTLEMENT", "PERSONAL", "FULLY_SHARED", "PARTIALLY_SHARED"], dtype=object
+)
+_EXPENSE_NOTE_TEXTS = np.array(
+    ["SETTLEMENT PAYMENT.", "PERSONAL EXPENSE – not shared.", "FULLY SHARED.", ""],
+    dtype=object,
+)
+
+
+def add_expense_audit_notes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compose ``AuditNote`` and its structured parts for expense rows.
+
+    Column-wise equivalent of ``_create_expense_audit_note``: the note kind
+    is chosen with ``np.select`` and the text is concatenated from columns.
+    """
+    actual = _amounts(df, "ActualAmount")
+    allowed = _amounts(df, "AllowedAmount")
+    payer = format_values(_column(df, "Payer", "N/A"))
+    desc = format_values(_column(df, "Description", ""), lambda v: f"{v}".strip())
+    quality = format_values(_column(df, "DataQualityFlag", DataQualityFlag.CLEAN.value))
+    trans_type = _column(df, "TransactionType", "EXPENSE")
+    is_shared = _column(df, "IsShared", False).astype(bool)
+
+    # Kinds are picked by code from object arrays, so every row shares the
+    # same few string objects instead of holding its own copy.
+    codes = np.select(
+        [
+            (trans_type == "SETTLEMENT").to_numpy(),
+            (~is_shared | (allowed.abs() < 0.01)).to_numpy(),
+            ((actual - allowed).abs() < 0.01).to_numpy(),
+        ],
+        [0, 1, 2],
+        default=3,
+    )
+    kinds = _EXPENSE_NOTE_KINDS[codes]
+    partial = codes == 3
+    reason = desc.where(desc != "", "no specific note for partial share.")
+    partial_text = (
+        "PARTIALLY SHARED: only $"
+        + format_values(allowed, ",.2f")
+        + " is shared. REASON: "
+        + reason
+    )
+    explanation = pd.Series(_EXPENSE_NOTE_TEXTS[codes], index=df.index).where(
+        ~partial, partial_text
+    )
+
+    df["AuditNote"] = (
+        payer
+        + " paid $"
+        + format_values(actual, ",.2f")
+        + " | "
+        + explanation
+        + " | DataQuality: "
+        + quality
+    )
+    df["Who_Paid_Text"] = payer.where(payer != "", "<NA>")
+    df["Share_Type"] = kinds
+    df["Shared_Reason"] = reason.where(partial, "<NA>")
+    df["DataQuality_Audit"] = quality
+    return df
+
+
+def _join_nonempty(parts: list[pd.Series], sep: str) -> pd.Series:
+    joined = parts[0]
+    for part in parts[1:]:
+        glue = np.where((joined != "") & (part != ""), sep, "")
+        joined = joined + glue + part
+    return joined
+
+
+def add_rent_audit_notes(
+    df: pd.DataFrame, month_default: str = "Unknown Month"
+) -> pd.DataFrame:
+    """
+    Compose ``Description``, ``AuditNote`` and the structured audit parts for
+    rent rows; column-wise equivalent of ``_create_enhanced_rent_audit_note``.
+    """
+    if "Month_Display" in df.columns:
+        month = df["Month_Display"]
+    else:
+        month = _column(df, "Date", "Unknown Month")
+    month_text = format_values(month, _month_label)
+
+    payer = format_values(_column(df, "Payer", "N/A"))
+    quality = format_values(_column(df, "DataQualityFlag", DataQualityFlag.CLEAN.value))
+
+    budget_parts = []
+    for column, label in (("Total_Budgeted", "Budgeted"), ("Total_Actual", "Actual")):
+        if column in df.columns:
+            values = df[column]
+            budget_parts.append(
+                (label + ": $" + format_values(values, ",.2f")).where(
+                    values.notna(), ""
+                )
+            )
+    if "Budget_Variance" in df.columns:
+        variance = df["Budget_Variance"]
+        variance_pct = _column(df, "Budget_Variance_Pct", 0)
+        text = (
+            "Variance: $"
+            + format_values(variance, "+.2f")
+            + " ("
+            + format_values(variance_pct, "+.1f")
+            + "%)"
+        )
+        budget_parts.append(text.where(variance.notna() & (variance.abs() > 0.01), ""))
+    budget = (
+        _join_nonempty(budget_parts, ", ")
+        if budget_parts
+        else pd.Series("", index=df.index, dtype=object)
+    )
+    budget = ("| Budget Info: " + budget + " ").where(budget != "", "")
+
+    df["Description"] = "Rent for " + format_values(
+        _column(df, "Month_Display", month_default)
+    )
+    df["AuditNote"] = (
+        "Rent "
+        + month_text
+        + ": Gross $"
+        + format_values(_amounts(df, "GrossTotal"), ",.2f")
+        + " paid by "
+        + payer
+        + ". Ryan's share $"
+        + format_values(_amounts(df, "RyanOwes"), ",.2f")
+        + ". "
+        + budget
+        + "Quality: "
+        + quality
+    )
+    df["Who_Paid_Text"] = payer.where(payer != "", "<NA>")
+    df["Share_Type"] = "SHARED"
+    df["Shared_Reason"] = "<NA>"
+    df["DataQuality_Audit"] = quality
+    return df
+
+
+@copy_on_write
 def calc_budget_variance(
     df: pd.DataFrame,
     config: AnalysisConfig,
@@ -481,7 +772,7 @@ def calc_budget_variance(
     """
     Calculate budget variance for rent data.
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # Check baseline variance
     if config.RENT_BASELINE > 0 and "GrossTotal" in df.columns:
@@ -525,16 +816,21 @@ def calc_budget_variance(
     return df
 
 
+@copy_on_write
 def expense_pipeline(
     df: pd.DataFrame,
     config: AnalysisConfig,
     rules: dict[str, Any],
     data_quality_issues_list: list[dict[str, Any]],
     logger_instance: logging.Logger = logger,
+    snapshots: DebugSnapshotWriter | None = None,
 ) -> pd.DataFrame:
     """
     Main expense processing pipeline orchestrator.
     Coordinates all expense processing steps with debug snapshots.
+
+    ``snapshots`` receives the intermediate frames; without one a writer is
+    created from ``config`` when ``debug_mode`` is on.
     """
     logger_instance.info("Starting expense processing pipeline...")
 
@@ -558,7 +854,8 @@ def expense_pipeline(
             ]
         )
 
-    # Data preparation
+    # Data preparation; the caller's frame is never modified
+    df = df.copy(deep=False)
     rename_map = {"Date of Purchase": "Date", "Name": "Payer"}
     df.rename(columns=rename_map, inplace=True)
 
@@ -578,25 +875,29 @@ def expense_pipeline(
     df["DataQualityFlag"] = DataQualityFlag.CLEAN.value
 
     # Step 1: Tag settlements
-    df = tag_settlements(df, rules)
-    if config.debug_mode:
-        Path("debug_output").mkdir(exist_ok=True)
-        df.to_csv("debug_output/03a_settlements_tagged.csv", index=False)
-
-    # Step 2: Apply 2x rule
-    df = apply_two_x_rule(df, config, data_quality_issues_list, logger_instance)
-    if config.debug_mode:
-        df.to_csv("debug_output/03b_two_x_applied.csv", index=False)
-
-    # Step 3: Detect duplicates
-    df = detect_duplicates(df, data_quality_issues_list, logger_instance)
-    if config.debug_mode:
-        df.to_csv("debug_output/03c_duplicates_flagged.csv", index=False)
-
-    # Step 4: Flag row quality issues
-    df = flag_row_quality(df, config, data_quality_issues_list, logger_instance)
-    if config.debug_mode:
-        df.to_csv("debug_output/03d_quality_flagged.csv", index=False)
+    snapshots, owns_snapshots = snapshot_writer(config, snapshots)
+    try:
+        df = tag_settlements(df, rules)
+        if snapshots:
+            snapshots.snapshot("03a_settlements_tagged", df)
+
+        # Step 2: Apply 2x rule
+        df = apply_two_x_rule(df, config, data_quality_issues_list, logger_instance)
+        if snapshots:
+            snapshots.snapshot("03b_two_x_applied", df)
+
+        # Step 3: Detect duplicates
+        df = detect_duplicates(df, data_quality_issues_list, logger_instance)
+        if snapshots:
+            snapshots.snapshot("03c_duplicates_flagged", df)
+
+        # Step 4: Flag row quality issues
+        df = flag_row_quality(df, config, data_quality_issues_list, logger_instance)
+        if snapshots:
+            snapshots.snapshot("03d_quality_flagged", df)
+    finally:
+        if snapshots and owns_snapshots:
+            snapshots.close()
 
     # Final calculations using rules
     payer_split = rules.get("payer_split", {"ryan_pct": 0.43, "jordyn_pct": 0.57})
@@ -669,9 +970,7 @@ def expense_pipeline(
     df.loc[jordyn_paid_ryan, "BalanceImpact"] = df.loc[jordyn_paid_ryan, "ActualAmount"]
 
     # Create audit notes
-    df["AuditNote"] = df.apply(
-        lambda row: _create_expense_audit_note(row, config), axis=1
-    )
+    df = add_expense_audit_notes(df)
 
     logger_instance.info(
         f"Processed {len(df)} expense records, {is_settlement.sum()} settlements"
@@ -679,16 +978,21 @@ def expense_pipeline(
     return df
 
 
+@copy_on_write
 def rent_pipeline(
     df: pd.DataFrame,
     config: AnalysisConfig,
     rules: dict[str, Any],
     data_quality_issues_list: list[dict[str, Any]],
     logger_instance: logging.Logger = logger,
+    snapshots: DebugSnapshotWriter | None = None,
 ) -> pd.DataFrame:
     """
     Main rent processing pipeline orchestrator.
     Coordinates all rent processing steps with debug snapshots.
+
+    ``snapshots`` receives the intermediate frames; without one a writer is
+    created from ``config`` when ``debug_mode`` is on.
     """
     logger_instance.info("Starting rent processing pipeline...")
 
@@ -714,7 +1018,8 @@ def rent_pipeline(
             ]
         )
 
-    # Data preparation
+    # Data preparation; the caller's frame is never modified
+    df = df.copy(deep=False)
     rename_map = {
         "Month_Date": "Date",
         "Month": "Month_Display",
@@ -742,26 +1047,26 @@ def rent_pipeline(
     df["DataQualityFlag"] = DataQualityFlag.CLEAN.value
 
     # Calculate budget variance
-    df = calc_budget_variance(df, config, data_quality_issues_list, logger_instance)
-    if config.debug_mode:
-        Path("debug_output").mkdir(exist_ok=True)
-        df.to_csv("debug_output/03e_rent_budget_variance.csv", index=False)
+    snapshots, owns_snapshots = snapshot_writer(config, snapshots)
+    try:
+        df = calc_budget_variance(df, config, data_quality_issues_list, logger_instance)
+        if snapshots:
+            snapshots.snapshot("03e_rent_budget_variance", df)
+    finally:
+        if snapshots and owns_snapshots:
+            snapshots.close()
 
     # Final calculations
     df["RyanOwes"] = df["RyanRentPortion"]
     df["JordynOwes"] = 0.0
     df["BalanceImpact"] = df["RyanOwes"]
-    df["Description"] = df.apply(
-        lambda r: f"Rent for {r.get('Month_Display', 'Unknown')}", axis=1
-    )
-    df["AuditNote"] = df.apply(
-        lambda row: _create_enhanced_rent_audit_note(row, config), axis=1
-    )
+    df = add_rent_audit_notes(df, month_default="Unknown")
 
     logger_instance.info(f"Processed {len(df)} rent records")
     return df
 
 
+@copy_on_write
 def process_expense_data(
     merged_expense_ledger_df: pd.DataFrame,
     config: AnalysisConfig,
@@ -771,7 +1076,7 @@ def process_expense_data(
     logger_instance: logging.Logger = logger,
 ) -> pd.DataFrame:
     logger_instance.info("Processing merged expense and ledger data...")
-    df = merged_expense_ledger_df.copy()  # Work on a copy
+    df = merged_expense_ledger_df.copy(deep=False)  # Lazy under copy-on-write
 
     if df.empty:
         logger_instance.warning(
@@ -941,9 +1246,7 @@ def process_expense_data(
         paid_by_jordyn_shared_mask, "RyanOwes"
     ]
 
-    df["AuditNote"] = df.apply(
-        lambda row: _create_expense_audit_note(row, config), axis=1
-    )
+    df = add_expense_audit_notes(df)
 
     logger_instance.info(
         f"Processed {len(df)} combined expense records. Detected {is_settlement.sum()} settlements."
@@ -998,6 +1301,7 @@ def _create_enhanced_rent_audit_note(row: pd.Series, config: AnalysisConfig) ->
     return base_note
 
 
+@copy_on_write
 def process_rent_data(
     merged_rent_df: pd.DataFrame,
     config: AnalysisConfig,
@@ -1005,7 +1309,7 @@ def process_rent_data(
     logger_instance: logging.Logger = logger,
 ) -> pd.DataFrame:
     logger_instance.info("Processing merged rent data with budget analysis...")
-    df = merged_rent_df.copy()
+    df = merged_rent_df.copy(deep=False)
 
     if df.empty:
         logger_instance.warning(
@@ -1098,12 +1402,7 @@ def process_rent_data(
     df["JordynOwes"] = 0.0
     df["BalanceImpact"] = df["RyanOwes"]
 
-    df["Description"] = df.apply(
-        lambda r: f"Rent for {r.get('Month_Display', 'Unknown Month')}", axis=1
-    )
-    df["AuditNote"] = df.apply(
-        lambda row: _create_enhanced_rent_audit_note(row, config), axis=1
-    )
+    df = add_rent_audit_notes(df)
 
     logger_instance.info(f"Processed {len(df)} combined rent records.")
     return df
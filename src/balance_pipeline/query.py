@@ -0,0 +1,206 @@
+"""
+SQL over processed transactions, without loading them into memory.
+
+:class:`TransactionQuery` exposes a source as a ``transactions`` view in an
+in-memory DuckDB connection. The source can be a Parquet file, a glob, a
+directory of (optionally hive-partitioned) Parquet files, or a transaction
+store (``.duckdb``, see :mod:`balance_pipeline.store`). DuckDB pushes the
+selected columns and ``WHERE`` predicates down into the Parquet scan, so
+only the needed columns of the row groups that can match are read, and
+:meth:`TransactionQuery.stream` yields results in bounded chunks::
+
+    with TransactionQuery("output/") as q:
+        q.execute("SELECT Merchant, sum(Amount) FROM transactions GROUP BY 1")
+        for chunk in q.stream("SELECT * FROM transactions WHERE Amount < ?", [-500]):
+            ...
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import duckdb
+import pandas as pd
+
+from .store import REVIEWED_VIEW
+
+log = logging.getLogger(__name__)
+
+VIEW_NAME = "transactions"
+STORE_SUFFIXES = (".duckdb", ".db")
+# DuckDB vectors hold 2048 rows; stream() fetches whole vectors
+VECTOR_SIZE = 2048
+# Column spellings used by the pipeline outputs and the cleaned exports
+SEARCH_COLUMNS = {
+    "date": ("Date", "date"),
+    "amount": ("Amount", "amount"),
+    "merchant": ("Merchant", "merchant_standardized", "merchant"),
+    "dispute": ("potential_refund",),
+}
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _parquet_sources(source: str | Path) -> tuple[list[str], bool]:
+    """Parquet paths or globs for ``source`` and whether to read hive keys."""
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(path.rglob("*.parquet"))
+        if not files:
+            raise FileNotFoundError(f"No Parquet files found under '{path}'")
+        hive = any("=" in part for f in files for part in f.relative_to(path).parts)
+        return [str(path / "**" / "*.parquet")], hive
+    if path.exists() or any(ch in str(source) for ch in "*?["):
+        return [str(source)], False
+    raise FileNotFoundError(f"Query source not found: {source}")
+
+
+class TransactionQuery:
+    """Run SQL against a ``transactions`` view over Parquet files or a store."""
+
+    def __init__(self, source: str | Path, *, threads: int | None = None) -> None:
+        self.source = source
+        self.con = duckdb.connect()
+        if threads is not None:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if Path(source).suffix in STORE_SUFFIXES:
+            if not Path(source).exists():
+                raise FileNotFoundError(f"Transaction store not found: {source}")
+            self.con.execute(f"ATTACH {_literal(str(source))} AS store (READ_ONLY)")
+            relation = f"store.{REVIEWED_VIEW}"
+        else:
+            paths, hive = _parquet_sources(source)
+            relation = (
+                f"read_parquet([{', '.join(_literal(p) for p in paths)}], "
+                f"union_by_name = true, hive_partitioning = {str(hive).lower()})"
+            )
+        # The view name is a module constant; the paths go through _literal
+        sql = f"CREATE VIEW {VIEW_NAME} AS SELECT * FROM {relation}"  # noqa: S608
+        self.con.execute(sql)
+
+    def __enter__(self) -> TransactionQuery:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.con.close()
+
+    @property
+    def columns(self) -> list[str]:
+        return [row[0] for row in self.con.execute(f"DESCRIBE {VIEW_NAME}").fetchall()]
+
+    def execute(self, sql: str, params: list[Any] | None = None) -> pd.DataFrame:
+        """The full result of ``sql`` as a DataFrame."""
+        return self.con.execute(sql, params or []).df()
+
+    def stream(
+        self, sql: str, params: list[Any] | None = None, *, chunk_rows: int = 65_536
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the result of ``sql`` in DataFrames of about ``chunk_rows`` rows."""
+        result = self.con.execute(sql, params or [])
+        vectors = max(1, chunk_rows // VECTOR_SIZE)
+        while True:
+            chunk = result.fetch_df_chunk(vectors)
+            if chunk.empty:
+                return
+            yield chunk
+
+    def copy_to(
+        self, sql: str, out_path: str | Path, params: list[Any] | None = None
+    ) -> Path:
+        """Stream the result of ``sql`` into a zstd Parquet file."""
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+        self.con.execute(
+            f"COPY ({sql}) TO {_literal(str(tmp))} "
+            "(FORMAT parquet, COMPRESSION zstd)",
+            params or [],
+        )
+        tmp.replace(out_path)
+        return out_path
+
+    def _column(self, role: str) -> str:
+        available = set(self.columns)
+        for name in SEARCH_COLUMNS[role]:
+            if name in available:
+                return name
+        raise ValueError(
+            f"{self.source} has no {role} column "
+            f"(looked for {', '.join(SEARCH_COLUMNS[role])})"
+        )
+
+    def search_sql(
+        self,
+        *,
+        start: Any = None,
+        end: Any = None,
+        merchant: str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        only_disputes: bool = False,
+        columns: list[str] | None = None,
+        limit: int | None = None,
+    ) -> tuple[str, list[Any]]:
+        """
+        SQL and parameters for the usual transaction filters.
+
+        Amount bounds apply to the absolute amount; ``merchant`` is a
+        case-insensitive substring. Results are newest first.
+        """
+        where, params = [], []
+        if start is not None or end is not None:
+            date = _quote(self._column("date"))
+            if start is not None:
+                where.append(f"{date} >= ?")
+                params.append(pd.Timestamp(start).to_pydatetime())
+            if end is not None:
+                where.append(f"{date} <= ?")
+                params.append(pd.Timestamp(end).to_pydatetime())
+        if min_amount is not None or max_amount is not None:
+            amount = f"abs({_quote(self._column('amount'))})"
+            if min_amount is not None:
+                where.append(f"{amount} >= ?")
+                params.append(float(min_amount))
+            if max_amount is not None:
+                where.append(f"{amount} <= ?")
+                params.append(float(max_amount))
+        if merchant:
+            where.append(f"{_quote(self._column('merchant'))} ILIKE ?")
+            params.append(f"%{merchant.strip()}%")
+        if only_disputes:
+            where.append(f"coalesce({_quote(self._column('dispute'))}, false)")
+
+        select = ", ".join(_quote(c) for c in columns) if columns else "*"
+        # Columns go through _quote and filter values are bound parameters
+        sql = f"SELECT {select} FROM {VIEW_NAME}"  # noqa: S608
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if any(name in self.columns for name in SEARCH_COLUMNS["date"]):
+            sql += f" ORDER BY {_quote(self._column('date'))} DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def search(self, **filters: Any) -> pd.DataFrame:
+        """Transactions matching ``filters`` (see :meth:`search_sql`)."""
+        return self.execute(*self.search_sql(**filters))
+
+
+def query_transactions(
+    source: str | Path, sql: str, params: list[Any] | None = None
+) -> pd.DataFrame:
+    """Run ``sql`` against the ``transactions`` view over ``source``."""
+    with TransactionQuery(source) as query:
+        return query.execute(sql, params)
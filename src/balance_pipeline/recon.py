@@ -5,113 +5,162 @@ from typing import Any
 
 import pandas as pd
 
+from . import balances
+
 # Assuming config.py is in the same directory or accessible via PYTHONPATH
 from .config import AnalysisConfig
+from .ledger import LedgerAggregates
 
 logger = logging.getLogger(__name__)
 
 
-def calc_m1_running_balance(df: pd.DataFrame) -> float:
+def calc_m1_running_balance(df: pd.DataFrame, precision: int = 2) -> float:
     """
     Calculate M1: Final Running Balance from master ledger.
+    Re-accumulated from BalanceImpact when present, so M1 does not depend on
+    a RunningBalance column that may have been edited or filtered.
     """
-    if df.empty or "RunningBalance" not in df.columns:
+    if df.empty:
+        return 0.0
+    if "BalanceImpact" in df.columns:
+        return balances.final_balance(df["BalanceImpact"], precision=precision)
+    if "RunningBalance" not in df.columns:
         return 0.0
     return float(df["RunningBalance"].iloc[-1])
 
 
-def calc_m2_fair_share(df: pd.DataFrame, config: AnalysisConfig) -> dict[str, Any]:
+def shared_totals(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Calculate M2: Ryan's variance from fair share of total shared expenses.
-    Returns variance calculation details.
+    Reconciliation kernel: shared AllowedAmount by TransactionType and payer.
+
+    One groupby over (TransactionType, Payer, IsShared) replaces the repeated
+    filter/lowercase/sum passes of the individual methods. Payer labels are
+    lowercased on the (few) group keys rather than per row. The result has
+    one row per TransactionType in order of first appearance among shared
+    rows (a NaN type keeps a row so it still counts towards the totals), a
+    ``total`` column and one column per lowercased payer.
     """
-    if df.empty:
-        return {
-            "variance": 0.0,
-            "total_shared": 0.0,
-            "ryan_fair_share": 0.0,
-            "ryan_actually_paid": 0.0,
-        }
+    if df.empty or "AllowedAmount" not in df.columns:
+        return pd.DataFrame(columns=["total"], dtype=float)
+
+    types = df["TransactionType"] if "TransactionType" in df.columns else None
+    keys = [
+        types if types is not None else pd.Series(None, index=df.index, dtype=object),
+        df["Payer"],
+        df["IsShared"].eq(True),
+    ]
+    sums = df["AllowedAmount"].groupby(keys, sort=False, dropna=False).sum()
+    shared = sums[sums.index.get_level_values(2).to_numpy(dtype=bool)]
+    if shared.empty:
+        return pd.DataFrame(columns=["total"], dtype=float)
+
+    type_keys = shared.index.get_level_values(0)
+    payer_keys = shared.index.get_level_values(1).astype("string").str.lower()
+    table = (
+        shared.groupby([type_keys, payer_keys], sort=False, dropna=False)
+        .sum()
+        .unstack(fill_value=0.0)
+    )
+    totals = shared.groupby(type_keys, sort=False, dropna=False).sum()
+    table = table.reindex(totals.index, fill_value=0.0)
+    table.columns = [str(c) if pd.notna(c) else "" for c in table.columns]
+    table.insert(0, "total", totals)
+    return table.astype(float)
 
-    shared_only = df[df["IsShared"] == True].copy()
 
-    if shared_only.empty or "AllowedAmount" not in shared_only.columns:
+def m2_from_totals(table: pd.DataFrame, config: AnalysisConfig) -> dict[str, Any]:
+    """
+    M2 from a :func:`shared_totals` table (or the same shape rebuilt from
+    ``LedgerAggregates.shared_by_type``), without the transaction rows.
+    """
+    if table.empty:
         return {
             "variance": 0.0,
             "total_shared": 0.0,
             "ryan_fair_share": 0.0,
             "ryan_actually_paid": 0.0,
         }
-
-    total_shared_amount = shared_only["AllowedAmount"].sum()
+    total_shared_amount = float(table["total"].sum())
     ryan_fair_share = total_shared_amount * config.RYAN_PCT
-
-    ryan_actually_paid = shared_only[shared_only["Payer"].str.lower() == "ryan"][
-        "AllowedAmount"
-    ].sum()
-
-    variance = ryan_actually_paid - ryan_fair_share
-
+    ryan_actually_paid = float(table["ryan"].sum()) if "ryan" in table else 0.0
     return {
-        "variance": float(variance),
-        "total_shared": float(total_shared_amount),
+        "variance": float(ryan_actually_paid - ryan_fair_share),
+        "total_shared": total_shared_amount,
         "ryan_fair_share": float(ryan_fair_share),
-        "ryan_actually_paid": float(ryan_actually_paid),
+        "ryan_actually_paid": ryan_actually_paid,
     }
 
 
-def calc_m3_category_sum(df: pd.DataFrame, config: AnalysisConfig) -> dict[str, Any]:
+def m3_from_totals(
+    table: pd.DataFrame,
+    config: AnalysisConfig,
+    categories: list[str] | None = None,
+) -> dict[str, Any]:
     """
-    Calculate M3: Sum of Ryan's variance by category.
-    Returns category breakdown and total variance.
+    M3 from a :func:`shared_totals` table; ``categories`` restricts (and
+    orders) the transaction types that are summed.
     """
-    if df.empty:
-        return {"variance": 0.0, "category_details": []}
-
-    shared_only = df[df["IsShared"] == True].copy()
-
-    if shared_only.empty or "AllowedAmount" not in shared_only.columns:
+    if table.empty:
         return {"variance": 0.0, "category_details": []}
+    if categories is not None:
+        table = table.reindex([c for c in categories if c in table.index])
+    else:
+        table = table[table.index.notna()]
+
+    zeros = pd.Series(0.0, index=table.index)
+    fair_share = table["total"] * config.RYAN_PCT
+    variance = table.get("ryan", zeros) - fair_share
+    details = pd.DataFrame(
+        {
+            "TotalShared": table["total"],
+            "RyanPaidShared": table.get("ryan", zeros),
+            "JordynPaidShared": table.get("jordyn", zeros),
+            "RyanFairShare": fair_share,
+            "RyanVarianceForCategory": variance,
+        }
+    )
+    details = details.apply(
+        lambda col: balances.round_money(col, config.CURRENCY_PRECISION)
+    )
+    details.insert(0, "Category", table.index)
+    # Accumulate in category order, as the per-type loop did
+    total_variance = sum(variance.tolist(), 0.0)
+    return {
+        "variance": float(total_variance),
+        "category_details": details.to_dict("records"),
+    }
 
-    total_variance = 0.0
-    category_details = []
-
-    for trans_type in shared_only["TransactionType"].unique():
-        type_data = shared_only[shared_only["TransactionType"] == trans_type]
-
-        if not type_data.empty:
-            type_total_shared = type_data["AllowedAmount"].sum()
-            type_ryan_fair_share = type_total_shared * config.RYAN_PCT
-
-            type_ryan_paid = type_data[type_data["Payer"].str.lower() == "ryan"][
-                "AllowedAmount"
-            ].sum()
-
-            type_jordyn_paid = type_data[type_data["Payer"].str.lower() == "jordyn"][
-                "AllowedAmount"
-            ].sum()
 
-            type_variance = type_ryan_paid - type_ryan_fair_share
-            total_variance += type_variance
+def calc_m2_fair_share(
+    df: pd.DataFrame,
+    config: AnalysisConfig,
+    totals: pd.DataFrame | None = None,
+) -> dict[str, Any]:
+    """
+    Calculate M2: Ryan's variance from fair share of total shared expenses.
+    Returns variance calculation details. ``totals`` is a precomputed
+    :func:`shared_totals` table for ``df``.
+    """
+    if totals is None:
+        totals = shared_totals(df)
+    return m2_from_totals(totals, config)
 
-            category_details.append(
-                {
-                    "Category": trans_type,
-                    "TotalShared": round(type_total_shared, config.CURRENCY_PRECISION),
-                    "RyanPaidShared": round(type_ryan_paid, config.CURRENCY_PRECISION),
-                    "JordynPaidShared": round(
-                        type_jordyn_paid, config.CURRENCY_PRECISION
-                    ),
-                    "RyanFairShare": round(
-                        type_ryan_fair_share, config.CURRENCY_PRECISION
-                    ),
-                    "RyanVarianceForCategory": round(
-                        type_variance, config.CURRENCY_PRECISION
-                    ),
-                }
-            )
 
-    return {"variance": float(total_variance), "category_details": category_details}
+def calc_m3_category_sum(
+    df: pd.DataFrame,
+    config: AnalysisConfig,
+    totals: pd.DataFrame | None = None,
+    categories: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Calculate M3: Sum of Ryan's variance by category.
+    Returns category breakdown and total variance. ``totals`` is a
+    precomputed :func:`shared_totals` table for ``df``; ``categories``
+    restricts (and orders) the transaction types that are summed.
+    """
+    if totals is None:
+        totals = shared_totals(df)
+    return m3_from_totals(totals, config, categories)
 
 
 def triple_reconciliation(
@@ -151,10 +200,47 @@ def triple_reconciliation(
         }
 
     # Calculate M1, M2, M3 using helper functions
-    m1 = calc_m1_running_balance(master_ledger)
-    m2_result = calc_m2_fair_share(master_ledger, config)
-    m3_result = calc_m3_category_sum(master_ledger, config)
+    m1 = calc_m1_running_balance(master_ledger, config.CURRENCY_PRECISION)
+    totals = shared_totals(master_ledger)
+    m2_result = calc_m2_fair_share(master_ledger, config, totals)
+    m3_result = calc_m3_category_sum(master_ledger, config, totals)
+    return assemble_reconciliation(m1, m2_result, m3_result, config, logger_instance)
+
 
+def triple_reconciliation_from_aggregates(
+    aggregates: LedgerAggregates,
+    config: AnalysisConfig,
+    logger_instance: logging.Logger = logger,
+) -> dict[str, Any]:
+    """
+    Triple reconciliation from the running totals of a persisted ledger.
+    Gives the same result as ``triple_reconciliation`` on the full ledger
+    without scanning it, for use after ``append_to_master_ledger``.
+    """
+    logger_instance.info("Starting triple reconciliation from ledger aggregates...")
+    if aggregates.row_count == 0:
+        return triple_reconciliation(pd.DataFrame(), config, logger_instance)
+
+    m1 = balances.final_balance(
+        [aggregates.balance_total], precision=config.CURRENCY_PRECISION
+    )
+    totals = pd.DataFrame.from_dict(aggregates.shared_by_type, orient="index")
+    if totals.empty:
+        totals = pd.DataFrame(columns=["total"], dtype=float)
+    totals = totals.fillna(0.0)
+    m2_result = m2_from_totals(totals, config)
+    m3_result = m3_from_totals(totals, config)
+    return assemble_reconciliation(m1, m2_result, m3_result, config, logger_instance)
+
+
+def assemble_reconciliation(
+    m1: float,
+    m2_result: dict[str, Any],
+    m3_result: dict[str, Any],
+    config: AnalysisConfig,
+    logger_instance: logging.Logger,
+) -> dict[str, Any]:
+    """Validate M1/M2/M3 and assemble the reconciliation result dict."""
     m2 = m2_result["variance"]
     m3 = m3_result["variance"]
 
@@ -169,9 +255,7 @@ def triple_reconciliation(
     who_owes = (
         "Ryan owes Jordyn"
         if final_balance > 0.005
-        else "Jordyn owes Ryan"
-        if final_balance < -0.005
-        else "Settled"
+        else "Jordyn owes Ryan" if final_balance < -0.005 else "Settled"
     )
     amount_owed = abs(final_balance)
 
@@ -0,0 +1,208 @@
+"""
+run_cache.py
+
+Input-fingerprint memoization for analyzer runs.
+
+Every cached artifact is keyed by the SHA-256 of the files and settings it was
+derived from, so a scheduled run whose inputs have not changed can return the
+previous results immediately, and a run where only the rent files changed can
+reuse the processed expense frame. Entries are immutable: a changed input
+produces a new key rather than overwriting an old entry.
+
+Layout::
+
+    <cache_dir>/<stage>/<key>.parquet   processed frame for a stage
+    <cache_dir>/<stage>/<key>.json      data quality issues logged by the stage
+    <cache_dir>/results/<key>.json      final results dict of a full run
+    <cache_dir>/results/<key>.outputs.json  SHA-256 of each file in its output_paths
+
+Output files live at fixed paths that a run with other inputs overwrites, so
+cached results are only returned while every output still has the content
+recorded when the results were saved.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import pickle
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1 << 20
+RUN_CACHE_VERSION = 1
+
+
+def file_fingerprint(path: Path | str | None) -> str:
+    """Return the SHA-256 of a file's contents, or ``"missing"``."""
+    if path is None:
+        return "missing"
+    path = Path(path)
+    if not path.is_file():
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_fingerprint(config: Any, exclude: tuple[str, ...] = ()) -> str:
+    """Hash the fields of a dataclass config, ignoring ``exclude``."""
+    if dataclasses.is_dataclass(config):
+        fields = dataclasses.asdict(config)
+    else:
+        fields = dict(vars(config))
+    for name in exclude:
+        fields.pop(name, None)
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _stringify_keys(value: Any) -> Any:
+    """Recursively convert non-JSON dict keys (e.g. Timestamps) to strings."""
+    if isinstance(value, dict):
+        return {
+            (
+                k
+                if isinstance(k, (str, int, float, bool)) or k is None
+                else str(_json_default(k))
+            ): _stringify_keys(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_stringify_keys(v) for v in value]
+    return value
+
+
+class RunCache:
+    """Content-addressed store for analyzer stage outputs and results."""
+
+    def __init__(self, cache_dir: Path | str) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Combine fingerprints into a single cache key."""
+        digest = hashlib.sha256(f"v{RUN_CACHE_VERSION}".encode())
+        for part in parts:
+            digest.update(b"\0")
+            digest.update(str(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, stage: str, key: str, suffix: str) -> Path:
+        return self.cache_dir / stage / f"{key}{suffix}"
+
+    # ------------------------------------------------------------------
+    # Stage frames
+    # ------------------------------------------------------------------
+    def load_stage(
+        self, stage: str, key: str
+    ) -> tuple[pd.DataFrame, list[dict[str, Any]]] | None:
+        """Return the cached frame and data quality issues for ``stage``."""
+        frame_path = self._path(stage, key, ".parquet")
+        pickle_path = self._path(stage, key, ".pkl")
+        issues_path = self._path(stage, key, ".json")
+        try:
+            if frame_path.exists():
+                df = pd.read_parquet(frame_path)
+            elif pickle_path.exists():
+                with open(pickle_path, "rb") as f:
+                    df = pickle.load(f)  # noqa: S301 - our own cache files
+            else:
+                return None
+            issues: list[dict[str, Any]] = []
+            if issues_path.exists():
+                issues = json.loads(issues_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable run cache entry {stage}/{key}: {e}")
+            return None
+        logger.info(f"Run cache hit for stage '{stage}' ({key[:12]})")
+        return df, issues
+
+    def save_stage(
+        self,
+        stage: str,
+        key: str,
+        df: pd.DataFrame,
+        issues: list[dict[str, Any]] | None = None,
+    ) -> None:
+        """Persist ``df`` (Parquet, pickle fallback) and its issues."""
+        stage_dir = self.cache_dir / stage
+        stage_dir.mkdir(parents=True, exist_ok=True)
+        frame_path = self._path(stage, key, ".parquet")
+        try:
+            df.to_parquet(frame_path, index=False)
+        except Exception as e:
+            # Mixed-type object columns cannot always be represented in Arrow.
+            logger.debug(f"Parquet cache write failed for {stage}, using pickle: {e}")
+            frame_path.unlink(missing_ok=True)
+            with open(self._path(stage, key, ".pkl"), "wb") as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._path(stage, key, ".json").write_text(
+            json.dumps(issues or [], default=_json_default), encoding="utf-8"
+        )
+
+    # ------------------------------------------------------------------
+    # Final results
+    # ------------------------------------------------------------------
+    def load_results(self, key: str) -> dict[str, Any] | None:
+        """Return cached results whose output files are still the saved ones."""
+        path = self._path("results", key, ".json")
+        digests_path = self._path("results", key, ".outputs.json")
+        if not path.exists() or not digests_path.exists():
+            return None
+        try:
+            results = json.loads(path.read_text(encoding="utf-8"))
+            digests = json.loads(digests_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable cached results {key}: {e}")
+            return None
+        outputs = results.get("output_paths", {}).values()
+        if set(outputs) != set(digests) or any(
+            file_fingerprint(p) != digest for p, digest in digests.items()
+        ):
+            logger.info(f"Cached results {key[:12]} are stale: outputs changed")
+            return None
+        return results
+
+    def save_results(self, key: str, results: dict[str, Any]) -> None:
+        try:
+            payload = json.dumps(
+                _stringify_keys(results), indent=2, default=_json_default
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Results not cacheable, skipping run cache write: {e}")
+            return
+        digests = {
+            str(p): file_fingerprint(p)
+            for p in results.get("output_paths", {}).values()
+        }
+        path = self._path("results", key, ".json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(payload, encoding="utf-8")
+        self._path("results", key, ".outputs.json").write_text(
+            json.dumps(digests, indent=2), encoding="utf-8"
+        )
@@ -0,0 +1,298 @@
+"""
+Persistent DuckDB transaction store.
+
+One embedded database file is the system of record across pipeline runs::
+
+    transactions            one row per TxnID, upserted from pipeline output
+    review_decisions        SharedFlag / SplitPercent per TxnID
+    reviewed_transactions   view: transactions with the decisions applied
+
+Upserts go through the TxnID primary key index, so loading a new month
+touches only the incoming rows instead of rewriting the data set. Review
+decisions live in their own table and survive any number of re-imports of
+the same transactions. Readers (``export --store`` and ``query`` on a store
+file) select from the view.
+
+Column types follow the first load that carries values: a column that is
+entirely null in a load is created as VARCHAR (DuckDB would otherwise type
+it from pandas' NaN/None placeholders), and a later load whose values need
+a wider type widens the stored column (to VARCHAR if nothing narrower fits).
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import duckdb
+import pandas as pd
+
+from .sync import (
+    TRANS_SHARED_FLAG_COL,
+    TRANS_SPLIT_PERC_COL,
+    TRANS_TXNID_COL,
+    extract_review_decisions,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = Path("workbook") / "balance.duckdb"
+TRANSACTIONS_TABLE = "transactions"
+DECISIONS_TABLE = "review_decisions"
+REVIEWED_VIEW = "reviewed_transactions"
+# Types of the review decision columns, also used when they arrive all-null
+DECISION_TYPES = {TRANS_SHARED_FLAG_COL: "VARCHAR", TRANS_SPLIT_PERC_COL: "DOUBLE"}
+
+
+@dataclass(frozen=True)
+class UpsertResult:
+    """Row counts of one upsert."""
+
+    inserted: int
+    updated: int
+    skipped: int = 0  # Rows without a TxnID
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class TransactionStore:
+    """Transactions and review decisions in a DuckDB database file."""
+
+    def __init__(
+        self, path: str | Path = DEFAULT_STORE_PATH, *, read_only: bool = False
+    ) -> None:
+        self.path = Path(path)
+        if not read_only:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = duckdb.connect(str(self.path), read_only=read_only)
+        if not read_only:
+            self.con.execute(
+                f"""CREATE TABLE IF NOT EXISTS {DECISIONS_TABLE} (
+                    {_quote(TRANS_TXNID_COL)} VARCHAR PRIMARY KEY,
+                    {_quote(TRANS_SHARED_FLAG_COL)} {DECISION_TYPES[TRANS_SHARED_FLAG_COL]},
+                    {_quote(TRANS_SPLIT_PERC_COL)} {DECISION_TYPES[TRANS_SPLIT_PERC_COL]},
+                    decided_at TIMESTAMP
+                )"""
+            )
+
+    def __enter__(self) -> TransactionStore:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.con.close()
+
+    def columns(self, table: str = TRANSACTIONS_TABLE) -> list[str]:
+        """Column names of ``table``; empty if it does not exist yet."""
+        return list(self.column_types(table))
+
+    def column_types(self, table: str = TRANSACTIONS_TABLE) -> dict[str, str]:
+        """DuckDB type of each column of ``table``, in column order."""
+        rows = self.con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = ? ORDER BY ordinal_position",
+            [table],
+        ).fetchall()
+        return dict(rows)
+
+    def count(self, table: str = TRANSACTIONS_TABLE) -> int:
+        if not self.columns(table):
+            return 0
+        # Table names are module constants, never user input
+        sql = f"SELECT count(*) FROM {table}"  # noqa: S608
+        return self.con.execute(sql).fetchone()[0]
+
+    def upsert_transactions(self, df: pd.DataFrame) -> UpsertResult:
+        """Insert new TxnIDs and update the stored columns of known ones.
+
+        Columns not in ``df`` keep their stored values; columns new to the
+        store are added. Within ``df`` the last row per TxnID wins.
+        """
+        if TRANS_TXNID_COL not in df.columns:
+            raise ValueError(f"Cannot upsert transactions without '{TRANS_TXNID_COL}'")
+        keyed = df[df[TRANS_TXNID_COL].notna()]
+        skipped = len(df) - len(keyed)
+        if skipped:
+            log.warning(f"Skipping {skipped} rows without a {TRANS_TXNID_COL}")
+        incoming = keyed.drop_duplicates(TRANS_TXNID_COL, keep="last").astype(
+            {TRANS_TXNID_COL: str}
+        )
+
+        self.con.register("incoming", incoming)
+        try:
+            self.con.execute("BEGIN TRANSACTION")
+            self._ensure_columns(incoming)
+            before = self.count()
+            updates = ", ".join(
+                f"{_quote(c)} = EXCLUDED.{_quote(c)}"
+                for c in incoming.columns
+                if c != TRANS_TXNID_COL
+            )
+            conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            # Table names are module constants; identifiers go through _quote
+            self.con.execute(
+                f"INSERT INTO {TRANSACTIONS_TABLE} BY NAME SELECT * FROM incoming "  # noqa: S608
+                f"ON CONFLICT ({_quote(TRANS_TXNID_COL)}) {conflict}"
+            )
+            inserted = self.count() - before
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        finally:
+            self.con.unregister("incoming")
+
+        result = UpsertResult(inserted, len(incoming) - inserted, skipped)
+        log.info(
+            f"Transaction store {self.path}: {result.inserted} inserted, "
+            f"{result.updated} updated"
+        )
+        return result
+
+    def _ensure_columns(self, frame: pd.DataFrame) -> None:
+        """Create, extend or widen the transactions table for ``frame``.
+
+        ``frame`` is the DataFrame registered as ``incoming``.
+        """
+        described = self.con.execute("DESCRIBE SELECT * FROM incoming").fetchall()
+        incoming = {name: kind for name, kind, *_ in described}
+        # All-null columns carry no type of their own
+        untyped = {name for name in incoming if frame[name].isna().all()}
+        for name in untyped:
+            incoming[name] = DECISION_TYPES.get(name, "VARCHAR")
+        incoming[TRANS_TXNID_COL] = "VARCHAR"
+
+        existing = self.column_types()
+        if not existing:
+            columns = ", ".join(
+                f"{_quote(name)} {kind}"
+                + (" PRIMARY KEY" if name == TRANS_TXNID_COL else "")
+                for name, kind in incoming.items()
+            )
+            self.con.execute(f"CREATE TABLE {TRANSACTIONS_TABLE} ({columns})")
+            self._create_view()
+            return
+
+        changed = False
+        for name, kind in incoming.items():
+            if name not in existing:
+                self.con.execute(
+                    f"ALTER TABLE {TRANSACTIONS_TABLE} ADD COLUMN {_quote(name)} {kind}"
+                )
+                changed = True
+                continue
+            if name in untyped or kind == existing[name]:
+                continue
+            wider = self._common_type(existing[name], kind)
+            if wider != existing[name]:
+                log.info(
+                    f"Widening stored column {name} from {existing[name]} to {wider}"
+                )
+                self.con.execute(
+                    f"ALTER TABLE {TRANSACTIONS_TABLE} "
+                    f"ALTER COLUMN {_quote(name)} TYPE {wider}"
+                )
+                changed = True
+        if changed:
+            self._create_view()
+
+    def _common_type(self, stored: str, incoming: str) -> str:
+        """Narrowest type holding both ``stored`` and ``incoming`` values."""
+        try:
+            # Both are DuckDB type names from DESCRIBE / information_schema
+            sql = f"SELECT typeof(coalesce(NULL::{stored}, NULL::{incoming}))"  # noqa: S608
+            return self.con.execute(sql).fetchone()[0]
+        except duckdb.BinderException:
+            return "VARCHAR"
+
+    def _create_view(self) -> None:
+        columns = self.column_types()
+        # Stored decisions override whatever the pipeline produced
+        replaced = []
+        for c, kind in DECISION_TYPES.items():
+            if c not in columns:
+                continue
+            stored = f"t.{_quote(c)}"
+            if columns[c] != kind:
+                stored = f"TRY_CAST({stored} AS {kind})"
+            replaced.append(f"COALESCE(d.{_quote(c)}, {stored}) AS {_quote(c)}")
+        added = [f"d.{_quote(c)}" for c in DECISION_TYPES if c not in columns]
+        select = "t.*"
+        if replaced:
+            select += f" REPLACE ({', '.join(replaced)})"
+        if added:
+            select += ", " + ", ".join(added)
+        # Table names are module constants; identifiers go through _quote
+        self.con.execute(
+            f"CREATE OR REPLACE VIEW {REVIEWED_VIEW} AS SELECT {select} "  # noqa: S608
+            f"FROM {TRANSACTIONS_TABLE} t LEFT JOIN {DECISIONS_TABLE} d "
+            f"USING ({_quote(TRANS_TXNID_COL)})"
+        )
+
+    def record_decisions(self, decisions: pd.DataFrame) -> int:
+        """Upsert ``TxnID``/``SharedFlag``/``SplitPercent`` rows; return the count."""
+        if decisions.empty:
+            return 0
+        rows = decisions[
+            [TRANS_TXNID_COL, TRANS_SHARED_FLAG_COL, TRANS_SPLIT_PERC_COL]
+        ].drop_duplicates(TRANS_TXNID_COL, keep="last")
+        rows = rows.astype({TRANS_TXNID_COL: str}).assign(
+            decided_at=datetime.datetime.now()
+        )
+        self.con.register("decisions", rows)
+        try:
+            # Table names are module constants; identifiers go through _quote
+            self.con.execute(
+                f"INSERT INTO {DECISIONS_TABLE} BY NAME SELECT * FROM decisions "  # noqa: S608
+                f"ON CONFLICT ({_quote(TRANS_TXNID_COL)}) DO UPDATE SET "
+                f"{_quote(TRANS_SHARED_FLAG_COL)} = EXCLUDED.{_quote(TRANS_SHARED_FLAG_COL)}, "
+                f"{_quote(TRANS_SPLIT_PERC_COL)} = EXCLUDED.{_quote(TRANS_SPLIT_PERC_COL)}, "
+                "decided_at = EXCLUDED.decided_at"
+            )
+        finally:
+            self.con.unregister("decisions")
+        log.info(f"Recorded {len(rows)} review decisions in {self.path}")
+        return len(rows)
+
+    def record_review_queue(self, df_queue_review: pd.DataFrame) -> int:
+        """Record the valid decisions entered in a Queue_Review sheet."""
+        return self.record_decisions(extract_review_decisions(df_queue_review))
+
+    def query(self, sql: str, params: list[Any] | None = None) -> pd.DataFrame:
+        """Run ``sql`` against the store and return the result."""
+        return self.con.execute(sql, params or []).df()
+
+    def read(
+        self,
+        start: Any = None,
+        end: Any = None,
+        *,
+        columns: list[str] | None = None,
+        date_column: str = "Date",
+    ) -> pd.DataFrame:
+        """Reviewed transactions, optionally within ``start <= date <= end``."""
+        if not self.columns(REVIEWED_VIEW):
+            return pd.DataFrame(columns=columns or [])
+        select = ", ".join(_quote(c) for c in columns) if columns else "*"
+        where, params = [], []
+        if start is not None:
+            where.append(f"{_quote(date_column)} >= ?")
+            params.append(pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            where.append(f"{_quote(date_column)} <= ?")
+            params.append(pd.Timestamp(end).to_pydatetime())
+        # The view name is a module constant; columns go through _quote and
+        # the date bounds are bound parameters
+        sql = f"SELECT {select} FROM {REVIEWED_VIEW}"  # noqa: S608
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if date_column in self.columns(REVIEWED_VIEW):
+            sql += f" ORDER BY {_quote(date_column)}, {_quote(TRANS_TXNID_COL)}"
+        return self.query(sql, params)
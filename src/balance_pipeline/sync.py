@@ -18,10 +18,13 @@ Author: Ryan Zimmerman / AI Assistant
 from __future__ import annotations  # For using type hints before full definition
 
 import logging
-from typing import TYPE_CHECKING, Any  # Added TYPE_CHECKING
+from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from .utils import copy_on_write
+
 # ==============================================================================
 # 1. MODULE LEVEL SETUP
 # ==============================================================================
@@ -29,11 +32,6 @@ import pandas as pd
 # --- Setup Logger ---
 log = logging.getLogger(__name__)
 
-if TYPE_CHECKING:
-    Series = pd.Series[Any]  # for static typing only
-else:
-    Series = pd.Series  # runtime-safe alias
-
 # --- Define constants for column names used in Queue_Review ---
 # These should match the exact headers you created in the Excel sheet
 # REVIEW: Double-check these match your Queue_Review sheet headers EXACTLY
@@ -45,6 +43,7 @@ QUEUE_SPLIT_COL = "Set Split % (0-100)"
 TRANS_TXNID_COL = "TxnID"
 TRANS_SHARED_FLAG_COL = "SharedFlag"
 TRANS_SPLIT_PERC_COL = "SplitPercent"
+VALID_DECISIONS = ("Y", "N", "S")
 # Optional: A column to indicate a user reviewed the item
 # TRANS_USER_DECISION_COL = "UserDecision" # Need to ensure this exists in FINAL_COLS if used
 
@@ -56,6 +55,7 @@ TRANS_SPLIT_PERC_COL = "SplitPercent"
 # ------------------------------------------------------------------------------
 # Function: sync_review_decisions
 # ------------------------------------------------------------------------------
+@copy_on_write
 def sync_review_decisions(
     df_transactions: pd.DataFrame, df_queue_review: pd.DataFrame
 ) -> pd.DataFrame:
@@ -76,11 +76,13 @@ def sync_review_decisions(
 
     Workflow:
     1. Validate inputs.
-    2. Select and clean relevant columns from df_queue_review.
-    3. Standardize decision values (Y/N/S -> SharedFlag, % -> SplitPercent).
-    4. Merge decisions into a copy of df_transactions using TxnID.
-    5. Apply the updates from the merged columns to the original columns.
-    6. Return the updated DataFrame.
+    2. Standardize decision values (Y/N/S -> SharedFlag, % -> SplitPercent).
+    3. Look up the decided TxnIDs in an index over df_transactions and write
+       the decisions into a lazy copy (see ReviewSyncEngine).
+    4. Return the updated DataFrame.
+
+    For repeated syncs of the same transactions keep a ReviewSyncEngine,
+    which only applies decisions that changed since the previous sync.
     """
     log.info(
         f"Starting sync process. Transactions: {len(df_transactions)} rows, Queue: {len(df_queue_review)} rows."
@@ -89,12 +91,12 @@ def sync_review_decisions(
     # --- Input Validation (Basic) ---
     if df_transactions.empty:
         log.warning("Input transactions DataFrame is empty. Returning unchanged.")
-        return df_transactions.copy()
+        return df_transactions.copy(deep=False)
     if df_queue_review.empty:
         log.info(
             "Queue review DataFrame is empty. No decisions to sync. Returning unchanged transactions."
         )
-        return df_transactions.copy()
+        return df_transactions.copy(deep=False)
 
     # Check for necessary columns
     required_trans_cols = [TRANS_TXNID_COL, TRANS_SHARED_FLAG_COL, TRANS_SPLIT_PERC_COL]
@@ -105,154 +107,246 @@ def sync_review_decisions(
             f"Transactions DataFrame missing required columns for sync. Need: {required_trans_cols}"
         )
         # Optionally raise an error or return unchanged
-        return df_transactions.copy()
+        return df_transactions.copy(deep=False)
     if not all(col in df_queue_review.columns for col in required_queue_cols):
         log.error(
             f"Queue Review DataFrame missing required columns for sync. Need: {required_queue_cols}"
         )
         # Return unchanged as we can't process decisions
-        return df_transactions.copy()
+        return df_transactions.copy(deep=False)
 
     # --- Prepare DataFrame Copy ---
-    # Work on a copy to avoid modifying the original DataFrame directly (good practice)
-    df_updated_transactions = df_transactions.copy()
-
-    # --- Prepare Queue Decisions ---
-    log.info("Preparing decisions from Queue_Review...")
+    # Lazy copy (copy-on-write): only the two decision columns are duplicated,
+    # and only once the first decision is written into them
+    df_updated_transactions = df_transactions.copy(deep=False)
 
-    # Filter to only rows with actual decisions (non-empty)
-    # and standardize the values
-    df_queue_filtered = df_queue_review.copy()
+    # --- Apply Decisions through the TxnID index ---
+    ReviewSyncEngine(df_updated_transactions).sync(df_queue_review)
 
-    # 1. Filter out rows where QUEUE_DECISION_COL is empty or NaN
-    df_queue_filtered = df_queue_filtered[
-        df_queue_filtered[QUEUE_DECISION_COL].notna()
-        & (df_queue_filtered[QUEUE_DECISION_COL] != "")
-    ]
-
-    # 2. Extract and validate SharedFlag decisions
-    # Only accept Y, N, or S (case-insensitive)
-    def standardize_decision(val: Any) -> str | None:
-        # First, handle original None or NaN values directly
-        if pd.isna(val):
-            return None
-
-        s_val = str(val).strip()  # Convert to string and strip whitespace
-
-        if not s_val:  # Check if string is empty after stripping
-            return None
-
-        s_val_upper = s_val.upper()
-        if s_val_upper in ["Y", "N", "S"]:
-            return s_val_upper
-        else:
-            log.warning(
-                f"Invalid decision value: '{val}'. Expected Y, N, or S. Ignoring."
-            )
-            return None
+    # --- Final Steps ---
+    log.info("Sync process complete.")
+    return df_updated_transactions
 
-    # Create new column with standardized values
-    df_queue_filtered["SharedFlag_update"] = df_queue_filtered[
-        QUEUE_DECISION_COL
-    ].apply(standardize_decision)
 
-    # 3. Handle split percentages
-    # Only relevant when SharedFlag is 'S', should be between 0 and 100
-    def validate_split_percent(row: Series) -> float | None:  # row is a Series
-        if row["SharedFlag_update"] != "S":
-            return None
+# ------------------------------------------------------------------------------
+# Class: ReviewSyncEngine
+# ------------------------------------------------------------------------------
+class ReviewSyncEngine:
+    """
+    Applies Queue_Review decisions to a transactions DataFrame in place.
+
+    The TxnIDs of the transactions are indexed once, and a hash of every
+    queue row already applied is kept, so each call to sync() only parses
+    and writes the decisions that are new or changed since the last call:
+    its cost follows the number of changed decisions, not the size of the
+    transactions frame. When a TxnID appears more than once in the queue,
+    its last row wins.
+
+    The SharedFlag/SplitPercent a row had before the engine first wrote to
+    it are kept. A TxnID whose queue row is removed, or changed to no valid
+    decision, gets those original values back; a changed decision is also
+    applied on top of them, so an old split percentage does not linger.
+
+    Example:
+        engine = ReviewSyncEngine(df_transactions)
+        engine.sync(df_queue_review)  # applies every decision
+        engine.sync(df_queue_review)  # nothing changed: applies none
+    """
 
-        val_from_queue = row[QUEUE_SPLIT_COL]
+    def __init__(self, df_transactions: pd.DataFrame) -> None:
+        self.df = df_transactions
+        self._index = pd.Index(df_transactions[TRANS_TXNID_COL])
+        # Hash of the last applied queue row, by TxnID
+        self._applied = pd.Series(dtype="uint64")
+        # Decision column values before the first write, by row position
+        self._originals: dict[int, tuple[Any, ...]] = {}
+        self._columns = [
+            c for c in (TRANS_SHARED_FLAG_COL, TRANS_SPLIT_PERC_COL) if c in self.df
+        ]
 
-        if pd.isna(
-            val_from_queue
-        ):  # Handles if original cell was empty or unparseable by pd.read_excel's dtype=str
-            log.warning(
-                f"Missing split percentage for split decision on TxnID: {row[QUEUE_TXNID_COL]}. Using 50%."
+    def sync(self, df_queue_review: pd.DataFrame) -> int:
+        """Apply new or changed decisions; returns the number of rows updated."""
+        required_queue_cols = [QUEUE_TXNID_COL, QUEUE_DECISION_COL, QUEUE_SPLIT_COL]
+        if not all(col in df_queue_review.columns for col in required_queue_cols):
+            log.error(
+                f"Queue Review DataFrame missing required columns for sync. Need: {required_queue_cols}"
             )
-            return 50.0
+            return 0
 
-        numeric_val = pd.to_numeric(val_from_queue, errors="coerce")
-
-        if pd.isna(numeric_val):  # pd.to_numeric failed to parse
-            log.warning(
-                f"Invalid split percentage format (could not convert to number) for TxnID: {row[QUEUE_TXNID_COL]}: '{val_from_queue}'. Using 50%."
-            )
-            return 50.0
+        queue = df_queue_review[required_queue_cols].drop_duplicates(
+            QUEUE_TXNID_COL, keep="last"
+        )
+        hashes = pd.Series(
+            pd.util.hash_pandas_object(queue, index=False).to_numpy(),
+            index=queue[QUEUE_TXNID_COL],
+        )
+        changed = hashes.ne(self._applied.reindex(hashes.index)).to_numpy()
+        removed = self._applied.index.difference(hashes.index)
+        if not changed.any() and removed.empty:
+            log.info("No new or changed decisions in Queue_Review.")
+            return 0
+
+        stale = hashes.index[changed].append(removed)
+        restored = self._restore(stale)
+        decisions = extract_review_decisions(queue[changed])
+        applied = self._apply(decisions)
+        self._applied = pd.concat(
+            [self._applied.drop(stale, errors="ignore"), hashes[changed]]
+        )
+        return len(np.union1d(restored, applied))
+
+    def _positions(self, txn_ids: pd.Index | pd.Series) -> np.ndarray:
+        """Row positions of the transactions with these TxnIDs."""
+        if self._index.is_unique:
+            rows = self._index.get_indexer(txn_ids)
+            return rows[rows >= 0]
+        return np.flatnonzero(self._index.isin(txn_ids))
+
+    def _restore(self, txn_ids: pd.Index) -> np.ndarray:
+        """Put back the original decision columns of previously decided rows."""
+        rows = [r for r in self._positions(txn_ids).tolist() if r in self._originals]
+        if not rows:
+            return np.empty(0, dtype=np.intp)
+        values = [self._originals.pop(r) for r in rows]
+        for i, column in enumerate(self._columns):
+            self.df.iloc[rows, self.df.columns.get_loc(column)] = [v[i] for v in values]
+        log.info(f"Restored the original decision of {len(rows)} transactions.")
+        return np.asarray(rows, dtype=np.intp)
+
+    def _remember(self, rows: np.ndarray) -> None:
+        """Keep the decision columns of rows written for the first time."""
+        new = [r for r in rows.tolist() if r not in self._originals]
+        if not new:
+            return
+        current = [
+            self.df.iloc[new, self.df.columns.get_loc(c)].tolist()
+            for c in self._columns
+        ]
+        self._originals.update(zip(new, zip(*current, strict=True), strict=True))
 
-        # At this point, numeric_val is a float (or an int that can be safely converted to float)
-        val = float(numeric_val)
+    def _apply(self, decisions: pd.DataFrame) -> np.ndarray:
+        """Write the decisions into the rows with matching TxnIDs.
 
-        # Clamp to range 0-100
-        if val < 0:
-            log.warning(
-                f"Split percentage ({val}) below 0 for TxnID: {row[QUEUE_TXNID_COL]}. Clamping to 0."
-            )
-            return 0.0
-        elif val > 100:
-            log.warning(
-                f"Split percentage ({val}) above 100 for TxnID: {row[QUEUE_TXNID_COL]}. Clamping to 100."
+        Returns the positions of the rows written.
+        """
+        if self._index.is_unique:
+            rows = self._index.get_indexer(decisions[TRANS_TXNID_COL])
+            found = rows >= 0
+            rows, decisions = rows[found], decisions[found]
+        else:
+            rows = np.flatnonzero(self._index.isin(decisions[TRANS_TXNID_COL]))
+            decisions = (
+                decisions.set_index(TRANS_TXNID_COL)
+                .reindex(self._index[rows])
+                .reset_index()
             )
-            return 100.0
-        return val
+        if len(rows) == 0:
+            return rows
+        self._remember(rows)
 
-    df_queue_filtered["SplitPercent_update"] = df_queue_filtered.apply(
-        validate_split_percent, axis=1
-    )
+        flag_col = self.df.columns.get_loc(TRANS_SHARED_FLAG_COL)
+        self.df.iloc[rows, flag_col] = decisions[TRANS_SHARED_FLAG_COL].to_numpy()
+        log.info(f"Updated SharedFlag for {len(rows)} transactions.")
 
-    # 4. Remove rows where we couldn't standardize the decision
-    df_queue_filtered = df_queue_filtered[
-        df_queue_filtered["SharedFlag_update"].notna()
-    ]
+        # SplitPercent is only set by split ('S') decisions
+        has_split = decisions[TRANS_SPLIT_PERC_COL].notna().to_numpy()
+        if has_split.any():
+            split_col = self.df.columns.get_loc(TRANS_SPLIT_PERC_COL)
+            self.df.iloc[rows[has_split], split_col] = decisions.loc[
+                has_split, TRANS_SPLIT_PERC_COL
+            ].to_numpy()
+            log.info(f"Updated SplitPercent for {int(has_split.sum())} transactions.")
+        return rows
 
-    # 5. Select only relevant columns for merging
-    df_processed_decisions = df_queue_filtered[
-        [QUEUE_TXNID_COL, "SharedFlag_update", "SplitPercent_update"]
-    ]
 
-    log.info(
-        f"Processed {len(df_processed_decisions)} valid decisions from Queue_Review."
-    )
+# ------------------------------------------------------------------------------
+# Function: extract_review_decisions
+# ------------------------------------------------------------------------------
+def extract_review_decisions(df_queue_review: pd.DataFrame) -> pd.DataFrame:
+    """
+    Standardizes the decisions entered in the Queue_Review data.
 
-    # --- Merge Decisions ---
-    log.info("Merging decisions into transactions...")
+    Args:
+        df_queue_review (pd.DataFrame): The DataFrame read from the Queue_Review sheet,
+                                        containing 'TxnID' and the decision columns.
 
-    # Merge on TxnID, using left join to keep all transactions
-    merged_df = pd.merge(
-        df_updated_transactions,
-        df_processed_decisions,
-        how="left",
-        left_on=TRANS_TXNID_COL,
-        right_on=QUEUE_TXNID_COL,
-    )
+    Returns:
+        pd.DataFrame: One row per decided transaction with columns 'TxnID',
+                      'SharedFlag' (Y/N/S) and 'SplitPercent' (0-100, only set
+                      for split decisions). Rows without a valid decision are
+                      dropped.
+    """
+    required_queue_cols = [QUEUE_TXNID_COL, QUEUE_DECISION_COL, QUEUE_SPLIT_COL]
+    if not all(col in df_queue_review.columns for col in required_queue_cols):
+        log.error(
+            f"Queue Review DataFrame missing required columns for sync. Need: {required_queue_cols}"
+        )
+        return pd.DataFrame(
+            columns=[TRANS_TXNID_COL, TRANS_SHARED_FLAG_COL, TRANS_SPLIT_PERC_COL]
+        )
 
-    # --- Apply Updates ---
-    log.info("Applying synced decisions...")
+    log.info("Preparing decisions from Queue_Review...")
 
-    # Update SharedFlag where we have valid decisions
-    mask_update_shared = merged_df["SharedFlag_update"].notna()
-    if mask_update_shared.any():
-        merged_df.loc[mask_update_shared, TRANS_SHARED_FLAG_COL] = merged_df.loc[
-            mask_update_shared, "SharedFlag_update"
-        ]
-        log.info(f"Updated SharedFlag for {mask_update_shared.sum()} transactions.")
+    # 1. Filter out rows where QUEUE_DECISION_COL is empty or NaN
+    raw_decisions = df_queue_review[QUEUE_DECISION_COL]
+    df_queue_filtered = df_queue_review[raw_decisions.notna() & (raw_decisions != "")]
+
+    # 2. Standardize SharedFlag decisions in one pass over the column
+    # Only accept Y, N, or S (case-insensitive, surrounding whitespace ignored)
+    raw_decisions = df_queue_filtered[QUEUE_DECISION_COL]
+    stripped = raw_decisions.astype(str).str.strip()
+    shared_flags = stripped.str.upper()
+    valid = shared_flags.isin(VALID_DECISIONS)
+    for val in raw_decisions[~valid & (stripped != "")]:
+        log.warning(f"Invalid decision value: '{val}'. Expected Y, N, or S. Ignoring.")
+    df_queue_filtered = df_queue_filtered[valid]
+    shared_flags = shared_flags[valid]
 
-    # Update SplitPercent where applicable (when SharedFlag is 'S')
-    mask_update_split = merged_df["SplitPercent_update"].notna()
-    if mask_update_split.any():
-        merged_df.loc[mask_update_split, TRANS_SPLIT_PERC_COL] = merged_df.loc[
-            mask_update_split, "SplitPercent_update"
-        ]
-        log.info(f"Updated SplitPercent for {mask_update_split.sum()} transactions.")
+    # 3. Handle split percentages
+    # Only relevant when SharedFlag is 'S', should be between 0 and 100
+    split_percents = pd.Series(np.nan, index=df_queue_filtered.index)
+    is_split = shared_flags == "S"
+    if is_split.any():
+        txn_ids = df_queue_filtered.loc[is_split, QUEUE_TXNID_COL]
+        raw_split = df_queue_filtered.loc[is_split, QUEUE_SPLIT_COL]
+        numeric = pd.to_numeric(raw_split, errors="coerce").astype(float)
+
+        # Warnings are only built for the (few) offending rows
+        missing = raw_split.isna()
+        for txn_id in txn_ids[missing]:
+            log.warning(
+                f"Missing split percentage for split decision on TxnID: {txn_id}. Using 50%."
+            )
+        unparsed = numeric.isna() & ~missing
+        for txn_id, val in zip(txn_ids[unparsed], raw_split[unparsed], strict=True):
+            log.warning(
+                f"Invalid split percentage format (could not convert to number) for TxnID: {txn_id}: '{val}'. Using 50%."
+            )
+        numeric = numeric.fillna(50.0)
 
-    # Remove the temporary columns used for updating
-    final_df = merged_df.drop(
-        columns=["SharedFlag_update", "SplitPercent_update"], errors="ignore"
+        # Clamp to range 0-100
+        below, above = numeric < 0, numeric > 100
+        for txn_id, val in zip(txn_ids[below], numeric[below], strict=True):
+            log.warning(
+                f"Split percentage ({val}) below 0 for TxnID: {txn_id}. Clamping to 0."
+            )
+        for txn_id, val in zip(txn_ids[above], numeric[above], strict=True):
+            log.warning(
+                f"Split percentage ({val}) above 100 for TxnID: {txn_id}. Clamping to 100."
+            )
+        split_percents[is_split] = numeric.clip(0.0, 100.0)
+
+    # 4. Select only the decision columns
+    df_decisions = pd.DataFrame(
+        {
+            TRANS_TXNID_COL: df_queue_filtered[QUEUE_TXNID_COL],
+            TRANS_SHARED_FLAG_COL: shared_flags,
+            TRANS_SPLIT_PERC_COL: split_percents,
+        }
     )
 
-    # --- Final Steps ---
-    log.info("Sync process complete.")
-    return final_df
+    log.info(f"Processed {len(df_decisions)} valid decisions from Queue_Review.")
+    return df_decisions
 
 
 # ==============================================================================
@@ -0,0 +1,233 @@
+"""
+In-memory query index over a loaded transactions frame.
+
+Built once after loading, :class:`TransactionIndex` answers the GUI's
+filters without scanning (or copying) the frame:
+
+* dates sorted once, so a date range is two binary searches;
+* amounts and absolute amounts sorted once, for band queries;
+* an inverted index from merchant name tokens to the distinct merchants
+  that contain them, and from each merchant to its rows, so a merchant
+  substring is matched against the (few) distinct names, not every row.
+
+A query estimates the size of each filter's candidate set from the sorted
+arrays, materializes only the smallest, and checks the other filters on
+those rows alone. Results are row positions in frame order, for ``iloc``.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def _datetime64(value: Any) -> np.datetime64:
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return np.datetime64(timestamp.as_unit("ns"))
+
+
+class TransactionIndex:
+    """Sorted and inverted indexes over the columns the GUI filters on."""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        *,
+        date_column: str = "date",
+        merchant_column: str = "merchant_standardized",
+        amount_column: str = "amount",
+        flag_column: str | None = "potential_refund",
+    ) -> None:
+        self.size = len(df)
+
+        dates = pd.to_datetime(df[date_column], errors="coerce")
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        self.dates = dates.to_numpy(dtype="datetime64[ns]")
+        valid = np.flatnonzero(~np.isnat(self.dates))
+        self._date_order = valid[np.argsort(self.dates[valid], kind="stable")]
+        self._sorted_dates = self.dates[self._date_order]
+
+        self.amounts = pd.to_numeric(df[amount_column], errors="coerce").to_numpy(
+            dtype="float64"
+        )
+        valid = np.flatnonzero(~np.isnan(self.amounts))
+        self._amount_order = valid[np.argsort(self.amounts[valid], kind="stable")]
+        self._sorted_amounts = self.amounts[self._amount_order]
+        abs_amounts = np.abs(self.amounts)
+        self._abs_order = valid[np.argsort(abs_amounts[valid], kind="stable")]
+        self._sorted_abs = abs_amounts[self._abs_order]
+
+        codes, merchants = pd.factorize(df[merchant_column])
+        self._codes = codes  # -1 for a missing merchant
+        self._merchants = [str(m).lower() for m in merchants]
+        # Rows of each merchant, grouped by code in frame order
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(merchants) + 1))
+        self._merchant_rows = [
+            order[bounds[i] : bounds[i + 1]] for i in range(len(merchants))
+        ]
+        tokens: defaultdict[str, set[int]] = defaultdict(set)
+        for code, name in enumerate(self._merchants):
+            for token in _TOKEN.findall(name):
+                tokens[token].add(code)
+        self._tokens = dict(tokens)
+
+        if flag_column is not None and flag_column in df.columns:
+            self._flag_mask = df[flag_column].fillna(False).to_numpy(dtype=bool)
+        else:
+            self._flag_mask = np.zeros(self.size, dtype=bool)
+        self.flagged = np.flatnonzero(self._flag_mask)
+
+    # -- single-filter candidate sets ------------------------------------------
+
+    def _date_bounds(self, start: Any, end: Any) -> tuple[int, int]:
+        low, high = 0, len(self._sorted_dates)
+        if start is not None:
+            low = np.searchsorted(self._sorted_dates, _datetime64(start), "left")
+        if end is not None:
+            high = np.searchsorted(self._sorted_dates, _datetime64(end), "right")
+        return int(low), int(max(low, high))
+
+    def date_range(self, start: Any = None, end: Any = None) -> np.ndarray:
+        """Rows with ``start <= date <= end``, in date order."""
+        low, high = self._date_bounds(start, end)
+        return self._date_order[low:high]
+
+    def _band_bounds(
+        self, low: float | None, high: float | None, absolute: bool
+    ) -> tuple[np.ndarray, int, int]:
+        order, values = (
+            (self._abs_order, self._sorted_abs)
+            if absolute
+            else (self._amount_order, self._sorted_amounts)
+        )
+        first = 0 if low is None else int(np.searchsorted(values, low, "left"))
+        last = (
+            len(values) if high is None else int(np.searchsorted(values, high, "right"))
+        )
+        return order, first, max(first, last)
+
+    def amount_band(
+        self,
+        low: float | None = None,
+        high: float | None = None,
+        *,
+        absolute: bool = False,
+    ) -> np.ndarray:
+        """Rows with ``low <= amount <= high`` (of the absolute amount if asked)."""
+        order, first, last = self._band_bounds(low, high, absolute)
+        return order[first:last]
+
+    def credits(self) -> np.ndarray:
+        """Rows with a positive amount."""
+        return self.amount_band(np.nextafter(0.0, 1.0))
+
+    def _merchant_codes(self, pattern: str) -> list[int]:
+        needle = pattern.strip().lower()
+        words = _TOKEN.findall(needle)
+        if words:
+            # Narrow to merchants holding a token that contains every word
+            candidates: set[int] | None = None
+            for word in words:
+                codes = set().union(
+                    *(c for token, c in self._tokens.items() if word in token)
+                )
+                candidates = codes if candidates is None else candidates & codes
+            names = sorted(candidates or ())
+        else:
+            names = range(len(self._merchants))
+        return [code for code in names if needle in self._merchants[code]]
+
+    def merchant_contains(self, pattern: str) -> np.ndarray:
+        """Rows whose merchant contains ``pattern`` (case-insensitive, literal)."""
+        rows = [self._merchant_rows[code] for code in self._merchant_codes(pattern)]
+        if not rows:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(rows))
+
+    # -- combined queries ------------------------------------------------------
+
+    def search(
+        self,
+        *,
+        start: Any = None,
+        end: Any = None,
+        merchant: str | None = None,
+        min_abs: float | None = None,
+        max_abs: float | None = None,
+        flagged: bool = False,
+        flagged_or_credit: bool = False,
+    ) -> np.ndarray:
+        """
+        Rows matching every given filter, in frame order.
+
+        ``min_abs``/``max_abs`` bound the absolute amount; ``flagged`` keeps
+        flagged rows and ``flagged_or_credit`` flagged rows or credits.
+        """
+        has_dates = start is not None or end is not None
+        has_band = min_abs is not None or max_abs is not None
+
+        # Materialize the smallest candidate set; size the others cheaply
+        sizes: dict[str, int] = {}
+        if has_dates:
+            low, high = self._date_bounds(start, end)
+            sizes["date"] = high - low
+        if has_band:
+            _, first, last = self._band_bounds(min_abs, max_abs, True)
+            sizes["amount"] = last - first
+        if flagged:
+            sizes["flagged"] = len(self.flagged)
+        codes: list[int] = []
+        if merchant:
+            codes = self._merchant_codes(merchant)
+            sizes["merchant"] = sum(len(self._merchant_rows[c]) for c in codes)
+
+        if not sizes:
+            rows = np.arange(self.size)
+        else:
+            smallest = min(sizes, key=sizes.__getitem__)
+            if smallest == "date":
+                rows = np.sort(self.date_range(start, end))
+            elif smallest == "amount":
+                rows = np.sort(self.amount_band(min_abs, max_abs, absolute=True))
+            elif smallest == "flagged":
+                rows = self.flagged
+            else:
+                rows = self.merchant_contains(merchant)
+
+            if has_dates and smallest != "date":
+                dates = self.dates[rows]
+                keep = ~np.isnat(dates)
+                if start is not None:
+                    keep &= dates >= _datetime64(start)
+                if end is not None:
+                    keep &= dates <= _datetime64(end)
+                rows = rows[keep]
+            if has_band and smallest != "amount":
+                amounts = np.abs(self.amounts[rows])
+                keep = ~np.isnan(amounts)
+                if min_abs is not None:
+                    keep &= amounts >= min_abs
+                if max_abs is not None:
+                    keep &= amounts <= max_abs
+                rows = rows[keep]
+            if merchant and smallest != "merchant":
+                # The extra slot keeps code -1 (no merchant) out
+                member = np.zeros(len(self._merchant_rows) + 1, dtype=bool)
+                member[codes] = True
+                rows = rows[member[self._codes[rows]]]
+            if flagged and smallest != "flagged":
+                rows = rows[self._flag_mask[rows]]
+
+        if flagged_or_credit:
+            rows = rows[self._flag_mask[rows] | (self.amounts[rows] > 0)]
+        return rows
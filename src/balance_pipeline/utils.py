@@ -12,10 +12,12 @@ Author: AI Assistant (Cline)
 
 from __future__ import annotations  # For using type hints before full definition
 
+import functools
 import logging
 import re
 import unicodedata
-from typing import TYPE_CHECKING, Any  # Added TYPE_CHECKING and Any
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, TypeVar  # Added TYPE_CHECKING and Any
 
 import pandas as pd
 from balance_pipeline.errors import DataConsistencyError
@@ -27,6 +29,8 @@ if TYPE_CHECKING:
 else:
     Series = pd.Series  # runtime-safe alias
 
+F = TypeVar("F", bound=Callable[..., Any])
+
 
 # ------------------------------------------------------------------------------
 # Function: _strip_accents (Moved from normalize.py)
@@ -112,4 +116,42 @@ def clean_desc_vectorized(
     return cleaned_series
 
 
+# ------------------------------------------------------------------------------
+# Function: copy_on_write (decorator for DataFrame pipeline stages)
+# ------------------------------------------------------------------------------
+def enable_copy_on_write() -> None:
+    """Switch on pandas copy-on-write for the rest of the process.
+
+    ``mode.copy_on_write`` is a process-wide option. The command line entry
+    points call this once, before any stage runs, instead of the stages
+    toggling it around every call.
+    """
+    pd.set_option("mode.copy_on_write", True)
+
+
+def copy_on_write(func: F) -> F:
+    """Mark a DataFrame stage that takes ``df.copy(deep=False)`` of its input.
+
+    Under copy-on-write (see :func:`enable_copy_on_write`) that copy is
+    lazy, and a column is only duplicated when the stage writes into it.
+    Without copy-on-write a shallow copy would share buffers with the
+    caller, so the DataFrame arguments are deep-copied before the stage
+    runs. Either way the input frame is never modified and the returned
+    frame is the caller's to change.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if pd.options.mode.copy_on_write is not True:
+            args = tuple(_own(a) for a in args)
+            kwargs = {k: _own(v) for k, v in kwargs.items()}
+        return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _own(value: Any) -> Any:
+    return value.copy(deep=True) if isinstance(value, pd.DataFrame) else value
+
+
 # Add other utility functions here as needed.
@@ -12,7 +12,7 @@ import plotly.graph_objects as go
 # Assuming analytics.py for _categorize_merchant if it's not passed in
 # For P0, let's assume _categorize_merchant is available or passed if needed by a viz function.
 # Best practice would be to pass any needed categorization logic or pre-categorized data.
-from .analytics import _categorize_merchant
+from .analytics import _categorize_merchant, short_labels
 
 # import plotly.io as pio # Not directly used in these functions, but good for theme setting if done here
 # Assuming config.py is accessible for TABLEAU_COLORBLIND_10 and AnalysisConfig
@@ -121,23 +121,25 @@ def build_running_balance_timeline(
     ax.axhline(0, color="grey", linestyle="--", linewidth=0.8, alpha=0.5)
 
     if "BalanceImpact" in ledger_df.columns:
-        top5 = ledger_df.iloc[ledger_df["BalanceImpact"].abs().nlargest(5).index]
-        for _, row in top5.iterrows():
-            if pd.notna(row["Date"]) and pd.notna(row["RunningBalance"]):
-                desc_short = (
-                    str(row.get("Description", ""))[:20] + "..."
-                    if len(str(row.get("Description", ""))) > 20
-                    else str(row.get("Description", ""))
-                )
-                ax.annotate(
-                    f"{desc_short}\n${row['BalanceImpact']:,.0f}",
-                    xy=(row["Date"], row["RunningBalance"]),
-                    xytext=(0, 20 if row["BalanceImpact"] > 0 else -30),
-                    textcoords="offset points",
-                    ha="center",
-                    fontsize=8,
-                    arrowprops=dict(arrowstyle="->", lw=0.5, color="black", alpha=0.5),
-                )
+        top5 = ledger_df.loc[ledger_df["BalanceImpact"].abs().nlargest(5).index]
+        top5 = top5[top5["Date"].notna() & top5["RunningBalance"].notna()]
+        labels = short_labels(top5, 20)
+        for label, date, balance, impact in zip(
+            labels,
+            top5["Date"],
+            top5["RunningBalance"],
+            top5["BalanceImpact"],
+            strict=True,
+        ):
+            ax.annotate(
+                f"{label}\n${impact:,.0f}",
+                xy=(date, balance),
+                xytext=(0, 20 if impact > 0 else -30),
+                textcoords="offset points",
+                ha="center",
+                fontsize=8,
+                arrowprops=dict(arrowstyle="->", lw=0.5, color="black", alpha=0.5),
+            )
 
     ax.set_title(
         "Running Balance Over Time (Ryan owes Jordyn when > 0)",
@@ -565,15 +567,16 @@ def build_anomaly_scatter(
             ):  # e.g. for 99th percentile, need > 100 points. Simplified: need some points.
                 threshold_value = np.percentile(valid_impacts, threshold_pct)
                 outliers = plot_df[plot_df["BalanceImpact"].abs() > threshold_value]
-                for _, row in outliers.iterrows():
-                    desc_short = (
-                        str(row.get("Description", ""))[:15] + "..."
-                        if len(str(row.get("Description", ""))) > 15
-                        else str(row.get("Description", ""))
-                    )
+                labels = short_labels(outliers, 15)
+                for label, x, y in zip(
+                    labels,
+                    outliers["AllowedAmount"],
+                    outliers["BalanceImpact"],
+                    strict=True,
+                ):
                     ax.annotate(
-                        desc_short,
-                        xy=(row["AllowedAmount"], row["BalanceImpact"]),
+                        label,
+                        xy=(x, y),
                         xytext=(5, 5),
                         textcoords="offset points",
                         fontsize=8,
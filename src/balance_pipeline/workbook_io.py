@@ -0,0 +1,302 @@
+"""
+Streaming reads and in-place cell updates for the BALANCE workbook.
+
+Reading review decisions with ``pd.read_excel`` parses every sheet (and the
+Transactions sheet grows without bound). Here workbooks are opened with
+openpyxl in read-only mode: only the requested sheet is parsed, row by row,
+and only the requested columns are kept.
+
+Writing decisions back does not regenerate the workbook either.
+:func:`write_queue_review_cells` copies every part of the ``.xlsx``/``.xlsm``
+package through unchanged (macros included) except the Queue_Review sheet,
+in which only the cells whose value changed are replaced.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import numbers
+import re
+import shutil
+import zipfile
+from collections.abc import Iterator, Sequence
+from pathlib import Path, PurePosixPath
+from typing import Any
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from .sync import QUEUE_DECISION_COL, QUEUE_SPLIT_COL, QUEUE_TXNID_COL
+
+log = logging.getLogger(__name__)
+
+QUEUE_REVIEW_SHEET = "Queue_Review"
+QUEUE_REVIEW_COLUMNS = (QUEUE_TXNID_COL, QUEUE_DECISION_COL, QUEUE_SPLIT_COL)
+ROW_INDEX_NAME = "row"  # Worksheet row number of each record
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_ROW = re.compile(r'<row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+_CELL = re.compile(r'<c\b[^>]*?\br="([A-Z]+)\d+"[^>]*?(?:/>|>.*?</c>)', re.S)
+_STYLE = re.compile(r'\bs="(\d+)"')
+
+
+def _header_positions(
+    path: Path, sheet: str, columns: Sequence[str]
+) -> tuple[Any, dict[str, int]]:
+    """Open ``sheet`` read-only and find the 1-based column of each header."""
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    if sheet not in workbook.sheetnames:
+        workbook.close()
+        raise ValueError(f"{path} has no '{sheet}' sheet")
+    worksheet = workbook[sheet]
+    worksheet.reset_dimensions()  # Don't trust the stored dimension tag
+    header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+    positions = {
+        str(name).strip(): i for i, name in enumerate(header, 1) if name is not None
+    }
+    missing = [c for c in columns if c not in positions]
+    if missing:
+        workbook.close()
+        raise ValueError(f"'{sheet}' in {path} is missing columns: {missing}")
+    return workbook, {c: positions[c] for c in columns}
+
+
+def iter_sheet_columns(
+    path: str | Path,
+    sheet: str,
+    columns: Sequence[str],
+    *,
+    chunk_rows: int = 50_000,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield ``columns`` of ``sheet`` in DataFrames of up to ``chunk_rows`` rows.
+
+    The header is the first row. Frames are indexed by worksheet row number;
+    rows with none of the columns filled in are skipped.
+    """
+    path = Path(path)
+    workbook, positions = _header_positions(path, sheet, columns)
+    try:
+        yield from _iter_columns(workbook[sheet], positions, columns, chunk_rows)
+    finally:
+        workbook.close()
+
+
+def _iter_columns(
+    worksheet: Any,
+    positions: dict[str, int],
+    columns: Sequence[str],
+    chunk_rows: int,
+) -> Iterator[pd.DataFrame]:
+    low, high = min(positions.values()), max(positions.values())
+    offsets = [positions[c] - low for c in columns]
+    rows: list[tuple[Any, ...]] = []
+    row_numbers: list[int] = []
+    yielded = False
+    cells = worksheet.iter_rows(min_row=2, min_col=low, max_col=high, values_only=True)
+    for number, values in enumerate(cells, 2):
+        record = tuple(values[o] if o < len(values) else None for o in offsets)
+        if all(v is None for v in record):
+            continue
+        rows.append(record)
+        row_numbers.append(number)
+        if len(rows) >= chunk_rows:
+            yield _frame(rows, row_numbers, columns)
+            rows, row_numbers, yielded = [], [], True
+    if rows or not yielded:
+        yield _frame(rows, row_numbers, columns)
+
+
+def _frame(
+    rows: list[tuple[Any, ...]], row_numbers: list[int], columns: Sequence[str]
+) -> pd.DataFrame:
+    index = pd.Index(row_numbers, dtype="int64", name=ROW_INDEX_NAME)
+    return pd.DataFrame.from_records(rows, columns=list(columns), index=index)
+
+
+def read_sheet_columns(
+    path: str | Path, sheet: str, columns: Sequence[str]
+) -> pd.DataFrame:
+    """Read only ``columns`` of ``sheet``, indexed by worksheet row number."""
+    chunks = list(iter_sheet_columns(path, sheet, columns))
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def read_queue_review(
+    path: str | Path, sheet: str = QUEUE_REVIEW_SHEET
+) -> pd.DataFrame:
+    """The TxnID, decision and split columns of the Queue_Review sheet."""
+    df = read_sheet_columns(path, sheet, QUEUE_REVIEW_COLUMNS)
+    log.info(f"Read {len(df)} Queue_Review rows from {Path(path).name}")
+    return df
+
+
+def _sheet_part(package: zipfile.ZipFile, sheet: str) -> str:
+    """The package path of the worksheet XML named ``sheet``."""
+    # The workbook is the user's own file, which openpyxl already parses with
+    # the same stdlib parser (it only switches to defusedxml when installed);
+    # expat does not resolve external entities.
+    workbook = ElementTree.fromstring(package.read("xl/workbook.xml"))  # noqa: S314
+    rel_id = None
+    for element in workbook.iter(f"{{{_MAIN_NS}}}sheet"):
+        if element.get("name") == sheet:
+            rel_id = element.get(f"{{{_REL_NS}}}id")
+    rels = ElementTree.fromstring(  # noqa: S314
+        package.read("xl/_rels/workbook.xml.rels")
+    )
+    for rel in rels.iter(f"{{{_PKG_REL_NS}}}Relationship"):
+        if rel_id is not None and rel.get("Id") == rel_id:
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return str(PurePosixPath("xl") / target)
+    raise ValueError(f"Workbook has no '{sheet}' sheet")
+
+
+def _is_blank(value: Any) -> bool:
+    return (
+        value is None
+        or (isinstance(value, float) and math.isnan(value))
+        or (value is pd.NA)
+    )
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _same(old: Any, new: Any) -> bool:
+    if _is_blank(old) or _is_blank(new):
+        return _is_blank(old) and _is_blank(new)
+    if _is_number(old) and _is_number(new):
+        return float(old) == float(new)
+    return str(old) == str(new)
+
+
+def _cell_xml(ref: str, value: Any, style: str) -> str:
+    if _is_blank(value):
+        return f'<c r="{ref}"{style}/>'
+    if _is_number(value):
+        number = float(value)
+        text = repr(int(number)) if number.is_integer() else repr(number)
+        return f'<c r="{ref}"{style}><v>{text}</v></c>'
+    # Inline strings leave the shared string table untouched
+    text = escape(str(value))
+    return (
+        f'<c r="{ref}"{style} t="inlineStr">'
+        f'<is><t xml:space="preserve">{text}</t></is></c>'
+    )
+
+
+def _patch_row(row_xml: str, number: int, values: dict[str, Any]) -> str:
+    """Replace (or insert) the cells of ``values`` in one ``<row>`` element."""
+    pending = dict(values)
+
+    def replace(match: re.Match[str]) -> str:
+        letter = match.group(1)
+        if letter not in pending:
+            return match.group(0)
+        style = _STYLE.search(match.group(0)[: match.group(0).find(">")])
+        style_attr = f' s="{style.group(1)}"' if style else ""
+        return _cell_xml(f"{letter}{number}", pending.pop(letter), style_attr)
+
+    if row_xml.endswith("/>"):
+        row_xml = row_xml[:-2] + "></row>"
+    row_xml = _CELL.sub(replace, row_xml)
+    for letter, value in pending.items():
+        # New cells go before the first cell to their right
+        position = column_index_from_string(letter)
+        cells = list(_CELL.finditer(row_xml))
+        after = next(
+            (c for c in cells if column_index_from_string(c.group(1)) > position),
+            None,
+        )
+        at = after.start() if after else row_xml.rindex("</row>")
+        row_xml = (
+            row_xml[:at] + _cell_xml(f"{letter}{number}", value, "") + row_xml[at:]
+        )
+    return row_xml
+
+
+def _rewrite_part(path: Path, part: str, data: bytes) -> None:
+    """Copy the package with ``part`` replaced by ``data``, then swap it in."""
+    tmp = path.with_name(path.name + ".tmp")
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(tmp, "w") as target:
+        for info in source.infolist():
+            if info.filename == part:
+                target.writestr(info, data)
+                continue
+            with source.open(info) as reader, target.open(info, "w") as writer:
+                shutil.copyfileobj(reader, writer, 1 << 20)
+    tmp.replace(path)
+
+
+def write_queue_review_cells(
+    path: str | Path,
+    decisions: pd.DataFrame,
+    sheet: str = QUEUE_REVIEW_SHEET,
+) -> int:
+    """
+    Write ``decisions`` into the matching Queue_Review rows, in place.
+
+    ``decisions`` holds ``TxnID`` and any of the decision and split columns.
+    Only cells whose value differs from the workbook are rewritten; TxnIDs
+    not on the sheet are ignored. Returns the number of cells changed.
+    """
+    path = Path(path)
+    columns = [c for c in QUEUE_REVIEW_COLUMNS[1:] if c in decisions.columns]
+    if QUEUE_TXNID_COL not in decisions.columns or not columns:
+        raise ValueError(
+            f"Decisions need '{QUEUE_TXNID_COL}' and one of {list(QUEUE_REVIEW_COLUMNS[1:])}"
+        )
+
+    wanted_columns = [QUEUE_TXNID_COL, *columns]
+    workbook, positions = _header_positions(path, sheet, wanted_columns)
+    try:
+        current = pd.concat(
+            _iter_columns(workbook[sheet], positions, wanted_columns, 50_000)
+        )
+    finally:
+        workbook.close()
+    rows_by_id = pd.Series(current.index, index=current[QUEUE_TXNID_COL].astype(str))
+    rows_by_id = rows_by_id[~rows_by_id.index.duplicated(keep="first")]
+
+    updates: dict[int, dict[str, Any]] = {}
+    wanted = decisions.drop_duplicates(QUEUE_TXNID_COL, keep="last")
+    for record in wanted.itertuples(index=False):
+        values = dict(zip(wanted.columns, record, strict=True))
+        number = rows_by_id.get(str(values[QUEUE_TXNID_COL]))
+        if number is None:
+            continue
+        for column in columns:
+            if not _same(current.at[number, column], values[column]):
+                letter = get_column_letter(positions[column])
+                updates.setdefault(int(number), {})[letter] = values[column]
+    if not updates:
+        log.info(f"Queue_Review in {path.name} already up to date")
+        return 0
+    changed = sum(len(v) for v in updates.values())
+
+    with zipfile.ZipFile(path) as package:
+        part = _sheet_part(package, sheet)
+        sheet_xml = package.read(part).decode("utf-8")
+
+    def patch(match: re.Match[str]) -> str:
+        number = int(match.group(1))
+        if number not in updates:
+            return match.group(0)
+        return _patch_row(match.group(0), number, updates.pop(number))
+
+    sheet_xml = _ROW.sub(patch, sheet_xml)
+    if updates:
+        raise ValueError(f"Rows {sorted(updates)} not found in {part}")
+    _rewrite_part(path, part, sheet_xml.encode("utf-8"))
+
+    log.info(f"Wrote {changed} changed Queue_Review cells to {path.name}")
+    return changed
@@ -22,6 +22,7 @@ __description__ = "Single-run ledger baseline finder for Balance"
 
 # Public re-exports (BA Sprint 1)
 from ._settings import Settings, get_settings, load_config  # noqa: F401
+from .audit_sink import AuditSink  # noqa: F401
 from .baseline_math import build_baseline  # noqa: F401
 from .opening_balance import inject_opening_balance  # noqa: F401
 
@@ -31,4 +32,5 @@ __all__ = [
     "Settings",
     "inject_opening_balance",
     "build_baseline",
+    "AuditSink",
 ]
@@ -0,0 +1,160 @@
+"""
+Parquet audit-trail sink for ``build_baseline``.
+
+Each call stores the audit and summary frames as one content-addressed
+snapshot in a date-partitioned, zstd-compressed Parquet dataset::
+
+    <output_dir>/audit_trail/run_date=YYYY-MM-DD/<digest>.parquet
+    <output_dir>/balance_summary/run_date=YYYY-MM-DD/<digest>.parquet
+    <output_dir>/manifest.json
+
+The digest is a hash of the frame contents, so a run whose audit is
+identical to the previous snapshot writes nothing and only records the
+run in the manifest. The timestamped CSV files of earlier versions are
+still available with ``export_csv=True``.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# Keep the manifest small; older runs remain discoverable from the dataset.
+MANIFEST_MAX_RUNS = 500
+
+
+@dataclass(frozen=True)
+class AuditSnapshot:
+    """One ``build_baseline`` run as recorded in the manifest."""
+
+    digest: str
+    run_at: str
+    rows: int
+    written: bool
+    audit_path: str | None = None
+    summary_path: str | None = None
+
+
+def frame_digest(*frames: pd.DataFrame) -> str:
+    """SHA-256 over column names, dtypes and cell hashes of ``frames``."""
+    digest = hashlib.sha256()
+    for frame in frames:
+        header = [(str(c), str(t)) for c, t in frame.dtypes.items()]
+        digest.update(json.dumps(header).encode("utf-8"))
+        for _, column in frame.items():
+            try:
+                hashed = pd.util.hash_pandas_object(column, index=False)
+            except TypeError:
+                # Unhashable cells (e.g. the pattern_flags lists)
+                hashed = pd.util.hash_pandas_object(column.astype(str), index=False)
+            digest.update(hashed.to_numpy())
+    return digest.hexdigest()
+
+
+class AuditSink:
+    """Write ``build_baseline`` results to a deduplicated Parquet dataset."""
+
+    def __init__(
+        self,
+        output_dir: str | Path = "audit_reports",
+        *,
+        export_csv: bool = False,
+        compression: str = "zstd",
+    ) -> None:
+        self.output_dir = Path(output_dir)
+        self.export_csv = export_csv
+        self.compression = compression
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_dir / MANIFEST_NAME
+
+    def runs(self) -> list[dict]:
+        """Return the manifest entries, oldest first."""
+        if not self.manifest_path.exists():
+            return []
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))["runs"]
+        except (ValueError, KeyError) as e:
+            log.warning(f"Ignoring unreadable audit manifest {self.manifest_path}: {e}")
+            return []
+
+    def write(self, audit_df: pd.DataFrame, summary_df: pd.DataFrame) -> AuditSnapshot:
+        """Persist one snapshot unless it matches the latest one."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        now = datetime.datetime.now()
+        digest = frame_digest(audit_df, summary_df)
+        runs = self.runs()
+        latest = next((r for r in reversed(runs) if r.get("audit_path")), None)
+
+        if latest is not None and latest["digest"] == digest:
+            snapshot = AuditSnapshot(
+                digest=digest,
+                run_at=now.isoformat(timespec="seconds"),
+                rows=len(audit_df),
+                written=False,
+                audit_path=latest["audit_path"],
+                summary_path=latest["summary_path"],
+            )
+            log.info(f"Audit trail unchanged ({digest[:12]}); snapshot skipped")
+        else:
+            partition = f"run_date={now.date().isoformat()}"
+            audit_path = self._write_parquet(audit_df, "audit_trail", partition, digest)
+            summary_path = self._write_parquet(
+                summary_df, "balance_summary", partition, digest
+            )
+            snapshot = AuditSnapshot(
+                digest=digest,
+                run_at=now.isoformat(timespec="seconds"),
+                rows=len(audit_df),
+                written=True,
+                audit_path=audit_path,
+                summary_path=summary_path,
+            )
+            log.info(f"Saved audit trail: {self.output_dir / audit_path}")
+
+        if self.export_csv:
+            self._write_csv(audit_df, summary_df, now)
+
+        runs.append(asdict(snapshot))
+        self._write_manifest(runs[-MANIFEST_MAX_RUNS:])
+        return snapshot
+
+    def _write_parquet(
+        self, df: pd.DataFrame, table: str, partition: str, digest: str
+    ) -> str:
+        relative = Path(table) / partition / f"{digest[:16]}.parquet"
+        path = self.output_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False, compression=self.compression)
+        tmp.replace(path)
+        return relative.as_posix()
+
+    def _write_csv(
+        self,
+        audit_df: pd.DataFrame,
+        summary_df: pd.DataFrame,
+        now: datetime.datetime,
+    ) -> None:
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        audit_file = self.output_dir / f"complete_audit_trail_{timestamp}.csv"
+        summary_file = self.output_dir / f"balance_summary_{timestamp}.csv"
+        audit_df.to_csv(audit_file, index=False)
+        summary_df.to_csv(summary_file, index=False)
+        log.info(f"Saved audit trail: {audit_file}")
+        log.info(f"Saved summary: {summary_file}")
+
+    def _write_manifest(self, runs: list[dict]) -> None:
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"runs": runs}, indent=2), encoding="utf-8")
+        tmp.replace(self.manifest_path)
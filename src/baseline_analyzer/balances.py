@@ -0,0 +1,64 @@
+"""
+Running balance primitives for the baseline analyzer.
+
+These mirror ``balance_pipeline.balances`` so baseline_analyzer stays a
+standalone package; keep the two in step (tests/balance_analyzer checks
+that they agree).
+
+Balances are accumulated with ``np.cumsum``, which adds sequentially and so
+gives exactly the totals of a row-by-row float loop. Rounding goes through
+:func:`round_money`, whose result equals the builtin ``round`` on the stored
+binary value.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Anything within a few ulps of a half unit after scaling may have been
+# nudged onto (or off) the tie by the scaling itself.
+_TIE_ULPS = 4
+
+
+def round_money(values: np.ndarray | pd.Series | float, ndigits: int = 2) -> np.ndarray:
+    """Element-wise builtin ``round(x, ndigits)`` for float arrays."""
+    values = np.asarray(values, dtype=float)
+    flat = values.reshape(-1)
+    out = np.round(flat, ndigits)
+    scaled = flat * 10.0**ndigits
+    distance = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    near_tie = distance <= np.maximum(_TIE_ULPS * np.spacing(np.abs(scaled)), 1e-9)
+    if near_tie.any():
+        out[near_tie] = [round(v, ndigits) for v in flat[near_tie].tolist()]
+    return out.reshape(values.shape)
+
+
+def party_running_balances(
+    amounts: pd.Series | np.ndarray,
+    parties: pd.Series | Sequence[str],
+    names: Sequence[str] | None = None,
+    *,
+    precision: int = 2,
+) -> pd.DataFrame:
+    """Running balance of every party at every row, one column per party.
+
+    A masked cumulative sum: each amount is scattered into its party's
+    column and the matrix is summed down its rows in one ``np.cumsum`` call.
+    ``names`` fixes the parties (and column order); rows for other parties
+    do not move any balance.
+    """
+    index = amounts.index if isinstance(amounts, pd.Series) else None
+    values = np.asarray(amounts, dtype=float)
+    parties = pd.Series(np.asarray(parties, dtype=object))
+    if names is None:
+        names = list(pd.unique(parties.dropna()))
+    codes = pd.Categorical(parties, categories=list(names)).codes
+    matched = np.flatnonzero(codes >= 0)
+
+    matrix = np.zeros((len(values), len(names)))
+    matrix[matched, codes[matched]] = values[matched]
+    balances = round_money(np.cumsum(matrix, axis=0), precision)
+    return pd.DataFrame(balances, index=index, columns=list(names))
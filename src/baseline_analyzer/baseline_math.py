@@ -6,10 +6,14 @@ from __future__ import annotations
 
 import logging
 import re
+import warnings
 
+import numpy as np
 import pandas as pd
 
 from ._settings import get_settings
+from .audit_sink import AuditSink
+from .balances import party_running_balances, round_money
 
 _CFG = get_settings()
 _PATTERNS: dict[str, re.Pattern] = {
@@ -109,192 +113,292 @@ def _clean_data(df: pd.DataFrame, file_type: str) -> pd.DataFrame:
     return df
 
 
+_TWO_X_PERSON = (r"\b2x\s+(Ryan|Jordyn)", r"(Ryan|Jordyn).*?\b2x\b")
+_DOUBLE_CHARGE = r"\$\s*\d+(?:\.\d{1,2})?\s*\(2x\)"
+_FULL_ALLOCATION = r"100%\s+(Jordyn|Ryan)"
+_KEYWORD_RULES = (
+    "xfer_to_ryan",
+    "xfer_to_jordyn",
+    "cashback",
+    "gift",
+    "gift_or_present",
+)
+
+_BASELINE_COLUMNS = [
+    "person",
+    "date",
+    "merchant",
+    "full_description",
+    "actual_amount",
+    "allowed_amount",
+    "net_effect",
+    "pattern_flags",
+    "calculation_notes",
+    "transaction_type",
+    "source_file",
+]
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column rendered as by an f-string; ``""`` when the column is absent."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].astype(str)
+
+
+def _amount(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return df[col].astype(float).to_numpy()
+
+
+def _classify_rules(
+    desc: pd.Series, payer: pd.Series
+) -> tuple[np.ndarray, np.ndarray, list[list[str]]]:
+    """Vectorized :func:`_detect_patterns` over a whole column.
+
+    Returns the rule kind, rule target and pattern flags per row. Each rule is
+    evaluated as a column mask and only claims rows no earlier rule matched,
+    which preserves the precedence of the scalar version.
+    """
+    n = len(desc)
+    kind = np.full(n, "standard", dtype=object)
+    target = np.full(n, None, dtype=object)
+    flag_sets: list[tuple[str, ...]] = [()]
+    flag_idx = np.zeros(n, dtype=np.intp)
+    open_rows = np.ones(n, dtype=bool)
+
+    def claim(mask, rule_kind, rule_target, flags):
+        mask = np.asarray(mask, dtype=bool) & open_rows
+        kind[mask] = rule_kind
+        if isinstance(rule_target, (pd.Series, np.ndarray)):
+            target[mask] = np.asarray(rule_target, dtype=object)[mask]
+        else:
+            target[mask] = rule_target
+        flag_sets.append(flags)
+        flag_idx[mask] = len(flag_sets) - 1
+        open_rows[mask] = False
+
+    has_2x = desc.str.lower().str.contains("2x", regex=False).to_numpy()
+    if has_2x.any():
+        person = desc.str.extract(_TWO_X_PERSON[0], flags=re.I)[0]
+        person = person.fillna(desc.str.extract(_TWO_X_PERSON[1], flags=re.I)[0])
+        claim(
+            has_2x & person.notna().to_numpy(),
+            "full_to",
+            person.fillna("").str.title(),
+            ("multiplier_2x",),
+        )
+        claim(
+            has_2x & desc.str.contains(_DOUBLE_CHARGE, flags=re.I).to_numpy(),
+            "double_charge",
+            None,
+            ("multiplier_2x", "double_charge"),
+        )
+        claim(has_2x, "full_to", payer, ("multiplier_2x", "ambiguous_2x"))
+
+    other = np.where(payer.astype(str).str.lower() == "ryan", "Jordyn", "Ryan")
+    for key in _KEYWORD_RULES:
+        if key not in _PATTERNS:
+            continue
+        matched = _contains(desc, _PATTERNS[key])
+        if key.startswith("xfer_to_"):
+            who = "Ryan" if key.endswith("ryan") else "Jordyn"
+            claim(matched, "transfer", who, (key,))
+        elif key == "cashback":
+            claim(matched, "zero_out", None, (key,))
+        else:
+            claim(matched, "full_to", other, (key,))
+
+    person = desc.str.extract(_FULL_ALLOCATION, flags=re.I)[0]
+    claim(
+        person.notna().to_numpy(),
+        "full_to",
+        person.fillna("").str.title(),
+        ("full_allocation_100_percent",),
+    )
+    return kind, target, [list(flag_sets[i]) for i in flag_idx]
+
+
+def _contains(desc: pd.Series, pattern: re.Pattern) -> np.ndarray:
+    # Config patterns may use capture groups; only the match test matters here.
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", "This pattern is interpreted", UserWarning)
+        return desc.str.contains(pattern).to_numpy()
+
+
+def _interleave(ryan, jordyn) -> np.ndarray:
+    """Ryan row, Jordyn row, Ryan row, ... as one array."""
+    ryan = np.asarray(ryan)
+    out = np.empty(2 * len(ryan), dtype=np.result_type(ryan, np.asarray(jordyn)))
+    out[0::2] = ryan
+    out[1::2] = jordyn
+    return out
+
+
+def _expand_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Two audit rows (Ryan, Jordyn) per CTS transaction, built column-wise."""
+    df = df.reset_index(drop=True)
+    payer = df["person"]
+    is_ryan = (payer == "Ryan").to_numpy()
+    is_jordyn = (payer == "Jordyn").to_numpy()
+    actual = _amount(df, "actual")
+    allowed = _amount(df, "allowed")
+    description, merchant = _text(df, "description"), _text(df, "merchant")
+
+    # Rule kinds for standard transactions. Household histories repeat the
+    # same descriptions, so each distinct (text, payer) pair is matched once.
+    desc = description + " " + merchant
+    codes, _ = pd.factorize(desc + "\x1f" + payer.astype(str))
+    _, first = np.unique(codes, return_index=True)
+    kind, target, unique_flags = _classify_rules(
+        desc.iloc[first].reset_index(drop=True),
+        payer.iloc[first].reset_index(drop=True),
+    )
+    kind, target = kind[codes], target[codes]
+    flags = [unique_flags[c] for c in codes]
+    half = actual / 2
+    who = pd.Series(target, index=df.index, dtype=object)
+    who = who.where(who.astype(bool), payer).astype(str).str.title().to_numpy()
+    to_ryan = who == "Ryan"
+    conditions = [
+        (kind == "standard") | (kind == "double_charge"),
+        (kind == "transfer") & (target == "Ryan"),
+        kind == "transfer",
+        kind == "zero_out",
+        to_ryan,
+    ]
+    allowed_ryan = np.select(conditions, [half, -actual, actual, 0.0, actual], 0.0)
+    allowed_jordyn = np.select(conditions, [half, actual, -actual, 0.0, 0.0], actual)
+    note = np.select(
+        [
+            kind == "standard",
+            kind == "double_charge",
+            conditions[1],
+            conditions[2],
+            conditions[3],
+            to_ryan,
+        ],
+        [
+            "SR | Standard 50/50 split",
+            "DC | Double charge documented",
+            "TR | Zelle to Ryan",
+            "TR | Zelle to Jordyn",
+            "CB | Cash-back",
+            "FT | Full to Ryan",
+        ],
+        "FT | Full to Jordyn",
+    ).astype(object)
+    zero_out = kind == "zero_out"
+    net_ryan = np.where(
+        zero_out, 0.0, round_money(allowed_ryan - np.where(is_ryan, actual, 0.0))
+    )
+    net_jordyn = np.where(
+        zero_out,
+        0.0,
+        round_money(allowed_jordyn - np.where(is_jordyn, actual, 0.0)),
+    )
+
+    # Expense history records have an allowed amount but nothing paid
+    history = (allowed > 0) & (actual == 0)
+    allowed_ryan = np.where(history, np.where(is_ryan, allowed, 0.0), allowed_ryan)
+    allowed_jordyn = np.where(history, np.where(is_ryan, 0.0, allowed), allowed_jordyn)
+    net_ryan = np.where(history, np.where(is_ryan, allowed, -allowed), net_ryan)
+    net_jordyn = np.where(history, np.where(is_ryan, -allowed, allowed), net_jordyn)
+    note[history] = "EH | Expense History"
+    for i in np.flatnonzero(history):
+        flags[i] = ["expense_history"]
+
+    full_description = (description + " | " + merchant).str.strip(" |")
+    audit = pd.DataFrame(
+        {
+            "date": df["date"],
+            "merchant": df["merchant"] if "merchant" in df.columns else "",
+            "full_description": full_description,
+        }
+    ).iloc[np.arange(len(df)).repeat(2)]
+    audit.insert(0, "person", np.tile(["Ryan", "Jordyn"], len(df)))
+    audit["actual_amount"] = _interleave(
+        np.where(is_ryan, actual, 0.0), np.where(is_jordyn, actual, 0.0)
+    )
+    audit["allowed_amount"] = _interleave(allowed_ryan, allowed_jordyn)
+    audit["net_effect"] = _interleave(net_ryan, net_jordyn)
+    audit["pattern_flags"] = pd.Series(flags, dtype=object).repeat(2).to_numpy()
+    audit["calculation_notes"] = np.repeat(note, 2)
+    audit["transaction_type"] = "standard"
+    audit["source_file"] = np.repeat(df["source_file"].to_numpy(), 2)
+    return audit.reset_index(drop=True)
+
+
+def _expand_rent(rent_df: pd.DataFrame) -> pd.DataFrame:
+    """Two audit rows per Rent_Allocation / Rent_History record."""
+    rent_df = rent_df.reset_index(drop=True)
+    is_alloc = (rent_df["source_file"] == "Rent_Allocation").to_numpy()
+    full_rent = _amount(rent_df, "actual_amount")
+    ryan_share = _amount(rent_df, "allowed_amount")
+    description = _text(rent_df, "description")
+    merchant = rent_df["merchant"] if "merchant" in rent_df.columns else ""
+    full_description = np.where(
+        is_alloc,
+        (description + " | Rent Allocation").str.strip(" |"),
+        (
+            description + " | " + _text(rent_df, "merchant") + " | Rent History"
+        ).str.strip(" |"),
+    )
+    note = np.where(is_alloc, "Rent | 43/57 Split (Ryan Pays)", "Rent | History")
+    audit = pd.DataFrame(
+        {
+            "date": rent_df["date"],
+            "merchant": pd.Series(merchant, index=rent_df.index).where(
+                ~is_alloc, "Rent"
+            ),
+            "full_description": full_description,
+        },
+        index=rent_df.index,
+    ).iloc[np.arange(len(rent_df)).repeat(2)]
+    audit.insert(0, "person", np.tile(["Ryan", "Jordyn"], len(rent_df)))
+    jordyn_share = full_rent - ryan_share
+    audit["actual_amount"] = _interleave(full_rent, np.zeros(len(rent_df)))
+    audit["allowed_amount"] = _interleave(ryan_share, jordyn_share)
+    audit["net_effect"] = _interleave(
+        round_money(ryan_share - full_rent), round_money(jordyn_share)
+    )
+    audit["pattern_flags"] = [["rent"] for _ in range(len(audit))]
+    audit["calculation_notes"] = np.repeat(note, 2).astype(object)
+    audit["transaction_type"] = "rent"
+    audit["source_file"] = np.repeat(
+        np.where(is_alloc, "Rent_Allocation", "Rent_History"), 2
+    ).astype(object)
+    return audit.reset_index(drop=True)
+
+
 def build_baseline(
-    df: pd.DataFrame, output_dir: str = "audit_reports"
+    df: pd.DataFrame, output_dir: str = "audit_reports", *, export_csv: bool = False
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Build baseline analysis with audit trail.
 
+    Every transaction expands into one Ryan and one Jordyn audit row. Rule
+    detection, split amounts and net effects are computed column-wise over
+    the whole frame rather than per row.
+
     Args:
         df: Input DataFrame with CTS schema
         output_dir: Directory to save audit files (default: "audit_reports")
+        export_csv: Also write timestamped CSV copies of the audit and summary
 
     Returns:
         tuple: (summary_df, audit_df)
     """
-    import pathlib
-
-    # Ensure output directory exists
-    pathlib.Path(output_dir).mkdir(exist_ok=True)
-
     # Clean the input data
     df = _clean_data(df, "test_data")
 
-    rows = []
-
-    # Process standard expenses and ledger items
-    for _, row in df.iterrows():
-        payer = row["person"]
-        actual_paid = float(row.get("actual", 0.0))
-        allowed_amount = float(row.get("allowed", 0.0))
-
-        # Handle expense history records (have allowed but no actual)
-        if allowed_amount > 0 and actual_paid == 0:
-            # For expense history, the payer gets the allowed amount, other person gets 0
-            if payer == "Ryan":
-                allowed_ryan = allowed_amount
-                allowed_jordyn = 0.0
-                net_effect_ryan = allowed_amount  # Ryan gets positive allowed amount
-                net_effect_jordyn = -allowed_amount  # Jordyn owes this amount
-            else:
-                allowed_ryan = 0.0
-                allowed_jordyn = allowed_amount
-                net_effect_ryan = -allowed_amount  # Ryan owes this amount
-                net_effect_jordyn = (
-                    allowed_amount  # Jordyn gets positive allowed amount
-                )
-            note = "EH | Expense History"
-            flags = ["expense_history"]
-        else:
-            # Standard transaction processing
-            desc = f"{row.get('description', '')} {row.get('merchant', '')}"
-            flags, rule = _detect_patterns(desc, payer)
-
-            if rule[0] == "zero_out":
-                net_effect_ryan = 0.0
-                net_effect_jordyn = 0.0
-                allowed_ryan = 0.0
-                allowed_jordyn = 0.0
-                note = "CB | Cash-back"
-            else:
-                allowed_ryan, allowed_jordyn, note = _apply_split_rules(
-                    actual_paid, rule, payer
-                )
-                net_effect_ryan = round(
-                    allowed_ryan - (actual_paid if payer == "Ryan" else 0.0), 2
-                )
-                net_effect_jordyn = round(
-                    allowed_jordyn - (actual_paid if payer == "Jordyn" else 0.0), 2
-                )
-
-        # Preserve full original description for context
-        full_description = (
-            f"{row.get('description', '')} | {row.get('merchant', '')}".strip(" |")
-        )
-
-        rows.append(
-            {
-                "person": "Ryan",
-                "date": row["date"],
-                "merchant": row.get("merchant", ""),
-                "full_description": full_description,
-                "actual_amount": actual_paid if payer == "Ryan" else 0.0,
-                "allowed_amount": allowed_ryan,
-                "net_effect": net_effect_ryan,
-                "pattern_flags": flags,
-                "calculation_notes": note,
-                "transaction_type": "standard",
-                "source_file": row["source_file"],
-            }
-        )
-        rows.append(
-            {
-                "person": "Jordyn",
-                "date": row["date"],
-                "merchant": row.get("merchant", ""),
-                "full_description": full_description,
-                "actual_amount": actual_paid if payer == "Jordyn" else 0.0,
-                "allowed_amount": allowed_jordyn,
-                "net_effect": net_effect_jordyn,
-                "pattern_flags": flags,
-                "calculation_notes": note,
-                "transaction_type": "standard",
-                "source_file": row["source_file"],
-            }
-        )
-
-    # Process rent allocations
-    rent_df = df[df["source_file"].isin(["Rent_Allocation", "Rent_History"])].copy()
-    for _, r in rent_df.iterrows():
-        if r["source_file"] == "Rent_Allocation":
-            ryan_share = r.get("allowed_amount", 0)
-            jordyn_share = r.get("actual_amount", 0) - ryan_share
-            full_rent = r.get("actual_amount", 0)
-
-            # CORRECTED: Assume Ryan pays rent
-            rent_description = f"{r.get('description', '')} | Rent Allocation".strip(
-                " |"
-            )
-
-            rows.append(
-                {
-                    "person": "Ryan",
-                    "date": r["date"],
-                    "merchant": "Rent",
-                    "full_description": rent_description,
-                    "actual_amount": full_rent,
-                    "allowed_amount": ryan_share,
-                    "net_effect": round(ryan_share - full_rent, 2),
-                    "pattern_flags": ["rent"],
-                    "calculation_notes": "Rent | 43/57 Split (Ryan Pays)",
-                    "transaction_type": "rent",
-                    "source_file": "Rent_Allocation",
-                }
-            )
-            rows.append(
-                {
-                    "person": "Jordyn",
-                    "date": r["date"],
-                    "merchant": "Rent",
-                    "full_description": rent_description,
-                    "actual_amount": 0.0,
-                    "allowed_amount": jordyn_share,
-                    "net_effect": round(jordyn_share - 0.0, 2),
-                    "pattern_flags": ["rent"],
-                    "calculation_notes": "Rent | 43/57 Split (Ryan Pays)",
-                    "transaction_type": "rent",
-                    "source_file": "Rent_Allocation",
-                }
-            )
-        elif r["source_file"] == "Rent_History":
-            # For Rent_History, the actual_amount is the full rent paid by Ryan
-            # and allowed_amount is his share.
-            rent_hist_description = f"{r.get('description', '')} | {r.get('merchant', '')} | Rent History".strip(
-                " |"
-            )
-
-            rows.append(
-                {
-                    "person": "Ryan",
-                    "date": r["date"],
-                    "merchant": r["merchant"],
-                    "full_description": rent_hist_description,
-                    "actual_amount": r["actual_amount"],
-                    "allowed_amount": r["allowed_amount"],
-                    "net_effect": round(r["allowed_amount"] - r["actual_amount"], 2),
-                    "pattern_flags": ["rent"],
-                    "calculation_notes": "Rent | History",
-                    "transaction_type": "rent",
-                    "source_file": "Rent_History",
-                }
-            )
-            rows.append(
-                {
-                    "person": "Jordyn",
-                    "date": r["date"],
-                    "merchant": r["merchant"],
-                    "full_description": rent_hist_description,
-                    "actual_amount": 0,
-                    "allowed_amount": r["actual_amount"] - r["allowed_amount"],
-                    "net_effect": round(r["actual_amount"] - r["allowed_amount"], 2),
-                    "pattern_flags": ["rent"],
-                    "calculation_notes": "Rent | History",
-                    "transaction_type": "rent",
-                    "source_file": "Rent_History",
-                }
-            )
-
-    audit_df = pd.DataFrame(rows)
+    # Process standard expenses and ledger items, then rent allocations
+    parts = [_expand_transactions(df)]
+    rent_df = df[df["source_file"].isin(["Rent_Allocation", "Rent_History"])]
+    if not rent_df.empty:
+        parts.append(_expand_rent(rent_df))
+    audit_df = pd.concat(parts, ignore_index=True)[_BASELINE_COLUMNS]
 
     # Add running balance calculation
     # Sort by date to ensure chronological order
@@ -306,22 +410,12 @@ def build_baseline(
     audit_df["transaction_id"] = range(1, len(audit_df) + 1)
 
     # Calculate running balances for each person
-    ryan_balance = 0.0
-    jordyn_balance = 0.0
-    running_balances_ryan = []
-    running_balances_jordyn = []
-
-    for _, row in audit_df.iterrows():
-        if row["person"] == "Ryan":
-            ryan_balance += row["net_effect"]
-        elif row["person"] == "Jordyn":
-            jordyn_balance += row["net_effect"]
-
-        running_balances_ryan.append(round(ryan_balance, 2))
-        running_balances_jordyn.append(round(jordyn_balance, 2))
-
-    audit_df["running_balance_ryan"] = running_balances_ryan
-    audit_df["running_balance_jordyn"] = running_balances_jordyn
+    parties = list(_CFG.person_aliases) or ["Ryan", "Jordyn"]
+    balances = party_running_balances(
+        audit_df["net_effect"], audit_df["person"], parties
+    )
+    for party in parties:
+        audit_df[f"running_balance_{party.lower()}"] = balances[party]
 
     # Final summary
     summary_df = (
@@ -336,18 +430,7 @@ def build_baseline(
             f"Net imbalance {imbalance:,.2f} exceeds tolerance ({_CFG.rounding_tolerance})."
         )
 
-    # Auto-save audit files to output directory
-    import datetime
-
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    audit_file = f"{output_dir}/complete_audit_trail_{timestamp}.csv"
-    summary_file = f"{output_dir}/balance_summary_{timestamp}.csv"
-
-    audit_df.to_csv(audit_file, index=False)
-    summary_df.to_csv(summary_file, index=False)
-
-    log.info(f"Saved audit trail: {audit_file}")
-    log.info(f"Saved summary: {summary_file}")
+    # Auto-save a deduplicated Parquet snapshot (and optionally CSVs)
+    AuditSink(output_dir, export_csv=export_csv).write(audit_df, summary_df)
 
     return summary_df, audit_df
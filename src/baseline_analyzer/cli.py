@@ -28,9 +28,17 @@ def main() -> None:
         metavar="FILE.parquet",
         help="Optional Parquet file to write the full audit dataframe",
     )
+    ap.add_argument(
+        "--export-csv",
+        action="store_true",
+        help="Also write timestamped audit/summary CSVs to audit_reports/",
+    )
     args = ap.parse_args()
 
-    summary, audit = build_baseline(_load(args.expense_csv), _load(args.ledger_csv))
+    transactions = pd.concat(
+        [_load(args.expense_csv), _load(args.ledger_csv)], ignore_index=True
+    )
+    summary, audit = build_baseline(transactions, export_csv=args.export_csv)
 
     console.print(summary.to_markdown(index=False))
 
@@ -1,13 +1,61 @@
 """
 Lineage tracking utilities for the baseline analyzer.
 Provides functions to inject step IDs and manage data lineage throughout the pipeline.
+
+The ``lineage`` column is a ``pd.Categorical``: each row holds a small integer
+code into the frame's dictionary of distinct step paths ("01a_raw|02b_clean").
+Appending a step or merging lineages rewrites that dictionary once per distinct
+path (or pair of paths) and remaps the codes, so the per-row cost is an integer
+take no matter how long the paths grow. Path operations are memoized across
+frames. Comparisons against plain strings keep working, and CSV/Parquet writers
+emit the readable pipe strings; :func:`expand_lineage` converts the column back
+to plain strings for consumers that need object dtype.
 """
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 
 
+def _lineage_categorical(values: pd.Series) -> pd.Categorical:
+    """Return a lineage column as a Categorical (strings are encoded once)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.array
+    return pd.Categorical(values)
+
+
+def _remap_paths(
+    lineage: pd.Categorical, rewrite: Callable[[object], str]
+) -> pd.Categorical:
+    """Apply ``rewrite`` to every distinct path and remap the row codes.
+
+    Null rows are rewritten from ``""``.
+    """
+    codes = lineage.codes
+    paths = [rewrite(path) for path in lineage.categories.tolist()]
+    if (codes < 0).any():
+        # Code -1 (null) picks the trailing rewrite("") entry.
+        paths.append(rewrite(""))
+    new_codes, new_paths = pd.factorize(pd.Index(paths, dtype=object))
+    return pd.Categorical.from_codes(
+        new_codes[codes], categories=pd.Index(new_paths, dtype=object)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _append_step(path: object, step_id: str) -> str:
+    return f"{path}|{step_id}" if path else step_id
+
+
+@lru_cache(maxsize=4096)
+def _path_steps(path: str) -> tuple[str, ...]:
+    return tuple(path.split("|"))
+
+
 def add_step_id(df: pd.DataFrame, step_id: str) -> pd.DataFrame:
     """
     Add a step ID to the lineage column of a DataFrame.
@@ -22,11 +70,14 @@ def add_step_id(df: pd.DataFrame, step_id: str) -> pd.DataFrame:
     df = df.copy()
 
     if "lineage" not in df.columns:
-        df["lineage"] = step_id
+        df["lineage"] = pd.Categorical.from_codes(
+            np.zeros(len(df), dtype=np.int8), categories=[step_id]
+        )
     else:
         # Append step ID to existing lineage with pipe separator
-        df["lineage"] = (
-            df["lineage"].fillna("").apply(lambda x: f"{x}|{step_id}" if x else step_id)
+        df["lineage"] = _remap_paths(
+            _lineage_categorical(df["lineage"]),
+            lambda path: _append_step(path, step_id),
         )
 
     return df
@@ -45,7 +96,9 @@ def init_lineage(df: pd.DataFrame, source_name: str) -> pd.DataFrame:
     """
     df = df.copy()
     step_id = f"01a_{source_name}_raw"
-    df["lineage"] = step_id
+    df["lineage"] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype=np.int8), categories=[step_id]
+    )
     return df
 
 
@@ -69,11 +122,8 @@ def merge_lineage(
 
     # Combine lineage from both DataFrames
     if "lineage_x" in result.columns and "lineage_y" in result.columns:
-        result["lineage"] = result.apply(
-            lambda row: combine_lineage_values(
-                row.get("lineage_x", ""), row.get("lineage_y", "")
-            ),
-            axis=1,
+        result["lineage"] = _combine_lineage_columns(
+            result["lineage_x"], result["lineage_y"]
         )
         # Drop the temporary lineage columns
         result = result.drop(columns=["lineage_x", "lineage_y"], errors="ignore")
@@ -84,6 +134,32 @@ def merge_lineage(
     return result
 
 
+def _combine_lineage_columns(left: pd.Series, right: pd.Series) -> pd.Categorical:
+    """Row-wise :func:`combine_lineage_values`, evaluated per distinct pair."""
+    left_cat, right_cat = _lineage_categorical(left), _lineage_categorical(right)
+    left_paths = left_cat.categories.tolist() + [""]
+    right_paths = right_cat.categories.tolist() + [""]
+    # Encode each (left, right) pair as one integer; -1 (null) maps to "".
+    pair = left_cat.codes.astype(np.int64) % len(left_paths) * len(right_paths)
+    pair += right_cat.codes.astype(np.int64) % len(right_paths)
+    pairs, codes = np.unique(pair, return_inverse=True)
+    combined = [
+        _combine_paths(
+            left_paths[p // len(right_paths)], right_paths[p % len(right_paths)]
+        )
+        for p in pairs.tolist()
+    ]
+    new_codes, new_paths = pd.factorize(pd.Index(combined, dtype=object))
+    return pd.Categorical.from_codes(
+        new_codes[codes], categories=pd.Index(new_paths, dtype=object)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _combine_paths(lineage1: str, lineage2: str) -> str:
+    return combine_lineage_values(lineage1, lineage2)
+
+
 def combine_lineage_values(lineage1: str, lineage2: str) -> str:
     """
     Combine two lineage strings, removing duplicates while preserving order.
@@ -134,9 +210,9 @@ def validate_lineage(df: pd.DataFrame, expected_steps: list[str] | None = None)
 
     # If expected steps provided, validate they're all present
     if expected_steps:
-        for _, row in df.iterrows():
-            lineage_steps = set(row["lineage"].split("|"))
-            if not set(expected_steps).issubset(lineage_steps):
+        required = set(expected_steps)
+        for path in _lineage_categorical(df["lineage"]).unique().tolist():
+            if not required.issubset(_path_steps(path)):
                 return False
 
     return True
@@ -155,11 +231,13 @@ def get_lineage_summary(df: pd.DataFrame) -> dict:
     if "lineage" not in df.columns:
         return {"error": "No lineage column found"}
 
-    lineage_counts = df["lineage"].value_counts()
+    lineage = _lineage_categorical(df["lineage"])
+    lineage_counts = pd.Series(lineage).value_counts()
+    lineage_counts = lineage_counts[lineage_counts > 0]
     all_steps = set()
 
-    for lineage in df["lineage"].dropna():
-        all_steps.update(lineage.split("|"))
+    for path in lineage_counts.index:
+        all_steps.update(_path_steps(path))
 
     return {
         "total_rows": len(df),
@@ -168,3 +246,19 @@ def get_lineage_summary(df: pd.DataFrame) -> dict:
         "all_steps": sorted(list(all_steps)),
         "lineage_distribution": lineage_counts.to_dict(),
     }
+
+
+def expand_lineage(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of ``df`` with lineage as plain pipe-separated strings.
+
+    Args:
+        df: DataFrame with a (categorical) lineage column
+
+    Returns:
+        DataFrame whose lineage column has object dtype
+    """
+    df = df.copy()
+    if "lineage" in df.columns:
+        df["lineage"] = df["lineage"].astype(object)
+    return df
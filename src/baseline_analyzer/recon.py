@@ -5,6 +5,8 @@ from typing import Any
 
 import pandas as pd
 
+from .balances import round_money
+
 # Assuming config.py is in the same directory or accessible via PYTHONPATH
 from .config import AnalysisConfig
 
@@ -20,22 +22,56 @@ def calc_m1_running_balance(df: pd.DataFrame) -> float:
     return float(df["RunningBalance"].iloc[-1])
 
 
-def calc_m2_fair_share(df: pd.DataFrame, config: AnalysisConfig) -> dict[str, Any]:
+def shared_totals(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Calculate M2: Ryan's variance from fair share of total shared expenses.
-    Returns variance calculation details.
+    Shared AllowedAmount by TransactionType and lowercased payer.
+
+    One groupby over (TransactionType, Payer, IsShared) feeds both M2 and
+    M3. One row per TransactionType in order of first appearance among
+    shared rows, a ``total`` column and one column per payer. Mirrors
+    ``balance_pipeline.recon.shared_totals``.
     """
-    if df.empty:
-        return {
-            "variance": 0.0,
-            "total_shared": 0.0,
-            "ryan_fair_share": 0.0,
-            "ryan_actually_paid": 0.0,
-        }
+    if df.empty or "AllowedAmount" not in df.columns:
+        return pd.DataFrame(columns=["total"], dtype=float)
+
+    types = df["TransactionType"] if "TransactionType" in df.columns else None
+    keys = [
+        types if types is not None else pd.Series(None, index=df.index, dtype=object),
+        df["Payer"],
+        df["IsShared"].eq(True),
+    ]
+    sums = df["AllowedAmount"].groupby(keys, sort=False, dropna=False).sum()
+    shared = sums[sums.index.get_level_values(2).to_numpy(dtype=bool)]
+    if shared.empty:
+        return pd.DataFrame(columns=["total"], dtype=float)
+
+    type_keys = shared.index.get_level_values(0)
+    payer_keys = shared.index.get_level_values(1).astype("string").str.lower()
+    table = (
+        shared.groupby([type_keys, payer_keys], sort=False, dropna=False)
+        .sum()
+        .unstack(fill_value=0.0)
+    )
+    totals = shared.groupby(type_keys, sort=False, dropna=False).sum()
+    table = table.reindex(totals.index, fill_value=0.0)
+    table.columns = [str(c) if pd.notna(c) else "" for c in table.columns]
+    table.insert(0, "total", totals)
+    return table.astype(float)
 
-    shared_only = df[df["IsShared"] == True].copy()
 
-    if shared_only.empty or "AllowedAmount" not in shared_only.columns:
+def calc_m2_fair_share(
+    df: pd.DataFrame,
+    config: AnalysisConfig,
+    totals: pd.DataFrame | None = None,
+) -> dict[str, Any]:
+    """
+    Calculate M2: Ryan's variance from fair share of total shared expenses.
+    Returns variance calculation details. ``totals`` is a precomputed
+    :func:`shared_totals` table for ``df``.
+    """
+    if totals is None:
+        totals = shared_totals(df)
+    if totals.empty:
         return {
             "variance": 0.0,
             "total_shared": 0.0,
@@ -43,75 +79,53 @@ def calc_m2_fair_share(df: pd.DataFrame, config: AnalysisConfig) -> dict[str, An
             "ryan_actually_paid": 0.0,
         }
 
-    total_shared_amount = shared_only["AllowedAmount"].sum()
+    total_shared_amount = float(totals["total"].sum())
     ryan_fair_share = total_shared_amount * config.RYAN_PCT
-
-    ryan_actually_paid = shared_only[shared_only["Payer"].str.lower() == "ryan"][
-        "AllowedAmount"
-    ].sum()
-
-    variance = ryan_actually_paid - ryan_fair_share
-
+    ryan_actually_paid = float(totals["ryan"].sum()) if "ryan" in totals else 0.0
     return {
-        "variance": float(variance),
-        "total_shared": float(total_shared_amount),
+        "variance": float(ryan_actually_paid - ryan_fair_share),
+        "total_shared": total_shared_amount,
         "ryan_fair_share": float(ryan_fair_share),
-        "ryan_actually_paid": float(ryan_actually_paid),
+        "ryan_actually_paid": ryan_actually_paid,
     }
 
 
-def calc_m3_category_sum(df: pd.DataFrame, config: AnalysisConfig) -> dict[str, Any]:
+def calc_m3_category_sum(
+    df: pd.DataFrame,
+    config: AnalysisConfig,
+    totals: pd.DataFrame | None = None,
+) -> dict[str, Any]:
     """
     Calculate M3: Sum of Ryan's variance by category.
-    Returns category breakdown and total variance.
+    Returns category breakdown and total variance. ``totals`` is a
+    precomputed :func:`shared_totals` table for ``df``.
     """
-    if df.empty:
+    if totals is None:
+        totals = shared_totals(df)
+    if totals.empty:
         return {"variance": 0.0, "category_details": []}
 
-    shared_only = df[df["IsShared"] == True].copy()
-
-    if shared_only.empty or "AllowedAmount" not in shared_only.columns:
-        return {"variance": 0.0, "category_details": []}
-
-    total_variance = 0.0
-    category_details = []
-
-    for trans_type in shared_only["TransactionType"].unique():
-        type_data = shared_only[shared_only["TransactionType"] == trans_type]
-
-        if not type_data.empty:
-            type_total_shared = type_data["AllowedAmount"].sum()
-            type_ryan_fair_share = type_total_shared * config.RYAN_PCT
-
-            type_ryan_paid = type_data[type_data["Payer"].str.lower() == "ryan"][
-                "AllowedAmount"
-            ].sum()
-
-            type_jordyn_paid = type_data[type_data["Payer"].str.lower() == "jordyn"][
-                "AllowedAmount"
-            ].sum()
-
-            type_variance = type_ryan_paid - type_ryan_fair_share
-            total_variance += type_variance
-
-            category_details.append(
-                {
-                    "Category": trans_type,
-                    "TotalShared": round(type_total_shared, config.CURRENCY_PRECISION),
-                    "RyanPaidShared": round(type_ryan_paid, config.CURRENCY_PRECISION),
-                    "JordynPaidShared": round(
-                        type_jordyn_paid, config.CURRENCY_PRECISION
-                    ),
-                    "RyanFairShare": round(
-                        type_ryan_fair_share, config.CURRENCY_PRECISION
-                    ),
-                    "RyanVarianceForCategory": round(
-                        type_variance, config.CURRENCY_PRECISION
-                    ),
-                }
-            )
-
-    return {"variance": float(total_variance), "category_details": category_details}
+    table = totals[totals.index.notna()]
+    zeros = pd.Series(0.0, index=table.index)
+    fair_share = table["total"] * config.RYAN_PCT
+    variance = table.get("ryan", zeros) - fair_share
+    details = pd.DataFrame(
+        {
+            "TotalShared": table["total"],
+            "RyanPaidShared": table.get("ryan", zeros),
+            "JordynPaidShared": table.get("jordyn", zeros),
+            "RyanFairShare": fair_share,
+            "RyanVarianceForCategory": variance,
+        }
+    )
+    details = details.apply(lambda col: round_money(col, config.CURRENCY_PRECISION))
+    details.insert(0, "Category", table.index)
+    # Accumulate in category order, as the per-type loop did
+    total_variance = sum(variance.tolist(), 0.0)
+    return {
+        "variance": float(total_variance),
+        "category_details": details.to_dict("records"),
+    }
 
 
 def triple_reconciliation(
@@ -150,10 +164,11 @@ def triple_reconciliation(
             "amount_owed": 0.0,
         }
 
-    # Calculate M1, M2, M3 using helper functions
+    # Calculate M1, then M2 and M3 from one shared-totals aggregate
     m1 = calc_m1_running_balance(master_ledger)
-    m2_result = calc_m2_fair_share(master_ledger, config)
-    m3_result = calc_m3_category_sum(master_ledger, config)
+    totals = shared_totals(master_ledger)
+    m2_result = calc_m2_fair_share(master_ledger, config, totals)
+    m3_result = calc_m3_category_sum(master_ledger, config, totals)
 
     m2 = m2_result["variance"]
     m3 = m3_result["variance"]
@@ -0,0 +1,61 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from baseline_analyzer import cli
+from baseline_analyzer.audit_sink import AuditSink
+from baseline_analyzer.baseline_math import build_baseline
+
+
+def _expenses(amount=10.0):
+    return pd.DataFrame(
+        {
+            "Name": ["Ryan", "Jordyn Expenses"],
+            "Date": ["2024-01-01", "2024-01-02"],
+            "Actual Amount": [amount, 20.5],
+            "Description": ["Toll (2x)", "Groceries"],
+        }
+    )
+
+
+def test_identical_runs_share_one_snapshot(tmp_path):
+    _, audit = build_baseline(_expenses(), str(tmp_path))
+    build_baseline(_expenses(), str(tmp_path))
+    build_baseline(_expenses(amount=12.0), str(tmp_path))
+
+    runs = AuditSink(tmp_path).runs()
+    assert [r["written"] for r in runs] == [True, False, True]
+    assert runs[0]["audit_path"] == runs[1]["audit_path"]
+    assert runs[0]["digest"] != runs[2]["digest"]
+
+    files = sorted((tmp_path / "audit_trail").rglob("*.parquet"))
+    assert len(files) == 2
+    assert files[0].parent.name.startswith("run_date=")
+    assert not list(tmp_path.glob("*.csv"))
+
+    stored = pd.read_parquet(tmp_path / runs[0]["audit_path"])
+    pd.testing.assert_series_equal(stored["net_effect"], audit["net_effect"])
+
+
+def test_csv_export_is_optional(tmp_path):
+    build_baseline(_expenses(), str(tmp_path), export_csv=True)
+    assert len(list(tmp_path.glob("complete_audit_trail_*.csv"))) == 1
+    assert len(list(tmp_path.glob("balance_summary_*.csv"))) == 1
+
+
+def test_cli_export_csv_flag(tmp_path, monkeypatch):
+    pytest.importorskip("tabulate")  # Summary is printed with to_markdown
+    monkeypatch.chdir(tmp_path)
+    _expenses().to_csv("expenses.csv", index=False)
+    _expenses(amount=3.0).to_csv("ledger.csv", index=False)
+
+    monkeypatch.setattr(sys, "argv", ["balance-baseline", "expenses.csv", "ledger.csv"])
+    cli.main()
+    assert not list((tmp_path / "audit_reports").glob("*.csv"))
+
+    monkeypatch.setattr(sys, "argv", [*sys.argv, "--export-csv"])
+    cli.main()
+    assert (
+        len(list((tmp_path / "audit_reports").glob("complete_audit_trail_*.csv"))) == 1
+    )
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from baseline_analyzer.lineage_utils import (
+    add_step_id,
+    expand_lineage,
+    get_lineage_summary,
+    init_lineage,
+    merge_lineage,
+    validate_lineage,
+)
+
+
+def test_steps_remap_codes_without_touching_rows():
+    df = init_lineage(pd.DataFrame({"amount": np.arange(10_000)}), "expenses")
+    df = add_step_id(add_step_id(df, "02b_clean"), "03a_split")
+
+    assert isinstance(df["lineage"].dtype, pd.CategoricalDtype)
+    assert df["lineage"].cat.categories.tolist() == [
+        "01a_expenses_raw|02b_clean|03a_split"
+    ]
+    assert df["lineage"].cat.codes.dtype == np.int8
+    assert (df["lineage"] == "01a_expenses_raw|02b_clean|03a_split").all()
+    assert validate_lineage(df, ["02b_clean", "03a_split"])
+    assert not validate_lineage(df, ["04_missing"])
+
+
+def test_plain_string_lineage_is_encoded_on_entry():
+    df = pd.DataFrame({"lineage": ["a", "a|b", None, "", "a"]})
+    result = add_step_id(df, "c")
+    assert result["lineage"].tolist() == ["a|c", "a|b|c", "c", "c", "a|c"]
+    assert expand_lineage(result)["lineage"].dtype == object
+
+
+def test_merge_matches_row_wise_combination():
+    left = pd.DataFrame({"key": [1, 2, 3, 4], "lineage": ["a|b", "a", "x", None]})
+    right = pd.DataFrame({"key": [1, 2, 3, 5], "lineage": ["b|c", "a|d", "", "y"]})
+    merged = merge_lineage(left, right, "m", on="key", how="outer")
+
+    # Missing and empty sides contribute nothing to the combined path.
+    expected = ["a|b|c|m", "a|d|m", "x|m", "m", "y|m"]
+    assert merged.sort_values("key")["lineage"].tolist() == expected
+
+    summary = get_lineage_summary(merged)
+    assert summary["unique_lineage_paths"] == 5
+    assert summary["all_steps"] == ["a", "b", "c", "d", "m", "x", "y"]
+    assert sum(summary["lineage_distribution"].values()) == len(merged)
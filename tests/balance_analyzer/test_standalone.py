@@ -0,0 +1,72 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline import balances as pipeline_balances
+from balance_pipeline import recon as pipeline_recon
+from balance_pipeline.config import AnalysisConfig as PipelineConfig
+from baseline_analyzer import balances, recon
+from baseline_analyzer.config import AnalysisConfig
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+
+
+def test_package_imports_without_balance_pipeline(tmp_path):
+    code = (
+        "import sys, baseline_analyzer, baseline_analyzer.recon\n"
+        "print('balance_pipeline' in sys.modules)\n"
+    )
+    # Fixed argv: this interpreter running a literal snippet, no shell
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_vendored_primitives_match_balance_pipeline():
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [rng.normal(0, 500, 2000), [-0.005, 0.005, 1.005, 2.675, -1.115]]
+    )
+    np.testing.assert_array_equal(
+        balances.round_money(values), pipeline_balances.round_money(values)
+    )
+
+    parties = rng.choice(["ryan", "jordyn", "other"], len(values))
+    pd.testing.assert_frame_equal(
+        balances.party_running_balances(values, parties, ["ryan", "jordyn"]),
+        pipeline_balances.party_running_balances(values, parties, ["ryan", "jordyn"]),
+    )
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_reconciliation_matches_balance_pipeline(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    amounts = rng.uniform(1, 200, n).round(2)
+    payers = rng.choice(["Ryan", "jordyn", "RYAN"], n)
+    ledger = pd.DataFrame(
+        {
+            "TransactionType": rng.choice(["EXPENSE", "RENT", None], n),
+            "Payer": payers,
+            "IsShared": rng.random(n) > 0.3,
+            "AllowedAmount": amounts,
+            "BalanceImpact": (amounts * rng.choice([-0.57, 0.43], n)).round(2),
+        }
+    )
+    ledger["RunningBalance"] = ledger["BalanceImpact"].cumsum().round(2)
+
+    ours = recon.triple_reconciliation(ledger, AnalysisConfig())
+    theirs = pipeline_recon.triple_reconciliation(ledger, PipelineConfig())
+
+    for key in ("m2", "m3", "total_shared_amount", "category_details"):
+        assert ours[key] == theirs[key]
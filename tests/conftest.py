@@ -0,0 +1,52 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def synthetic_ledger(n, seed=0, *, start="2024-01-01", freq="h", **columns):
+    """Seeded ledger-like frame with ``n`` rows, one per ``freq`` from ``start``.
+
+    Keyword arguments replace or add columns: a list is sampled per row
+    (keeping the types of its items, so ``None`` stays ``None``), ``None``
+    drops the column and any other value is assigned as is.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Date": pd.date_range(start, periods=n, freq=freq),
+            "TransactionType": rng.choice(["EXPENSE", "RENT"], n),
+            "Payer": rng.choice(["Ryan", "Jordyn"], n),
+            "Merchant": rng.choice(["Shop", "Gas"], n),
+            "Description": "lunch",
+            "ActualAmount": rng.normal(40, 30, n).round(2),
+            "AllowedAmount": rng.normal(20, 15, n).round(2),
+            "IsShared": rng.random(n) > 0.2,
+            "BalanceImpact": rng.normal(0, 10, n).round(2),
+            "RunningBalance": rng.normal(0, 100, n).round(2),
+        }
+    )
+    for name, value in columns.items():
+        if value is None:
+            df = df.drop(columns=name)
+        elif isinstance(value, list):
+            sampled = rng.choice(np.array(value, dtype=object), n)
+            df[name] = pd.Series(sampled, index=df.index).infer_objects()
+        else:
+            df[name] = value
+    return df
+
+
+@pytest.fixture
+def make_ledger():
+    """The :func:`synthetic_ledger` factory."""
+    return synthetic_ledger
+
+
+@pytest.fixture
+def quiet_logger():
+    """Logger for the stages under test that drops every record."""
+    logger = logging.getLogger("tests.quiet")
+    logger.disabled = True
+    return logger
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.ledger import _explode_audit, create_master_ledger
+from balance_pipeline.processing import (
+    AUDIT_PART_COLUMNS,
+    _create_enhanced_rent_audit_note,
+    _create_expense_audit_note,
+    add_expense_audit_notes,
+    add_rent_audit_notes,
+    format_values,
+)
+
+
+def _expenses(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    actual = rng.normal(60, 80, n).round(2)
+    allowed = np.where(rng.random(n) < 0.5, actual, (actual * rng.random(n)).round(2))
+    allowed[rng.random(n) < 0.15] = 0.0
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range("2024-01-01", periods=n, freq="D"),
+            "ActualAmount": actual,
+            "AllowedAmount": allowed,
+            "Payer": rng.choice(["Ryan", "Jordyn", ""], n),
+            "Description": rng.choice([" groceries ", "", "2x toll", None], n),
+            "DataQualityFlag": rng.choice(["CLEAN", "MANUAL_CALC_NOTE"], n),
+            "TransactionType": rng.choice(["EXPENSE", "EXPENSE", "SETTLEMENT"], n),
+            "IsShared": rng.random(n) < 0.8,
+            "Merchant": "Shop",
+        }
+    )
+
+
+def _rent(n=24):
+    rng = np.random.default_rng(1)
+    budget = rng.normal(2000, 100, n).round(2)
+    actual = budget + rng.choice([0.0, 0.004, 35.5, -12.25], n)
+    df = pd.DataFrame(
+        {
+            "Date": pd.date_range("2023-01-01", periods=n, freq="MS"),
+            "Month_Display": pd.date_range("2023-01-01", periods=n, freq="MS")
+            .strftime("%b %Y")
+            .tolist(),
+            "GrossTotal": actual,
+            "RyanOwes": (actual * 0.43).round(2),
+            "Payer": "Jordyn",
+            "DataQualityFlag": "CLEAN",
+            "Total_Budgeted": budget,
+            "Total_Actual": actual,
+            "Budget_Variance": actual - budget,
+            "Budget_Variance_Pct": (actual - budget) / budget * 100,
+        }
+    )
+    df.loc[3, ["Total_Budgeted", "Budget_Variance"]] = np.nan
+    df.loc[5, "Month_Display"] = None
+    return df
+
+
+def test_expense_notes_match_scalar_builder():
+    config = AnalysisConfig()
+    df = _expenses()
+    expected = df.apply(lambda row: _create_expense_audit_note(row, config), axis=1)
+
+    notes = add_expense_audit_notes(df.copy())
+
+    pd.testing.assert_series_equal(notes["AuditNote"], expected, check_names=False)
+    partial = notes["Share_Type"] == "PARTIALLY_SHARED"
+    assert partial.any() and (notes["Share_Type"] == "SETTLEMENT").any()
+    assert notes.loc[~partial, "Shared_Reason"].eq("<NA>").all()
+    assert notes.loc[notes["Payer"] == "", "Who_Paid_Text"].eq("<NA>").all()
+    assert notes.loc[notes["Payer"] == "Ryan", "Who_Paid_Text"].eq("Ryan").all()
+
+
+def test_rent_notes_match_scalar_builder():
+    config = AnalysisConfig()
+    df = _rent()
+    expected = df.apply(
+        lambda row: _create_enhanced_rent_audit_note(row, config), axis=1
+    )
+
+    notes = add_rent_audit_notes(df.copy())
+
+    pd.testing.assert_series_equal(notes["AuditNote"], expected, check_names=False)
+    assert notes.loc[0, "Description"] == "Rent for Jan 2023"
+    assert notes["Share_Type"].eq("SHARED").all()
+
+
+def test_master_ledger_keeps_stored_parts():
+    config = AnalysisConfig()
+    rent = add_rent_audit_notes(_rent().head(3).assign(TransactionType="RENT"))
+    rent = rent.assign(
+        ActualAmount=rent["GrossTotal"],
+        AllowedAmount=rent["GrossTotal"],
+        IsShared=True,
+        JordynOwes=0.0,
+        BalanceImpact=rent["RyanOwes"],
+    )
+    # Rows without stored parts still have their note parsed
+    expenses = _expenses(5).assign(
+        RyanOwes=0.0, JordynOwes=0.0, BalanceImpact=0.0, AuditNote="paid by Alex"
+    )
+
+    master = create_master_ledger(rent, expenses, config)
+
+    from_rent = master[master["TransactionType"] == "RENT"]
+    assert from_rent["Who_Paid_Text"].eq("Jordyn").all()
+    assert from_rent["DataQuality_Audit"].eq("CLEAN").all()
+    parsed = master[master["TransactionType"] != "RENT"]
+    assert parsed[AUDIT_PART_COLUMNS].values.tolist() == [
+        list(_explode_audit("paid by Alex"))
+    ] * len(parsed)
+
+
+def test_format_values_handles_all_null_columns():
+    values = pd.Series([None, np.nan, None], index=[4, 5, 6], dtype=object)
+
+    formatted = format_values(values, lambda v: f"<{v}>")
+
+    assert formatted.tolist() == ["<None>", "<nan>", "<None>"]
+    assert formatted.index.tolist() == [4, 5, 6]
+    assert format_values(pd.Series([], dtype=float), ",.2f").empty
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline.analytics import perform_advanced_analytics
+from balance_pipeline.balances import (
+    BalanceIndex,
+    final_balance,
+    party_running_balances,
+    round_money,
+    running_balance,
+)
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.recon import calc_m1_running_balance
+
+
+def test_round_money_matches_builtin_round():
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [
+            rng.integers(-(10**7), 10**7, 20_000) / 1000,  # many half-cent ties
+            rng.uniform(-1e6, 1e6, 20_000),
+            [-0.005, 0.015, 2.675, 1.005, 0.125, np.nan],
+        ]
+    )
+    expected = [round(v, 2) for v in values.tolist()]
+    np.testing.assert_array_equal(round_money(values), expected)
+    assert round_money(-0.005) == -0.01
+
+
+def test_running_balance_equals_row_by_row_loop():
+    amounts = pd.Series([10.005, -3.333, 0.01, -0.015, 100.0], index=list("abcde"))
+    total, expected = 1.0, []
+    for value in amounts:
+        total += value
+        expected.append(round(total, 2))
+
+    result = running_balance(amounts, opening=1.0)
+    assert result.tolist() == expected
+    assert result.index.tolist() == list("abcde")
+    assert final_balance(amounts, opening=1.0) == expected[-1]
+    assert final_balance([]) == 0.0
+
+
+def test_party_running_balances_supports_many_parties():
+    amounts = [5.0, -2.5, 1.25, 4.0, 7.0]
+    parties = ["Ryan", "Jordyn", "Alex", "Ryan", "Guest"]
+
+    balances = party_running_balances(amounts, parties, ["Ryan", "Jordyn", "Alex"])
+
+    assert balances.columns.tolist() == ["Ryan", "Jordyn", "Alex"]
+    assert balances["Ryan"].tolist() == [5.0, 5.0, 5.0, 9.0, 9.0]
+    assert balances["Jordyn"].tolist() == [0.0, -2.5, -2.5, -2.5, -2.5]
+    assert balances["Alex"].tolist() == [0.0, 0.0, 1.25, 1.25, 1.25]
+    # Without names every party seen is tracked, in order of appearance
+    assert party_running_balances(amounts, parties).columns.tolist() == [
+        "Ryan",
+        "Jordyn",
+        "Alex",
+        "Guest",
+    ]
+
+
+def test_m1_reaccumulates_balance_impact():
+    ledger = pd.DataFrame(
+        {"BalanceImpact": [0.01, -0.015], "RunningBalance": [0.01, 999.0]}
+    )
+    assert calc_m1_running_balance(ledger) == round(0.01 - 0.015, 2)
+    assert calc_m1_running_balance(ledger.drop(columns="BalanceImpact")) == 999.0
+    assert calc_m1_running_balance(pd.DataFrame()) == 0.0
+
+
+def _impacts(n, seed, start="2024-01-01", days=90):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Date": pd.Timestamp(start)
+            + pd.to_timedelta(rng.integers(0, days, n), unit="D"),
+            "BalanceImpact": rng.normal(0, 40, n).round(2),
+            "Payer": rng.choice(["Ryan", "Jordyn"], n),
+            "TransactionType": rng.choice(["RENT", "EXPENSE"], n),
+        }
+    )
+
+
+def test_balance_index_queries_match_ledger_scans():
+    rows = _impacts(500, seed=1)
+    ledger = rows.sort_values("Date", kind="stable")
+    index = BalanceIndex.from_ledger(ledger)
+
+    for day in ["2023-12-31", "2024-01-15", "2024-02-29", "2024-12-31"]:
+        expected = running_balance(ledger.loc[ledger["Date"] <= day, "BalanceImpact"])
+        assert index.balance_at(day) == (expected.iloc[-1] if len(expected) else 0.0)
+
+    window = ledger[ledger["Date"].between("2024-02-01", "2024-02-14")]
+    assert index.range_total("2024-02-01", "2024-02-14") == pytest.approx(
+        window["BalanceImpact"].sum(), abs=0.005
+    )
+    by_payer = index.range_total("2024-02-01", "2024-02-14", by="payer")
+    for payer, total in window.groupby("Payer")["BalanceImpact"].sum().items():
+        assert by_payer[payer] == pytest.approx(total, abs=0.005)
+
+    month_ends = index.month_end_series()
+    assert month_ends.index.strftime("%Y-%m-%d").tolist() == [
+        "2024-01-31",
+        "2024-02-29",
+        "2024-03-31",
+    ]
+    assert month_ends.iloc[-1] == final_balance(ledger["BalanceImpact"])
+
+
+def test_balance_index_append_matches_rebuild():
+    history, backdated = _impacts(300, seed=2), _impacts(20, seed=3, days=120)
+    index = BalanceIndex.from_ledger(history)
+    index.append(backdated)
+    index.append(_impacts(5, seed=4, start="2024-06-01", days=3))
+
+    rebuilt = BalanceIndex.from_ledger(
+        pd.concat([history, backdated, _impacts(5, seed=4, start="2024-06-01", days=3)])
+    )
+    assert len(index) == len(rebuilt) == 325
+    pd.testing.assert_series_equal(index.month_end_series(), rebuilt.month_end_series())
+    assert index.range_total("2024-03-01", "2024-06-30", by="category") == (
+        rebuilt.range_total("2024-03-01", "2024-06-30", by="category")
+    )
+
+
+def test_balance_index_batched_appends_match_rebuild():
+    batches = [
+        _impacts(7, seed=seed, start="2024-01-01", days=90) for seed in range(30)
+    ]
+    batches[20]["Payer"] = "Guest"  # New label after the buffers have grown
+    index = BalanceIndex()
+    for batch in batches:
+        index.append(batch)
+
+    rebuilt = BalanceIndex.from_ledger(pd.concat(batches))
+    assert len(index) == len(rebuilt) == 210
+    pd.testing.assert_series_equal(index.month_end_series(), rebuilt.month_end_series())
+    for by in ("payer", "category"):
+        assert index.range_total("2024-01-01", "2024-03-31", by=by) == (
+            rebuilt.range_total("2024-01-01", "2024-03-31", by=by)
+        )
+
+
+def test_month_end_stats_match_per_month_last_balance(quiet_logger):
+    ledger = pd.concat(
+        [_impacts(50, seed=1), _impacts(10, seed=5, start="2024-06-01", days=20)]
+    )
+    ledger = ledger.sort_values("Date", kind="stable").reset_index(drop=True)
+    ledger["RunningBalance"] = running_balance(ledger["BalanceImpact"])
+    ledger["IsShared"] = True
+    ledger["AllowedAmount"] = 1.0
+
+    stats = perform_advanced_analytics(
+        ledger.copy(), pd.DataFrame(), AnalysisConfig(), quiet_logger
+    )["month_end_running_balance_stats"]
+    # April and May have no rows and are left out, as before
+    expected = ledger.resample("ME", on="Date")["RunningBalance"].last().dropna()
+    assert stats["mean"] == round(expected.mean(), 2)
+    assert stats["min"] == expected.min()
+    assert stats["max"] == expected.max()
+    assert stats["median"] == round(expected.median(), 2)
@@ -0,0 +1,83 @@
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline.column_utils import normalize_cols
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.processing import expense_pipeline, flag_row_quality
+
+
+def _wide_expenses(make_ledger, n, extra_columns=30, seed=0):
+    """Raw expense export columns plus float columns the stages pass through."""
+    extras = {f"extra_{i}": np.arange(n, dtype=float) + i for i in range(extra_columns)}
+    df = make_ledger(
+        n,
+        seed,
+        Description=["lunch", "2x to calculate", "fuel"],
+        Merchant=["Shop", "Venmo", "Gas"],
+        **extras,
+    )
+    return df.rename(columns={"Date": "Date of Purchase", "Payer": "Name"})
+
+
+@pytest.fixture(params=[False, True], ids=["eager", "copy_on_write"])
+def copy_on_write_mode(request):
+    with pd.option_context("mode.copy_on_write", request.param):
+        yield request.param
+
+
+@pytest.mark.usefixtures("copy_on_write_mode")
+def test_stages_leave_input_untouched_and_return_owned_frames(
+    make_ledger, quiet_logger
+):
+    df = _wide_expenses(make_ledger, 200)
+    df.loc[::7, "Date of Purchase"] = pd.NaT
+    original = df.copy()
+
+    result = expense_pipeline(df, AnalysisConfig(), {}, [], quiet_logger)
+    pd.testing.assert_frame_equal(df, original)
+
+    # Writes into the result must not reach the input, even for columns the
+    # pipeline passed through unchanged.
+    result.loc[result.index[0], "extra_0"] = -1.0
+    result.loc[result.index[0], "Merchant"] = "changed"
+    pd.testing.assert_frame_equal(df, original)
+
+    quality_input = result.drop(columns=["DataQualityFlag"])
+    flagged = flag_row_quality(quality_input, AnalysisConfig(), [], quiet_logger)
+    flagged.loc[flagged.index[0], "Description"] = "changed"
+    assert quality_input.loc[quality_input.index[0], "Description"] != "changed"
+
+    raw = pd.DataFrame({"Name": ["Ryan"], "Merchant": ["Shop"]})
+    normalized = normalize_cols(raw, "file.csv")
+    normalized.loc[0, "merchant"] = "changed"
+    assert raw.loc[0, "Merchant"] == "Shop"
+
+
+def test_expense_pipeline_peak_memory_under_twice_input(make_ledger, quiet_logger):
+    df = _wide_expenses(make_ledger, 50_000)
+    input_bytes = df.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        with pd.option_context("mode.copy_on_write", True):
+            expense_pipeline(df, AnalysisConfig(), {}, [], quiet_logger)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 2 * input_bytes
+
+
+def test_stages_run_off_the_main_thread_without_switching_copy_on_write():
+    raw = pd.DataFrame({"Merchant": ["Shop"], "Amount": [1.0]})
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        normalized = pool.submit(normalize_cols, raw, "file.csv").result()
+
+    assert pd.options.mode.copy_on_write is False
+    normalized.loc[0, "merchant"] = "changed"
+    assert raw.loc[0, "Merchant"] == "Shop"
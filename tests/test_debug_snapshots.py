@@ -0,0 +1,113 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from balance_pipeline import processing
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.debug_snapshots import DebugSnapshotWriter, SnapshotSpec
+from balance_pipeline.processing import expense_pipeline
+
+# Cells of several types, which Arrow cannot store as one column type
+MIXED = ["text", 1, 2.5]
+
+
+def test_snapshots_apply_stage_specs(tmp_path, make_ledger):
+    df = make_ledger(1000, Mixed=MIXED)
+    specs = {"projected": SnapshotSpec(columns=("Merchant", "ActualAmount", "Missing"))}
+    with DebugSnapshotWriter(
+        tmp_path, specs=specs, default=SnapshotSpec(sample_rows=100)
+    ) as snapshots:
+        snapshots.snapshot("sampled", df)
+        snapshots.snapshot("projected", df)
+        assert snapshots.snapshot("empty", df.iloc[:0]) is None
+        # The snapshot is taken at call time
+        df.loc[:, "ActualAmount"] = 0.0
+
+    assert sorted(p.name for p in snapshots.written) == [
+        "projected.parquet",
+        "sampled.parquet",
+    ]
+    sampled = pd.read_parquet(tmp_path / "sampled.parquet")
+    original = make_ledger(1000, Mixed=MIXED)
+    assert len(sampled) == 100 and sampled["Date"].is_monotonic_increasing
+    merged = sampled.merge(original, on="Date", suffixes=("", "_original"))
+    assert merged["ActualAmount"].equals(merged["ActualAmount_original"])
+    # Mixed-type columns are kept as text
+    assert set(sampled["Mixed"]) <= {"text", "1", "2.5"}
+
+    projected = pd.read_parquet(tmp_path / "projected.parquet")
+    assert projected.columns.tolist() == ["Merchant", "ActualAmount"]
+    assert len(projected) == 100
+
+
+def test_expense_pipeline_writes_parquet_snapshots(tmp_path, monkeypatch, quiet_logger):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame(
+        {
+            "Date of Purchase": pd.date_range("2024-01-01", periods=5),
+            "Name": ["Ryan", "Jordyn", "Ryan", "Jordyn", "Ryan"],
+            "ActualAmount": [10.0, 20.0, 30.0, 40.0, 50.0],
+            "AllowedAmount": [10.0, 10.0, 30.0, 0.0, 50.0],
+            "Description": ["lunch", "2x to calculate", "fuel", "", "venmo"],
+            "Merchant": ["Shop", "Shop", "Gas", "Shop", "Venmo"],
+        }
+    )
+    config = AnalysisConfig(debug_mode=True)
+
+    result = expense_pipeline(df, config, {}, [], quiet_logger)
+
+    names = sorted(p.name for p in (tmp_path / "debug_output").iterdir())
+    assert names == [
+        "03a_settlements_tagged.parquet",
+        "03b_two_x_applied.parquet",
+        "03c_duplicates_flagged.parquet",
+        "03d_quality_flagged.parquet",
+    ]
+    flagged = pd.read_parquet(tmp_path / "debug_output/03d_quality_flagged.parquet")
+    # Stage 4 output, before the settlement row is zeroed
+    assert flagged["AllowedAmount"].tolist() == [10.0, 40.0, 30.0, 0.0, 50.0]
+    assert result["AllowedAmount"].tolist() == [10.0, 40.0, 30.0, 0.0, 0.0]
+
+
+def test_snapshots_from_copy_on_write_stages_ignore_later_edits(
+    tmp_path, monkeypatch, make_ledger
+):
+    gate = threading.Event()
+    write = DebugSnapshotWriter._write
+    monkeypatch.setattr(
+        DebugSnapshotWriter,
+        "_write",
+        lambda self, stage, frame: gate.wait() and write(self, stage, frame),
+    )
+    df = make_ledger(50)
+    with DebugSnapshotWriter(tmp_path) as snapshots:
+        with pd.option_context("mode.copy_on_write", True):
+            snapshots.snapshot("stage", df)
+        # The caller writes in place before the snapshot reaches the disk
+        df.loc[:, "ActualAmount"] = 0.0
+        gate.set()
+
+    stored = pd.read_parquet(tmp_path / "stage.parquet")
+    assert stored["ActualAmount"].equals(make_ledger(50)["ActualAmount"])
+
+
+def test_expense_pipeline_closes_its_writer_when_a_stage_fails(
+    tmp_path, monkeypatch, make_ledger, quiet_logger
+):
+    monkeypatch.chdir(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("stage failed")
+
+    monkeypatch.setattr(processing, "detect_duplicates", fail)
+    df = make_ledger(20)
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        expense_pipeline(df, AnalysisConfig(debug_mode=True), {}, [], quiet_logger)
+
+    assert not any(t.name.startswith("debug-snapshots") for t in threading.enumerate())
+    assert sorted(p.name for p in (tmp_path / "debug_output").iterdir()) == [
+        "03a_settlements_tagged.parquet",
+        "03b_two_x_applied.parquet",
+    ]
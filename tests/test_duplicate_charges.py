@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline.analytics import duplicate_charge_pairs
+from balance_pipeline.gui_analysis import AnalysisController
+
+
+def _charges(n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "date": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 60, n), unit="D")
+            + pd.to_timedelta(rng.integers(0, 24, n), unit="h"),
+            "amount": rng.choice([-9.99, -10.0, -10.01, -25.0, 12.0], n),
+            "merchant_standardized": rng.choice(["Netflix", "Gym", None], n),
+            "description": [f"row {i}" for i in range(n)],
+        },
+        index=pd.RangeIndex(100, 100 + n),
+    )
+
+
+def _brute_force(df, days_window, tolerance):
+    pairs = set()
+    charges = df[(df["amount"] < 0) & df["merchant_standardized"].notna()]
+    for (i, a), (j, b) in itertools.combinations(charges.iterrows(), 2):
+        if b["date"] < a["date"]:
+            (i, a), (j, b) = (j, b), (i, a)
+        if (
+            a["merchant_standardized"] == b["merchant_standardized"]
+            and abs(abs(a["amount"]) - abs(b["amount"])) <= tolerance + 1e-9
+            and (b["date"] - a["date"]).days <= days_window
+        ):
+            pairs.add(frozenset((i, j)))
+    return pairs
+
+
+@pytest.mark.parametrize("days_window,tolerance", [(3, 0.0), (2, 0.02), (0, 0.0)])
+def test_all_pairs_match_brute_force(days_window, tolerance):
+    df = _charges()
+
+    pairs = duplicate_charge_pairs(df, days_window, amount_tolerance=tolerance)
+
+    found = {frozenset(p) for p in zip(pairs["index1"], pairs["index2"], strict=True)}
+    assert len(found) == len(pairs)
+    assert found == _brute_force(df, days_window, tolerance)
+    assert (pairs["days_apart"] <= days_window).all()
+    assert (pairs["date1"] <= pairs["date2"]).all()
+
+
+def test_gui_reports_non_adjacent_pairs():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-03-01", "2024-03-02", "2024-03-03"]),
+            "amount": [-15.0, -15.0, -15.0],
+            "merchant_standardized": "Spotify",
+            "description": ["a", "b", "c"],
+            "potential_refund": False,
+        }
+    )
+    controller = AnalysisController()
+    controller.df = df
+
+    duplicates = controller.find_duplicate_charges(3)
+
+    assert [(d["description1"], d["description2"]) for d in duplicates] == [
+        ("a", "b"),
+        ("a", "c"),
+        ("b", "c"),
+    ]
+    assert duplicates[1]["amount"] == -15.0 and duplicates[1]["days_apart"] == 2
+    assert controller.find_duplicate_charges(0) == []
@@ -0,0 +1,124 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.excel_streaming import (
+    DATE_FORMAT,
+    MONEY_FORMAT,
+    StreamingExcelWriter,
+    write_excel_streaming,
+)
+from balance_pipeline.outputs import generate_all_outputs
+
+
+def _report_rows(make_ledger, n, seed=0):
+    """Ledger columns of every cell type, with text that looks like formulas."""
+    df = make_ledger(
+        n,
+        seed,
+        freq="D",
+        Description=["=SUM(A1)", "http://example.com", "lunch"],
+        Count=np.arange(n) % 10,
+    )
+    return df[["Date", "Payer", "Description", "ActualAmount", "Count", "IsShared"]]
+
+
+def test_rows_formats_and_overflow_sheets(tmp_path, make_ledger):
+    df = _report_rows(make_ledger, 25)
+    df.loc[3, "ActualAmount"] = np.nan
+    df.loc[4, "Description"] = None
+    df["Odd"] = [["a"], float("inf")] + [1.5] * 23
+    path = tmp_path / "report.xlsx"
+
+    with StreamingExcelWriter(path, chunk_rows=4, max_rows=11) as writer:
+        names = writer.write_frame("A very long ledger sheet name here", df)
+        writer.write_frame("Empty", pd.DataFrame())
+
+    assert names == [
+        "A very long ledger sheet name h",
+        "A very long ledger sheet na (2)",
+        "A very long ledger sheet na (3)",
+    ]
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == [*names, "Empty"]
+    rows = [
+        row
+        for name in names
+        for row in list(workbook[name].iter_rows(values_only=True))[1:]
+    ]
+    header = next(workbook[names[0]].iter_rows(values_only=True))
+    assert list(header) == df.columns.tolist()
+    assert len(rows) == 25
+    assert [r[0].date() for r in rows] == df["Date"].dt.date.tolist()
+    assert rows[0][2] == df.loc[0, "Description"]  # Text, not a formula
+    assert rows[3][3] is None and rows[4][2] is None
+    assert rows[5][3] == df.loc[5, "ActualAmount"]
+    assert rows[5][5] == bool(df.loc[5, "IsShared"])
+    assert rows[0][6] == "['a']" and rows[1][6] == "inf" and rows[2][6] == 1.5
+    workbook.close()
+
+    sheet = load_workbook(path)[names[0]]
+    assert sheet["A2"].number_format == DATE_FORMAT
+    assert sheet["D2"].number_format == MONEY_FORMAT
+    assert sheet.freeze_panes == "A2"
+    assert sheet.column_dimensions["C"].width >= len("http://example.com")
+
+
+def test_excel_report_sheets(tmp_path, make_ledger, quiet_logger):
+    ledger = make_ledger(30, TransactionType="EXPENSE", RunningBalance=1.0)
+    outputs = generate_all_outputs(
+        master_ledger=ledger,
+        reconciliation_results={"reconciled": True, "amount_owed": 12.5},
+        analytics_results={},
+        risk_assessment={},
+        recommendations=["Settle up"],
+        visualizations={},
+        alt_texts={},
+        data_quality_issues=[],
+        config=AnalysisConfig(outputs=("excel",)),
+        output_dir_path_str=str(tmp_path),
+        logger_instance=quiet_logger,
+    )
+
+    report = pd.read_excel(outputs["excel_report"], sheet_name=None)
+    assert list(report) == [
+        "Executive Summary",
+        "Ledger Highlights",
+        "Reconciliation Details",
+        "Recommendations",
+        "Visual Index",
+    ]
+    assert len(report["Ledger Highlights"]) == 30
+    assert report["Recommendations"]["Recommendations"].tolist() == ["Settle up"]
+
+
+@pytest.mark.slow
+def test_benchmark_against_openpyxl(tmp_path, make_ledger):
+    df = _report_rows(make_ledger, 50_000, seed=1)
+
+    def measure(write):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            write()
+            return time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    seconds, peak = measure(
+        lambda: write_excel_streaming(df, tmp_path / "streaming.xlsx")
+    )
+    old_seconds, old_peak = measure(
+        lambda: df.to_excel(tmp_path / "openpyxl.xlsx", index=False, engine="openpyxl")
+    )
+
+    print(
+        f"\n50k rows: streaming {seconds:.2f}s / {peak / 1e6:.0f} MB, "
+        f"openpyxl {old_seconds:.2f}s / {old_peak / 1e6:.0f} MB"
+    )
+    assert peak * 5 < old_peak
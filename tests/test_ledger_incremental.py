@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.ledger import (
+    LedgerAggregates,
+    _generate_transaction_id,
+    append_to_master_ledger,
+    create_master_ledger,
+    load_master_ledger,
+    save_master_ledger,
+)
+from balance_pipeline.recon import (
+    triple_reconciliation,
+    triple_reconciliation_from_aggregates,
+)
+
+# pandas 3 turns these into errors
+pytestmark = pytest.mark.filterwarnings("error::FutureWarning")
+
+
+def _rows(n, kind, seed, start="2024-01-01", days=120):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+    amounts = rng.uniform(5, 250, n).round(2)
+    payers = rng.choice(["Ryan", "Jordyn"], n)
+    impact = np.where(payers == "Ryan", -0.57, 0.43) * amounts
+    return pd.DataFrame(
+        {
+            "Date": dates,
+            "TransactionType": kind,
+            "Payer": payers,
+            "Description": [f"{kind.lower()} {seed}-{i}" for i in range(n)],
+            "ActualAmount": amounts,
+            "AllowedAmount": amounts,
+            "IsShared": rng.random(n) > 0.2,
+            "RyanOwes": amounts * 0.43,
+            "JordynOwes": amounts * 0.57,
+            "BalanceImpact": impact.round(2),
+            "AuditNote": "FULLY SHARED | paid by Ryan | REASON: test",
+            "DataQualityFlag": "CLEAN",
+            "Merchant": "Store",
+        }
+    )
+
+
+def _balance_by_date(master):
+    return master.groupby("Date")["RunningBalance"].last()
+
+
+@pytest.fixture
+def config():
+    return AnalysisConfig()
+
+
+def test_append_matches_full_rebuild(config):
+    rent = _rows(4, "RENT", seed=1)
+    week1 = _rows(200, "EXPENSE", seed=2)
+    week2 = _rows(30, "EXPENSE", seed=3, start="2024-05-01", days=7)
+    expenses = pd.concat([week1, week2], ignore_index=True)
+
+    existing = create_master_ledger(rent, week1, config)
+    merged, aggregates = append_to_master_ledger(existing, rent, expenses, config)
+    full = create_master_ledger(rent, expenses, config)
+
+    assert len(merged) == len(full)
+    assert aggregates.row_count == len(full)
+    assert sorted(merged["TransactionID"]) == sorted(full["TransactionID"])
+    pd.testing.assert_series_equal(_balance_by_date(merged), _balance_by_date(full))
+    # Untouched history keeps its lineage index.
+    assert merged["DataLineage"].iloc[0] == existing["DataLineage"].iloc[0]
+
+
+def test_backdated_rows_resequence_suffix(config):
+    existing_rows = _rows(50, "EXPENSE", seed=4, start="2024-03-01", days=30)
+    backdated = _rows(5, "EXPENSE", seed=5, start="2024-03-10", days=2)
+    existing = create_master_ledger(pd.DataFrame(), existing_rows, config)
+
+    merged, _ = append_to_master_ledger(
+        existing,
+        pd.DataFrame(),
+        pd.concat([existing_rows, backdated], ignore_index=True),
+        config,
+    )
+    expected = create_master_ledger(
+        pd.DataFrame(), pd.concat([existing_rows, backdated]), config
+    )
+
+    assert merged["Date"].is_monotonic_increasing
+    pd.testing.assert_series_equal(_balance_by_date(merged), _balance_by_date(expected))
+
+
+def test_append_without_new_rows_is_noop(config):
+    expenses = _rows(20, "EXPENSE", seed=6)
+    existing = create_master_ledger(pd.DataFrame(), expenses, config)
+    aggregates = LedgerAggregates.from_ledger(existing)
+
+    merged, after = append_to_master_ledger(
+        existing, pd.DataFrame(), expenses, config, aggregates
+    )
+    assert merged is existing
+    assert after.row_count == len(existing)
+
+
+def test_aggregate_reconciliation_matches_full_scan(config):
+    master = create_master_ledger(
+        _rows(3, "RENT", seed=7), _rows(120, "EXPENSE", seed=8), config
+    )
+    full = triple_reconciliation(master, config)
+    fast = triple_reconciliation_from_aggregates(
+        LedgerAggregates.from_ledger(master), config
+    )
+
+    for key in ("m1", "m2", "m3", "total_shared_amount", "who_owes_whom"):
+        assert fast[key] == pytest.approx(full[key], abs=0.01)
+    by_category = {d["Category"]: d for d in full["category_details"]}
+    for detail in fast["category_details"]:
+        assert detail == pytest.approx(by_category[detail["Category"]], abs=0.01)
+
+
+def test_store_round_trip(tmp_path, config):
+    master = create_master_ledger(pd.DataFrame(), _rows(10, "EXPENSE", seed=9), config)
+    path = tmp_path / "ledger" / "master.parquet"
+    save_master_ledger(master, path, LedgerAggregates.from_ledger(master))
+
+    loaded, aggregates = load_master_ledger(path)
+    pd.testing.assert_frame_equal(loaded, master)
+    assert aggregates == LedgerAggregates.from_ledger(master)
+    assert load_master_ledger(tmp_path / "absent.parquet") is None
+
+
+def test_edits_to_stored_rows_flow_into_ledger_and_aggregates(config):
+    rent = _rows(3, "RENT", seed=10)
+    expenses = _rows(80, "EXPENSE", seed=11)
+    existing = create_master_ledger(rent, expenses, config)
+
+    edited = expenses.copy()
+    edited.loc[:9, "IsShared"] = ~edited.loc[:9, "IsShared"]  # New decisions
+    edited.loc[20, ["ActualAmount", "AllowedAmount"]] = 999.0  # Corrected amount
+    edited.loc[20, "BalanceImpact"] = -569.43
+    edited = edited.drop(index=30)  # Deleted upstream
+
+    merged, aggregates = append_to_master_ledger(
+        existing, rent, edited, config, LedgerAggregates.from_ledger(existing)
+    )
+    full = create_master_ledger(rent, edited, config)
+
+    assert sorted(merged["TransactionID"]) == sorted(full["TransactionID"])
+    shared = full.set_index("TransactionID")["IsShared"]
+    assert merged.set_index("TransactionID")["IsShared"].eq(shared).all()
+    pd.testing.assert_series_equal(_balance_by_date(merged), _balance_by_date(full))
+    assert aggregates.row_count == len(full)
+    assert aggregates.last_date == full["Date"].max().isoformat()
+
+    expected = triple_reconciliation(full, config)
+    fast = triple_reconciliation_from_aggregates(aggregates, config)
+    for key in ("m1", "m2", "m3", "total_shared_amount"):
+        assert fast[key] == pytest.approx(expected[key], abs=0.01)
+
+
+def test_partial_inputs_leave_earlier_history_alone(config):
+    history = _rows(60, "EXPENSE", seed=12)
+    week = _rows(10, "EXPENSE", seed=13, start="2024-06-01", days=7)
+    existing = create_master_ledger(pd.DataFrame(), history, config)
+
+    merged, aggregates = append_to_master_ledger(existing, pd.DataFrame(), week, config)
+
+    assert len(merged) == len(history) + len(week)
+    assert aggregates.row_count == len(merged)
+
+
+def test_partial_expenses_with_full_rent_keep_stored_expenses(config):
+    rent = _rows(12, "RENT", seed=14, days=365)
+    history = _rows(60, "EXPENSE", seed=15)
+    week = _rows(10, "EXPENSE", seed=16, start="2024-06-01", days=7)
+    existing = create_master_ledger(rent, history, config)
+
+    merged, aggregates = append_to_master_ledger(existing, rent, week, config)
+
+    assert len(merged) == len(rent) + len(history) + len(week)
+    assert aggregates.row_count == len(merged)
+    full = create_master_ledger(rent, pd.concat([history, week]), config)
+    assert sorted(merged["TransactionID"]) == sorted(full["TransactionID"])
+
+
+def test_transaction_ids_match_row_wise_ids(config):
+    rows = _rows(40, "EXPENSE", seed=17)
+    rows.loc[0, "Date"] = pd.NaT
+    rows.loc[1, "Payer"] = None
+    rows.loc[2, "Description"] = np.nan
+
+    master = create_master_ledger(pd.DataFrame(), rows, config)
+
+    expected = master.apply(_generate_transaction_id, axis=1)
+    assert master["TransactionID"].tolist() == expected.tolist()
@@ -0,0 +1,77 @@
+import pandas as pd
+
+from balance_pipeline.analytics import (
+    liquidity_strain_episodes,
+    liquidity_strain_points,
+)
+from balance_pipeline.config import AnalysisConfig
+
+
+def _ledger(balances, start="2024-01-01", step_days=10):
+    n = len(balances)
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range(start, periods=n, freq=f"{step_days}D"),
+            "RunningBalance": balances,
+            "TransactionID": [f"t{i}" for i in range(n)],
+            "Description": [f"row {i}" for i in range(n)],
+        }
+    )
+
+
+def test_strain_points_are_records_for_rows_beyond_threshold():
+    config = AnalysisConfig(LIQUIDITY_STRAIN_THRESHOLD=100.0)
+    ledger = _ledger([50.0, 150.456, -120.0, 90.0])
+
+    points = liquidity_strain_points(ledger, config)
+
+    assert points == [
+        {
+            "date": "2024-01-11",
+            "running_balance": 150.46,
+            "transaction_id": "t1",
+            "description": "row 1",
+        },
+        {
+            "date": "2024-01-21",
+            "running_balance": -120.0,
+            "transaction_id": "t2",
+            "description": "row 2",
+        },
+    ]
+    assert liquidity_strain_points(ledger.drop(columns="TransactionID"), config) == []
+
+
+def test_episodes_require_minimum_duration_and_split_on_sign():
+    config = AnalysisConfig(LIQUIDITY_STRAIN_THRESHOLD=100.0, LIQUIDITY_STRAIN_DAYS=30)
+    # Rows are 10 days apart: a 4-row Ryan episode closed by row 5 lasts 40 days,
+    # a 2-row Jordyn run lasts 20 days, and the final run is still open.
+    balances = [0, 200, 300, 250, 150, 0, -200, -150, 0, 500, 600, 700, 800]
+    episodes = liquidity_strain_episodes(_ledger(balances), config)
+
+    assert episodes == [
+        {
+            "start_date": "2024-01-11",
+            "end_date": "2024-02-20",
+            "duration_days": 40,
+            "transactions": 4,
+            "peak_balance": 300.0,
+            "direction": "Ryan owes Jordyn",
+            "ongoing": False,
+        },
+        {
+            "start_date": "2024-03-31",
+            "end_date": "2024-04-30",
+            "duration_days": 30,
+            "transactions": 4,
+            "peak_balance": 800.0,
+            "direction": "Ryan owes Jordyn",
+            "ongoing": True,
+        },
+    ]
+
+
+def test_episodes_empty_without_strain():
+    config = AnalysisConfig(LIQUIDITY_STRAIN_THRESHOLD=100.0)
+    assert liquidity_strain_episodes(_ledger([0.0, 50.0, -20.0]), config) == []
+    assert liquidity_strain_episodes(_ledger([]), config) == []
@@ -0,0 +1,92 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.outputs import (
+    OutputJob,
+    _write_csv,
+    _write_excel_report,
+    generate_all_outputs,
+    run_output_jobs,
+)
+
+
+def _meet_then_write(path, barrier):
+    # Only passes once every slow job is running at the same time
+    barrier.wait()
+    path.write_text("done")
+    return path
+
+
+def _fail(path):
+    raise OSError(f"disk full writing {path.name}")
+
+
+def test_jobs_run_concurrently_and_survive_failures(tmp_path, quiet_logger):
+    barrier = threading.Barrier(3, timeout=10)
+    jobs = [
+        OutputJob(f"slow_{i}", _meet_then_write, (tmp_path / f"{i}.txt", barrier))
+        for i in range(3)
+    ]
+    jobs.insert(1, OutputJob("broken", _fail, (tmp_path / "broken.txt",)))
+
+    paths, timings = run_output_jobs(jobs, logger_instance=quiet_logger)
+
+    # Run one after another, the first job would break the barrier and fail
+    assert not barrier.broken
+    assert list(paths) == ["slow_0", "slow_1", "slow_2"]
+    assert all(Path(p).read_text() == "done" for p in paths.values())
+    assert set(timings) == set(paths)
+
+
+def test_cpu_bound_jobs_in_processes(tmp_path, make_ledger, quiet_logger):
+    ledger = make_ledger(40)
+    jobs = [
+        OutputJob(
+            "excel",
+            _write_excel_report,
+            ([("Ledger", ledger)], tmp_path / "report.xlsx"),
+            cpu_bound=True,
+        ),
+        OutputJob("csv", _write_csv, (ledger, tmp_path / "ledger.csv", ["Payer"])),
+    ]
+
+    paths, _ = run_output_jobs(jobs, use_processes=True, logger_instance=quiet_logger)
+
+    assert pd.read_excel(paths["excel"]).shape == ledger.shape
+    assert pd.read_csv(paths["csv"]).columns.tolist() == ["Payer"]
+
+
+def test_generate_all_outputs_reports_timings(tmp_path, make_ledger, quiet_logger):
+    timings = {}
+    outputs = generate_all_outputs(
+        master_ledger=make_ledger(40),
+        reconciliation_results={"reconciled": True, "amount_owed": 12.5},
+        analytics_results={},
+        risk_assessment={"overall_risk_level": "LOW"},
+        recommendations=["Settle up"],
+        visualizations={},
+        alt_texts={},
+        data_quality_issues=[{"flags": ["X"], "row_data_sample": {"a": 1}}],
+        config=AnalysisConfig(outputs=("all",)),
+        output_dir_path_str=str(tmp_path),
+        logger_instance=quiet_logger,
+        output_timings=timings,
+    )
+
+    assert list(outputs) == [
+        "master_ledger_csv",
+        "reconciliation_detail_csv",
+        "executive_summary_csv",
+        "alt_texts_json",
+        "data_quality_log_csv",
+        "excel_report",
+        "dashboard_html",
+        "executive_pdf",
+    ]
+    assert set(timings) == set(outputs)
+    assert all(Path(p).exists() for p in outputs.values())
+    recon = pd.read_csv(outputs["reconciliation_detail_csv"])
+    assert "Cumulative_Balance_Display" in recon.columns
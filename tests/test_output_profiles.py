@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from balance_pipeline.output_profiles import (
+    ALL_OUTPUTS,
+    parse_outputs,
+    resolve_output_plan,
+)
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def test_default_plan_is_full():
+    plan = resolve_output_plan()
+    assert plan.is_full
+    assert plan.needs("visualizations")
+    assert plan.needs("recommendations")
+
+
+def test_recon_only_plan_skips_heavy_stages():
+    plan = resolve_output_plan("recon,ledger-csv")
+    assert plan.outputs == {"recon", "ledger-csv"}
+    assert plan.stages == {"master_ledger", "reconciliation"}
+    assert not plan.needs("visualizations")
+    assert not plan.wants("pdf")
+
+
+def test_pdf_pulls_in_transitive_stages():
+    plan = resolve_output_plan(["pdf"])
+    assert {"analytics", "risk", "recommendations", "visualizations"} <= plan.stages
+
+
+def test_profiles_expand_and_dedupe():
+    assert parse_outputs("nightly,recon") == ("recon", "ledger-csv")
+    assert parse_outputs("all") == ALL_OUTPUTS
+    assert parse_outputs(" Ledger_CSV ") == ("ledger-csv",)
+
+
+def test_unknown_output_raises():
+    with pytest.raises(ValueError, match="Unknown output"):
+        parse_outputs("recon,charts2")
+
+
+def test_heavy_libraries_not_imported_at_module_load(tmp_path):
+    code = (
+        "import sys\n"
+        "import balance_pipeline.analyzer, balance_pipeline.outputs\n"
+        "import balance_pipeline.analytics\n"
+        "heavy = ('matplotlib', 'plotly', 'reportlab', 'scipy')\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    # Fixed argv: this interpreter running a literal snippet, no shell
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
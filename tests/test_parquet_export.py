@@ -0,0 +1,116 @@
+import sys
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from balance_pipeline.export import (
+    PARQUET_SCHEMA_VERSION,
+    ParquetOptions,
+    read_export_metadata,
+    read_parquet_range,
+    txnid_fingerprint,
+    write_parquet,
+    write_parquet_duckdb,
+)
+from balance_pipeline.gui_analysis import AnalysisController
+
+
+def _transactions(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "TxnID": [f"t{i}" for i in range(n)],
+            "Date": pd.Timestamp("2023-01-01")
+            + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+            "Owner": rng.choice(["Ryan", "Jordyn"], n),
+            "Amount": rng.normal(-40, 60, n).round(2),
+        }
+    )
+
+
+def test_sorted_row_groups_with_metadata(tmp_path):
+    df = _transactions()
+    options = ParquetOptions(row_group_size=500)
+
+    path = write_parquet(df, tmp_path / "txns.parquet", options)
+
+    metadata = pq.read_metadata(path)
+    assert metadata.num_row_groups == 10
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    written = pd.read_parquet(path)
+    expected = df.sort_values(["Date", "Owner"], kind="stable", ignore_index=True)
+    pd.testing.assert_frame_equal(written, expected)
+    assert read_export_metadata(path) == {
+        "schema_version": PARQUET_SCHEMA_VERSION,
+        "sort_keys": "Date,Owner",
+        "row_count": "5000",
+        "txnid_fingerprint": txnid_fingerprint(df.sample(frac=1, random_state=1)),
+    }
+
+
+def test_range_read_skips_row_groups(tmp_path, monkeypatch):
+    df = _transactions()
+    path = write_parquet(
+        df, tmp_path / "txns.parquet", ParquetOptions(row_group_size=500)
+    )
+    read_groups = []
+    original = pq.ParquetFile.read_row_groups
+
+    def spy(self, groups, *args, **kwargs):
+        read_groups.extend(groups)
+        return original(self, groups, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "read_row_groups", spy)
+
+    window = read_parquet_range(path, "2023-03-01", "2023-03-31", columns=["Amount"])
+
+    in_window = df[df["Date"].between("2023-03-01", "2023-03-31")]
+    assert window.columns.tolist() == ["Amount"]
+    assert sorted(window["Amount"]) == sorted(in_window["Amount"])
+    assert 0 < len(read_groups) <= 2
+    assert (
+        len(read_parquet_range(path, start="2024-12-01"))
+        == (df["Date"] >= "2024-12-01").sum()
+    )
+
+
+def test_duckdb_writer_sorts_and_tags(tmp_path):
+    df = _transactions(1000)
+    path = tmp_path / "duck.parquet"
+
+    write_parquet_duckdb(df, path, ParquetOptions(row_group_size=200))
+
+    written = pd.read_parquet(path)
+    assert written["Date"].is_monotonic_increasing
+    assert read_export_metadata(path)["txnid_fingerprint"] == txnid_fingerprint(df)
+
+
+def test_duckdb_fallback_raises_when_nothing_is_written(tmp_path, monkeypatch):
+    # Without PyArrow, write_parquet goes through DuckDB
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    df = _transactions(100)
+
+    path = write_parquet(df, tmp_path / "fallback.parquet")
+    # The path is the test's own tmp file
+    count = duckdb.sql(f"SELECT count(*) FROM '{path}'").fetchone()[0]  # noqa: S608
+    assert count == len(df)
+    with pytest.raises(duckdb.Error):
+        write_parquet(df, tmp_path / "missing" / "out.parquet")
+    assert not (tmp_path / "missing").exists()
+
+
+def test_gui_loads_date_window(tmp_path):
+    df = _transactions(1000).rename(columns={"Date": "date", "Amount": "amount"})
+    df = df.assign(
+        merchant_standardized="Shop", description="x", potential_refund=False
+    )
+    write_parquet(df, tmp_path / "cleaned.parquet", ParquetOptions(sort_keys=("date",)))
+    controller = AnalysisController(tmp_path)
+
+    controller.load_data(start="2024-01-01", end="2024-01-31")
+
+    assert len(controller.df) == df["date"].between("2024-01-01", "2024-01-31").sum()
+    assert controller.df["date"].between("2024-01-01", "2024-01-31").all()
@@ -0,0 +1,92 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from balance_pipeline.main import save_output
+from balance_pipeline.powerbi import (
+    FACT_TABLE,
+    NULL_PARTITION,
+    UNKNOWN_KEY,
+    write_powerbi_dataset,
+)
+
+
+def _transactions():
+    return pd.DataFrame(
+        {
+            "TxnID": ["a", "b", "c", "d", "e"],
+            "Owner": ["Ryan", "Jordyn", "Ryan", "Ryan", "Jordyn"],
+            "Date": pd.to_datetime(
+                ["2024-01-05", "2024-01-20", "2024-02-01", None, "2024-03-09"]
+            ),
+            "Amount": [-10.0, -25.5, 100.0, -3.0, -7.25],
+            "Merchant": ["Shop", "Gas", "Employer", None, "Shop"],
+            "Description": ["lunch", "fuel", "pay", "fee", "snacks"],
+            "Category": ["Food", "Auto", "Income", "Fees", "Food"],
+            "Account": ["Checking", "Visa", "Checking", "Visa", "Visa"],
+            "Notes": [None, None, "bonus", None, None],
+        }
+    )
+
+
+def _read_fact(root):
+    parts = sorted((root / FACT_TABLE).rglob("*.parquet"))
+    return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+
+def test_star_schema_round_trip(tmp_path):
+    df = _transactions()
+
+    export = write_powerbi_dataset(df, tmp_path)
+
+    assert export.written == [
+        f"{FACT_TABLE}/year={NULL_PARTITION}/month={NULL_PARTITION}/part-0.parquet",
+        f"{FACT_TABLE}/year=2024/month=01/part-0.parquet",
+        f"{FACT_TABLE}/year=2024/month=02/part-0.parquet",
+        f"{FACT_TABLE}/year=2024/month=03/part-0.parquet",
+    ]
+    assert export.dimensions == {"merchant": 4, "account": 3, "owner": 3, "category": 5}
+
+    fact = _read_fact(tmp_path)
+    assert "Merchant" not in fact.columns and fact["merchant_key"].dtype == "int32"
+    merchants = pd.read_parquet(tmp_path / "dim_merchant.parquet")
+    joined = fact.merge(merchants, on="merchant_key").set_index("TxnID")
+    expected = df.set_index("TxnID")["Merchant"].fillna("(Unknown)")
+    assert joined["Merchant"].sort_index().tolist() == expected.sort_index().tolist()
+    assert fact.loc[fact["TxnID"] == "d", "merchant_key"].item() == UNKNOWN_KEY
+
+    # One Arrow schema across partitions, with dictionary-encoded text
+    schemas = {
+        pq.read_schema(p).remove_metadata()
+        for p in (tmp_path / FACT_TABLE).rglob("*.parquet")
+    }
+    assert len(schemas) == 1
+    parquet_file = pq.ParquetFile(next((tmp_path / FACT_TABLE).rglob("*.parquet")))
+    encodings = parquet_file.metadata.row_group(0).column(0).encodings
+    assert "RLE_DICTIONARY" in encodings
+    assert parquet_file.metadata.row_group(0).column(0).compression == "ZSTD"
+
+
+def test_reexport_rewrites_only_changed_partitions(tmp_path):
+    write_powerbi_dataset(_transactions(), tmp_path)
+    keys_before = pd.read_parquet(tmp_path / "dim_merchant.parquet")
+
+    changed = _transactions()
+    changed.loc[1, "Merchant"] = "Cafe"  # January changes
+    changed = changed[changed["TxnID"] != "e"]  # March disappears
+    export = write_powerbi_dataset(changed, tmp_path)
+
+    assert export.written == [f"{FACT_TABLE}/year=2024/month=01/part-0.parquet"]
+    assert len(export.unchanged) == 2
+    assert export.removed == [f"{FACT_TABLE}/year=2024/month=03/part-0.parquet"]
+    assert not (tmp_path / FACT_TABLE / "year=2024" / "month=03").exists()
+    keys_after = pd.read_parquet(tmp_path / "dim_merchant.parquet")
+    # Existing members keep their keys; the new one is appended
+    pd.testing.assert_frame_equal(keys_after.head(len(keys_before)), keys_before)
+    assert keys_after["Merchant"].iloc[-1] == "Cafe"
+    assert len(_read_fact(tmp_path)) == 4
+
+
+def test_save_output_powerbi(tmp_path):
+    save_output(_transactions(), str(tmp_path / "powerbi"), "powerbi")
+    assert (tmp_path / "powerbi" / "manifest.json").exists()
+    assert (tmp_path / "powerbi" / "dim_owner.parquet").exists()
@@ -0,0 +1,119 @@
+import io
+
+import pandas as pd
+import pytest
+
+from balance_pipeline.export import ParquetOptions, write_parquet
+from balance_pipeline.main import query_command
+from balance_pipeline.powerbi import write_powerbi_dataset
+from balance_pipeline.query import TransactionQuery, query_transactions
+from balance_pipeline.store import TransactionStore
+
+
+def _transactions():
+    return pd.DataFrame(
+        {
+            "TxnID": [f"t{i}" for i in range(6)],
+            "Date": pd.to_datetime(
+                [
+                    "2023-11-02",
+                    "2023-12-24",
+                    "2024-01-05",
+                    "2024-01-20",
+                    "2024-02-01",
+                    "2024-03-09",
+                ]
+            ),
+            "Merchant": ["Amazon", "Target", "AMAZON MKTP", "Gas", "Amazon", "Cafe"],
+            "Amount": [-120.0, -15.0, -250.0, -40.0, 300.0, -8.5],
+            "potential_refund": [False, False, True, False, True, False],
+        }
+    )
+
+
+def test_sql_over_parquet_file(tmp_path):
+    path = write_parquet(_transactions(), tmp_path / "txns.parquet")
+
+    totals = query_transactions(
+        path,
+        "SELECT Merchant, sum(Amount) AS total FROM transactions "
+        "WHERE Amount < ? GROUP BY Merchant ORDER BY total",
+        [-20],
+    )
+
+    assert totals.to_dict("list") == {
+        "Merchant": ["AMAZON MKTP", "Amazon", "Gas"],
+        "total": [-250.0, -120.0, -40.0],
+    }
+
+
+def test_search_filters_and_stream(tmp_path):
+    df = _transactions()
+    write_parquet(df, tmp_path / "txns.parquet", ParquetOptions(row_group_size=2))
+
+    with TransactionQuery(tmp_path) as query:
+        found = query.search(
+            start="2023-12-01", merchant="amazon", min_amount=100, columns=["TxnID"]
+        )
+        disputes = query.search(only_disputes=True, limit=1)
+        chunks = list(query.stream("SELECT * FROM transactions", chunk_rows=1))
+
+    assert found["TxnID"].tolist() == ["t4", "t2"]
+    assert disputes["TxnID"].tolist() == ["t4"]
+    assert sum(len(c) for c in chunks) == len(df)
+    with pytest.raises(FileNotFoundError):
+        TransactionQuery(tmp_path / "missing")
+
+
+def test_partitioned_dataset_and_store(tmp_path):
+    write_powerbi_dataset(_transactions(), tmp_path / "pbi")
+    with TransactionQuery(tmp_path / "pbi" / "fact_transactions") as query:
+        months = query.execute(
+            "SELECT year, count(*) AS n FROM transactions GROUP BY year ORDER BY year"
+        )
+    assert months.to_dict("list") == {"year": [2023, 2024], "n": [2, 4]}
+
+    with TransactionStore(tmp_path / "balance.duckdb") as store:
+        store.upsert_transactions(_transactions())
+    result = query_transactions(
+        tmp_path / "balance.duckdb", "SELECT count(*) AS n FROM transactions"
+    )
+    assert result["n"].item() == 6
+
+
+def test_query_command_outputs(tmp_path, capsys):
+    write_parquet(_transactions(), tmp_path / "txns.parquet")
+
+    query_command(str(tmp_path), merchant="amazon", chunk_rows=1)
+    query_command(
+        str(tmp_path),
+        "SELECT TxnID FROM transactions WHERE Amount > 0",
+        output_path=str(tmp_path / "out" / "pos.parquet"),
+        output_format="parquet",
+    )
+
+    printed = pd.read_csv(io.StringIO(capsys.readouterr().out))
+    assert printed["TxnID"].tolist() == ["t4", "t2", "t0"]
+    assert pd.read_parquet(tmp_path / "out" / "pos.parquet")["TxnID"].tolist() == ["t4"]
+    with pytest.raises(SystemExit):
+        query_command(str(tmp_path), "SELECT nope FROM transactions")
+
+
+def test_query_command_rejects_filters_with_sql(tmp_path, caplog):
+    write_parquet(_transactions(), tmp_path / "txns.parquet")
+    sql = "SELECT TxnID FROM transactions ORDER BY TxnID"
+
+    with pytest.raises(SystemExit):
+        query_command(str(tmp_path), sql, merchant="amazon", min_amount=10.0)
+    assert "--merchant, --min-amount cannot be combined with SQL" in caplog.text
+
+    query_command(
+        str(tmp_path),
+        sql,
+        output_path=str(tmp_path / "out.csv"),
+        output_format="csv",
+        only_disputes=False,
+    )
+    assert pd.read_csv(tmp_path / "out.csv")["TxnID"].tolist() == [
+        f"t{i}" for i in range(6)
+    ]
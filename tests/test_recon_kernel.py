@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+
+from balance_pipeline.config import AnalysisConfig
+from balance_pipeline.recon import (
+    calc_m2_fair_share,
+    calc_m3_category_sum,
+    m2_from_totals,
+    m3_from_totals,
+    shared_totals,
+    triple_reconciliation,
+)
+
+# Payer spellings the kernel folds together and a third transaction type
+MIXED_ROWS = {
+    "TransactionType": ["RENT", "EXPENSE", "TRANSFER"],
+    "Payer": ["Ryan", "ryan", "JORDYN", "Jordyn", "Other"],
+}
+
+
+def _per_type_loop(df, config):
+    """The filter-per-type M2/M3 computation the kernel replaces."""
+    shared = df[df["IsShared"].eq(True)]
+    payers = shared["Payer"].str.lower()
+    total = shared["AllowedAmount"].sum()
+    m2 = shared.loc[payers == "ryan", "AllowedAmount"].sum() - total * config.RYAN_PCT
+    m3, details = 0.0, []
+    for trans_type in shared["TransactionType"].unique():
+        rows = shared[shared["TransactionType"] == trans_type]
+        rows_payer = rows["Payer"].str.lower()
+        type_total = rows["AllowedAmount"].sum()
+        variance = (
+            rows.loc[rows_payer == "ryan", "AllowedAmount"].sum()
+            - type_total * config.RYAN_PCT
+        )
+        m3 += variance
+        details.append((trans_type, round(type_total, 2), round(variance, 2)))
+    return m2, m3, details
+
+
+def test_shared_totals_groups_by_type_and_lowercased_payer():
+    df = pd.DataFrame(
+        {
+            "TransactionType": ["EXPENSE", "RENT", "EXPENSE", "EXPENSE", None],
+            "Payer": ["Ryan", "Jordyn", "ryan", "Jordyn", "Ryan"],
+            "IsShared": [True, True, True, False, True],
+            "AllowedAmount": [10.0, 2000.0, 5.0, 99.0, 1.0],
+        }
+    )
+    totals = shared_totals(df)
+
+    assert totals.index[:2].tolist() == ["EXPENSE", "RENT"]
+    assert totals.loc["EXPENSE"].to_dict() == {
+        "total": 15.0,
+        "ryan": 15.0,
+        "jordyn": 0.0,
+    }
+    # The untyped row counts towards the totals but is not a category
+    assert totals["total"].sum() == 2016.0
+    details = calc_m3_category_sum(df, AnalysisConfig(), totals)["category_details"]
+    assert [d["Category"] for d in details] == ["EXPENSE", "RENT"]
+    only_rent = calc_m3_category_sum(df, AnalysisConfig(), totals, ["RENT", "OTHER"])
+    assert [d["Category"] for d in only_rent["category_details"]] == ["RENT"]
+
+
+def test_kernel_matches_per_type_loop(make_ledger, quiet_logger):
+    config = AnalysisConfig()
+    df = make_ledger(20_000, seed=1, **MIXED_ROWS)
+    m2, m3, details = _per_type_loop(df, config)
+
+    result = triple_reconciliation(df, config, quiet_logger)
+
+    assert result["m2"] == round(m2, 2)
+    assert result["m3"] == round(m3, 2)
+    assert [
+        (d["Category"], d["TotalShared"], d["RyanVarianceForCategory"])
+        for d in result["category_details"]
+    ] == details
+
+
+def test_totals_entry_points_need_no_transaction_rows(make_ledger):
+    config = AnalysisConfig()
+    df = make_ledger(2_000, seed=3, **MIXED_ROWS)
+    totals = shared_totals(df)
+
+    assert m2_from_totals(totals, config) == calc_m2_fair_share(df, config)
+    assert m3_from_totals(totals, config) == calc_m3_category_sum(df, config)
+    empty = shared_totals(pd.DataFrame())
+    assert m2_from_totals(empty, config)["variance"] == 0.0
+    assert m3_from_totals(empty, config) == {"variance": 0.0, "category_details": []}
+
+
+@pytest.mark.slow
+def test_kernel_matches_loop_on_one_million_rows(make_ledger, quiet_logger):
+    config = AnalysisConfig()
+    df = make_ledger(1_000_000, seed=2, **MIXED_ROWS)
+
+    m2, m3, _ = _per_type_loop(df, config)
+    totals = shared_totals(df)
+    result = triple_reconciliation(df, config, quiet_logger)
+
+    assert len(totals) == 3
+    assert result["m2"] == pytest.approx(round(m2, 2), abs=0.01)
+    assert result["m3"] == pytest.approx(round(m3, 2), abs=0.01)
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from balance_pipeline.run_cache import RunCache, config_fingerprint, file_fingerprint
+
+
+@dataclass
+class _Config:
+    RYAN_PCT: float = 0.43
+    outputs: tuple[str, ...] = ("all",)
+
+
+def test_file_fingerprint_tracks_content(tmp_path):
+    path = tmp_path / "expenses.csv"
+    path.write_text("Date,Amount\n2024-01-01,10\n")
+    first = file_fingerprint(path)
+    assert first == file_fingerprint(path)
+
+    path.write_text("Date,Amount\n2024-01-01,11\n")
+    assert file_fingerprint(path) != first
+    assert file_fingerprint(tmp_path / "absent.csv") == "missing"
+
+
+def test_config_fingerprint_honours_exclusions():
+    base = config_fingerprint(_Config())
+    assert config_fingerprint(_Config(RYAN_PCT=0.5)) != base
+    assert config_fingerprint(
+        _Config(outputs=("recon",)), exclude=("outputs",)
+    ) == config_fingerprint(_Config(), exclude=("outputs",))
+
+
+def test_stage_round_trip_with_issues(tmp_path):
+    cache = RunCache(tmp_path)
+    key = RunCache.key("a", "b")
+    df = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "BalanceImpact": [1.5, -2.0],
+            "Payer": ["Ryan", "Jordyn"],
+        }
+    )
+    issues = [{"issue_type": "OUTLIER", "row_data_sample": {"Date": df["Date"][0]}}]
+
+    assert cache.load_stage("expense", key) is None
+    cache.save_stage("expense", key, df, issues)
+    loaded, loaded_issues = cache.load_stage("expense", key)
+    assert_frame_equal(loaded, df)
+    assert loaded_issues[0]["issue_type"] == "OUTLIER"
+
+
+def test_results_round_trip_converts_numpy_and_timestamp_keys(tmp_path):
+    cache = RunCache(tmp_path)
+    results = {
+        "reconciliation": {"amount_owed": np.float64(12.5), "rows": np.int64(3)},
+        "monthly": {pd.Timestamp("2024-01-31"): 10.0},
+    }
+    cache.save_results("k", results)
+    loaded = cache.load_results("k")
+    assert loaded["reconciliation"] == {"amount_owed": 12.5, "rows": 3}
+    assert loaded["monthly"] == {"2024-01-31T00:00:00": 10.0}
+    assert cache.load_results("other") is None
+
+
+def test_keys_depend_on_every_part():
+    assert RunCache.key("a", "b") != RunCache.key("b", "a")
+    assert RunCache.key("ab") != RunCache.key("a", "b")
+
+
+def test_results_are_stale_once_an_output_is_overwritten(tmp_path):
+    cache = RunCache(tmp_path / "cache")
+    ledger = tmp_path / "master_ledger.csv"
+    ledger.write_text("run x\n")
+    cache.save_results("x", {"output_paths": {"master_ledger": str(ledger)}})
+    assert cache.load_results("x")["output_paths"]["master_ledger"] == str(ledger)
+
+    # Another run with different inputs writes to the same fixed path
+    ledger.write_text("run y\n")
+    assert cache.load_results("x") is None
+
+    ledger.write_text("run x\n")
+    assert cache.load_results("x") is not None
+    ledger.unlink()
+    assert cache.load_results("x") is None
@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+from balance_pipeline import main
+from balance_pipeline.store import REVIEWED_VIEW, TransactionStore, UpsertResult
+
+
+def _transactions(ids, amount=-10.0):
+    return pd.DataFrame(
+        {
+            "TxnID": ids,
+            "Date": pd.date_range("2024-01-01", periods=len(ids), freq="7D"),
+            "Owner": "Ryan",
+            "Amount": amount,
+            "SharedFlag": "?",
+        }
+    )
+
+
+def test_upsert_inserts_and_updates(tmp_path):
+    with TransactionStore(tmp_path / "balance.duckdb") as store:
+        first = store.upsert_transactions(_transactions(["a", "b", "c"]))
+        second = store.upsert_transactions(
+            pd.concat(
+                [
+                    _transactions(["c", "d"], amount=-99.0),
+                    pd.DataFrame({"TxnID": [None], "Amount": [1.0]}),
+                ]
+            ).assign(Note="edited")
+        )
+        # A partial frame only touches the columns it carries
+        store.upsert_transactions(pd.DataFrame({"TxnID": ["a"], "Amount": [5.0]}))
+        stored = store.read().set_index("TxnID").sort_index()
+
+    assert first == UpsertResult(inserted=3, updated=0)
+    assert second == UpsertResult(inserted=1, updated=1, skipped=1)
+    assert stored["Amount"].to_dict() == {"a": 5.0, "b": -10.0, "c": -99.0, "d": -99.0}
+    assert stored.loc["a", "Owner"] == "Ryan"
+    assert stored["Note"].isna().tolist() == [True, True, False, False]
+
+
+def test_loads_with_different_null_patterns(tmp_path):
+    first = _transactions(["a", "b"]).assign(
+        Note=[None, None], Category=[float("nan")] * 2, SplitPercent=[None, None]
+    )
+    second = _transactions(["c"]).assign(
+        Note=["checked"], Category=["Groceries"], SplitPercent=[50.0]
+    )
+    # A column first typed from numbers widens when text arrives
+    third = _transactions(["d"]).assign(Owner=[7])
+    fourth = _transactions(["e"]).assign(Owner=["Jordyn"], Note=[3.5])
+
+    with TransactionStore(tmp_path / "balance.duckdb") as store:
+        for frame in (first, second):
+            store.upsert_transactions(frame)
+        types = store.column_types()
+        store.upsert_transactions(pd.DataFrame({"TxnID": ["x"], "Rank": [1]}))
+        store.upsert_transactions(pd.DataFrame({"TxnID": ["y"], "Rank": ["top"]}))
+        for frame in (third, fourth):
+            store.upsert_transactions(frame)
+        stored = store.read().set_index("TxnID")
+
+    assert types["Note"] == types["Category"] == "VARCHAR"
+    assert types["SplitPercent"] == "DOUBLE"
+    assert stored.loc["c", "Note"] == "checked"
+    assert stored.loc["c", "Category"] == "Groceries"
+    assert stored.loc["c", "SplitPercent"] == 50.0
+    assert stored["Rank"].dropna().to_dict() == {"x": "1", "y": "top"}
+    assert stored.loc["e", "Owner"] == "Jordyn"
+    assert stored.loc["e", "Note"] == "3.5"
+
+
+def test_review_decisions_survive_reimport(tmp_path):
+    path = tmp_path / "balance.duckdb"
+    with TransactionStore(path) as store:
+        store.upsert_transactions(_transactions(["a", "b"]))
+        recorded = store.record_review_queue(
+            pd.DataFrame(
+                {
+                    "TxnID": ["a", "b"],
+                    "Set Shared? (Y/N/S for Split)": ["S", "maybe"],
+                    "Set Split % (0-100)": [25, None],
+                }
+            )
+        )
+        store.upsert_transactions(_transactions(["a", "b"], amount=-12.0))
+
+    with TransactionStore(path, read_only=True) as store:
+        reviewed = store.read().set_index("TxnID")
+
+    assert recorded == 1
+    assert reviewed.loc["a", "SharedFlag"] == "S"
+    assert reviewed.loc["a", "SplitPercent"] == 25.0
+    assert reviewed.loc["b", "SharedFlag"] == "?"
+    assert reviewed["Amount"].tolist() == [-12.0, -12.0]
+
+
+def test_read_date_window(tmp_path):
+    with TransactionStore(tmp_path / "balance.duckdb") as store:
+        assert store.read().empty
+        store.upsert_transactions(_transactions(list("abcdef")))
+        window = store.read("2024-01-08", "2024-01-22", columns=["TxnID"])
+        assert store.count(REVIEWED_VIEW) == 6
+
+    assert window["TxnID"].tolist() == ["b", "c", "d"]
+
+
+def test_process_and_export_through_store(tmp_path, monkeypatch):
+    class FakePipeline:
+        def __init__(self, debug_mode=False):
+            pass
+
+        def process_files(self, file_paths, **kwargs):
+            return _transactions(["a", "b"])
+
+    csv_file = tmp_path / "statement.csv"
+    csv_file.write_text("x\n1\n")
+    store_path = tmp_path / "balance.duckdb"
+    monkeypatch.setattr(main, "UnifiedPipeline", FakePipeline)
+
+    main.process_files_command([str(csv_file)], store_path=str(store_path))
+    main.process_files_command([str(csv_file)], store_path=str(store_path))
+    main.export_store_command(str(store_path), str(tmp_path / "out.csv"), "csv")
+
+    exported = pd.read_csv(tmp_path / "out.csv")
+    assert exported["TxnID"].tolist() == ["a", "b"]
+    with pytest.raises(SystemExit):
+        main.export_store_command(str(tmp_path / "missing.duckdb"))
@@ -7,6 +7,7 @@ from balance_pipeline.sync import (
     TRANS_SHARED_FLAG_COL,
     TRANS_SPLIT_PERC_COL,
     TRANS_TXNID_COL,
+    ReviewSyncEngine,
     sync_review_decisions,
 )
 from pandas.testing import assert_frame_equal
@@ -311,3 +312,61 @@ def test_sync_empty_decision_in_queue_is_ignored():
     assert_frame_equal(
         result_tx1_tx2.reset_index(drop=True), original_tx1_tx2.reset_index(drop=True)
     )
+
+
+def test_engine_applies_only_changed_decisions(caplog):
+    df_trans = sample_transactions_df()
+    engine = ReviewSyncEngine(df_trans)
+    df_queue = sample_queue_df()
+
+    assert engine.sync(df_queue) == 3  # TX1, TX2, TX3; TX5 invalid, TX_UNKNOWN absent
+    assert df_trans[TRANS_SHARED_FLAG_COL].tolist() == ["Y", "N", "S", "Y", "?"]
+    assert df_trans[TRANS_SPLIT_PERC_COL].iloc[2] == 60.5
+
+    caplog.clear()
+    assert engine.sync(df_queue) == 0
+    assert "invalid decision value" not in caplog.text.lower()
+
+    df_queue.loc[2, QUEUE_SPLIT_COL] = "25"
+    df_queue.loc[4, QUEUE_DECISION_COL] = "n"
+    assert engine.sync(df_queue) == 2
+    assert df_trans[TRANS_SHARED_FLAG_COL].tolist() == ["Y", "N", "S", "Y", "N"]
+    assert df_trans[TRANS_SPLIT_PERC_COL].iloc[2] == 25.0
+
+
+def test_engine_restores_removed_and_cleared_decisions():
+    df_trans = sample_transactions_df()
+    original = df_trans.copy()
+    engine = ReviewSyncEngine(df_trans)
+    df_queue = sample_queue_df()
+    engine.sync(df_queue)
+
+    # TX1's row goes away and TX3's split decision is cleared
+    df_queue = df_queue.iloc[1:].reset_index(drop=True)
+    df_queue.loc[1, QUEUE_DECISION_COL] = ""
+    assert engine.sync(df_queue) == 2
+    for txn_id in ["TX1", "TX3"]:
+        row = df_trans[TRANS_TXNID_COL] == txn_id
+        assert_frame_equal(df_trans[row], original[row])
+    assert df_trans[TRANS_SHARED_FLAG_COL].iloc[1] == "N"  # TX2 kept
+    assert engine.sync(df_queue) == 0
+
+
+def test_sync_duplicate_txn_ids():
+    df_trans = pd.concat(
+        [sample_transactions_df(), sample_transactions_df().head(1)],
+        ignore_index=True,
+    )
+    queue_data = {
+        QUEUE_TXNID_COL: ["TX1", "TX2", "TX1"],
+        QUEUE_DECISION_COL: ["Y", "N", "S"],
+        QUEUE_SPLIT_COL: [None, None, "40"],
+    }
+    result_df = sync_review_decisions(df_trans, pd.DataFrame(queue_data))
+
+    # Every TX1 row gets the last TX1 decision; the frame keeps its length
+    assert len(result_df) == len(df_trans)
+    tx1 = result_df[result_df[TRANS_TXNID_COL] == "TX1"]
+    assert tx1[TRANS_SHARED_FLAG_COL].tolist() == ["S", "S"]
+    assert tx1[TRANS_SPLIT_PERC_COL].tolist() == [40.0, 40.0]
+    assert df_trans[TRANS_SHARED_FLAG_COL].iloc[0] == "?"
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from balance_pipeline.gui.widgets.table_model import TableModel
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-03-02", None, "2024-01-15", "2024-02-01"]),
+            "merchant_standardized": ["target", "Amazon", None, "A" * 40],
+            "amount": [-1234.5, 20.0, -3.0, -20.0],
+            "description": ["x" * 80, "refund", "coffee", "books"],
+            "potential_refund": [False, False, True, None],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+
+def test_window_formats_like_the_old_row_loop():
+    model = TableModel(_frame())
+
+    assert model.window(0, 10) == [
+        ("03/02/2024", "target", "$1,234.50", "📝 Charge", "x" * 60),
+        ("", "Amazon", "$20.00", "✅ Refund", "refund"),
+        ("01/15/2024", "", "$3.00", "⚠️ Dispute", "coffee"),
+        ("02/01/2024", "A" * 30, "$20.00", "📝 Charge", "books"),
+    ]
+    assert model.window(3, 5) == model.window(0, 10)[3:]
+    assert model.window(10, 5) == []
+
+
+def test_sort_permutations_are_cached_and_reversible():
+    model = TableModel(_frame())
+
+    model.sort("Date")
+    assert model.positions(0, 4).tolist() == [2, 3, 0, 1]  # Missing date last
+    cached = model._orders["Date"]
+    model.sort("Date")
+    assert model.descending
+    assert model.positions(0, 4).tolist() == [1, 0, 3, 2]
+    assert model._orders["Date"] is cached
+
+    model.sort("Merchant")  # Case-insensitive, missing last
+    assert [row[1] for row in model.window(0, 4)] == ["A" * 30, "Amazon", "target", ""]
+    model.sort("Amount", descending=False)
+    assert model.positions(0, 4).tolist() == [2, 1, 3, 0]
+
+
+def test_large_frame_builds_without_per_row_work():
+    n = 200_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "date": pd.Timestamp("2020-01-01")
+            + pd.to_timedelta(rng.integers(0, 1000, n), unit="D"),
+            "merchant_standardized": rng.choice(["Gym", "Netflix", "Target"], n),
+            "amount": rng.integers(-5000, 5000, n) / 100,
+            "description": "purchase",
+        }
+    )
+    model = TableModel(df)
+    model.sort("Amount", descending=True)
+
+    top = model.window(0, 3)
+    assert len(top) == 3 and top[0][2] == f"${df['amount'].abs().max():,.2f}"
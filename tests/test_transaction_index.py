@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_pipeline.gui_analysis import AnalysisController
+from balance_pipeline.transaction_index import TransactionIndex
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    merchants = np.array(
+        ["Amazon", "AMAZON MKTP", "Target", "Whole Foods", "AT&T", "Cafe (Main)", None],
+        dtype=object,
+    )
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(
+        rng.integers(0, 1000, n), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "date": pd.Series(dates).mask(rng.random(n) < 0.01),
+            "amount": rng.normal(-30, 80, n).round(2),
+            "merchant_standardized": merchants[rng.integers(0, len(merchants), n)],
+            "description": "x",
+            "potential_refund": rng.random(n) < 0.05,
+        }
+    )
+    df["amount_abs"] = df["amount"].abs()
+    return df
+
+
+def _contains(df, pattern):
+    return df["merchant_standardized"].str.contains(
+        pattern, case=False, na=False, regex=False
+    )
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"start": "2022-06-01", "end": "2022-06-30"},
+        {"merchant": "amazon"},
+        {"merchant": "zon mk", "min_abs": 50},
+        {"merchant": "(main)", "start": "2023-01-01", "flagged": True},
+        {"min_abs": 10, "max_abs": 20, "end": "2022-03-01"},
+        {"merchant": "nobody"},
+        {"flagged_or_credit": True, "start": "2024-01-01"},
+    ],
+)
+def test_search_matches_pandas(frame, filters):
+    index = TransactionIndex(frame)
+
+    mask = pd.Series(True, index=frame.index)
+    if "start" in filters:
+        mask &= frame["date"] >= pd.Timestamp(filters["start"])
+    if "end" in filters:
+        mask &= frame["date"] <= pd.Timestamp(filters["end"])
+    if "merchant" in filters:
+        mask &= _contains(frame, filters["merchant"])
+    if "min_abs" in filters:
+        mask &= frame["amount_abs"] >= filters["min_abs"]
+    if "max_abs" in filters:
+        mask &= frame["amount_abs"] <= filters["max_abs"]
+    if filters.get("flagged"):
+        mask &= frame["potential_refund"]
+    if filters.get("flagged_or_credit"):
+        mask &= frame["potential_refund"] | (frame["amount"] > 0)
+
+    assert index.search(**filters).tolist() == np.flatnonzero(mask).tolist()
+
+
+def test_controller_queries_use_index(frame):
+    controller = AnalysisController()
+    controller.df = frame
+
+    results = controller.perform_advanced_search(
+        {"merchant": " amazon ", "min_amount": "100", "only_disputes": True}
+    )
+    expected = frame[
+        _contains(frame, "amazon")
+        & (frame["amount_abs"] >= 100)
+        & frame["potential_refund"]
+    ].head(100)
+    pd.testing.assert_frame_equal(results, expected)
+
+    charge = frame[(frame["amount"] > 0) & _contains(frame, "target")].iloc[0]
+    status = controller.check_refund_status(
+        "TARGET", -charge["amount"], charge["date"] - pd.Timedelta(days=3)
+    )
+    assert charge.name in status.index
+
+    metrics = controller.get_dashboard_metrics()
+    assert metrics["total_disputes"] == frame["potential_refund"].sum()
+    assert metrics["total_refunds"] == (frame["amount"] > 0).sum()
+    assert controller.get_recent_disputes(0).empty
+    assert controller.get_recent_disputes(5).index.tolist() == (
+        frame[frame["potential_refund"]].tail(5).index.tolist()
+    )
@@ -0,0 +1,83 @@
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from balance_pipeline.sync import QUEUE_DECISION_COL, QUEUE_SPLIT_COL, QUEUE_TXNID_COL
+from balance_pipeline.workbook_io import (
+    iter_sheet_columns,
+    read_queue_review,
+    read_sheet_columns,
+    write_queue_review_cells,
+)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    wb = openpyxl.Workbook()
+    transactions = wb.active
+    transactions.title = "Transactions"
+    transactions.append(["TxnID", "Date", "Amount", "SharedFlag"])
+    for i in range(50):
+        transactions.append([f"t{i}", f"2024-01-{i % 28 + 1:02d}", -i * 1.5, "?"])
+
+    queue = wb.create_sheet("Queue_Review")
+    queue.append(["Notes", QUEUE_TXNID_COL, QUEUE_DECISION_COL, QUEUE_SPLIT_COL])
+    queue.append(["first", "t1", "Y", None])
+    queue.append(["second", "t2", None, None])
+    queue.append([])  # A blank row keeps its place in the numbering
+    queue.append(["third", "t3", "S", 40])
+    queue["C2"].font = openpyxl.styles.Font(bold=True)
+    path = tmp_path / "BALANCE.xlsx"
+    wb.save(path)
+    return path
+
+
+def test_reads_only_requested_columns(workbook):
+    queue = read_queue_review(workbook)
+
+    assert queue.columns.tolist() == [
+        QUEUE_TXNID_COL,
+        QUEUE_DECISION_COL,
+        QUEUE_SPLIT_COL,
+    ]
+    assert queue.index.tolist() == [2, 3, 5]
+    assert queue[QUEUE_TXNID_COL].tolist() == ["t1", "t2", "t3"]
+    assert queue.loc[5, QUEUE_SPLIT_COL] == 40
+
+    chunks = list(
+        iter_sheet_columns(workbook, "Transactions", ["Amount"], chunk_rows=20)
+    )
+    assert [len(c) for c in chunks] == [20, 20, 10]
+    with pytest.raises(ValueError, match="missing columns"):
+        read_sheet_columns(workbook, "Transactions", ["Nope"])
+
+
+def test_writes_back_only_changed_cells(workbook):
+    with zipfile.ZipFile(workbook) as package:
+        before = {i.filename: package.read(i) for i in package.infolist()}
+
+    decisions = pd.DataFrame(
+        {
+            QUEUE_TXNID_COL: ["t1", "t2", "t3", "t_unknown"],
+            QUEUE_DECISION_COL: ["N", "S", "S", "Y"],
+            QUEUE_SPLIT_COL: [None, 25.0, 40.0, None],
+        }
+    )
+    assert write_queue_review_cells(workbook, decisions) == 3
+    assert write_queue_review_cells(workbook, decisions) == 0
+
+    with zipfile.ZipFile(workbook) as package:
+        after = {i.filename: package.read(i) for i in package.infolist()}
+    changed = [name for name in before if before[name] != after[name]]
+    assert changed == ["xl/worksheets/sheet2.xml"]
+
+    queue = openpyxl.load_workbook(workbook)["Queue_Review"]
+    assert [[c.value for c in row] for row in queue.iter_rows(min_row=2)] == [
+        ["first", "t1", "N", None],
+        ["second", "t2", "S", 25],
+        [None, None, None, None],
+        ["third", "t3", "S", 40],
+    ]
+    assert queue["C2"].font.bold